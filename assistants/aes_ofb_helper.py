@@ -1,241 +1,10 @@
-import requests
-import json
-import subprocess
-import os
-import re
-import sys
-from retrying import retry
+from assistants.engine import MODE_SPECS, ModeHelper
 
-class AESOFBHelper:
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.mode = "OFB"
-        self.supported_mode = "OFB"
-        
-        self.mode_config = {
-            "encrypt_func": "AES_ofb_encrypt",
-            "needs_iv": True,
-            "key_length": 32
-        }
-        
-        self.api_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
-        self.work_dir = os.path.join(os.getcwd(), f"aes_ofb_workdir")
-        os.makedirs(self.work_dir, exist_ok=True)
-        
-        self.generated_code = None
-        self.retry_count = 0
-        self.max_retry = 5
-        self.last_error = ""
-        self.compilation_errors = []
-        self.code_history = []
 
-    @retry(stop_max_attempt_number=3, wait_fixed=2000)
-    def _generate_c_code(self):
-        """生成AES-OFB加密代码，专注于OFB模式的IV处理"""
-        base_prompt = """仅输出纯C代码，实现AES-OFB加密：
+class AESOFBHelper(ModeHelper):
+    """AES-OFB加密代码生成助手，提示词与修复规则见 engine.MODE_SPECS["AES-OFB"]"""
+    spec = MODE_SPECS["AES-OFB"]
 
-1. 头文件（按此顺序）：
-#include <stddef.h>
-#include <stdio.h>
-#include <stdlib.h>
-#include <string.h>
-#include <openssl/aes.h>
-#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
-
-2. 函数：
-- hex_to_bytes：转换十六进制到字节
-- pkcs7_pad：PKCS#7填充
-- main：程序入口
-
-3. 变量强制要求：
-- 密钥：unsigned char key[32]（必须是32字节，禁止使用任何宏）
-- 长度变量：全部使用size_t类型
-- IV：unsigned char iv[16]（必须定义，OFB模式必需）
-
-4. 输入输出流程（关键要求）：
-1) 显示"请输入32字节十六进制密钥（64字符）: "，然后用scanf读取
-2) 显示"请输入16字节十六进制IV（32字符）: "，然后用scanf读取
-3) 显示"请输入要加密的明文: "，然后用fgets读取
-4) 密文用%02x格式输出，显示"密文: "前缀
-
-5. 加密函数：AES_ofb_encrypt
-
-6. 禁止：
-- 任何注释
-- 任何自然语言
-- 代码标记
-- 使用AES_MAX_KEY_LENGTH
-- 合并输入步骤或省略IV相关处理
-
-只输出C代码！"""
-
-        # 错误反馈
-        error_feedback = ""
-        if self.last_error:
-            if "AES_MAX_KEY_LENGTH" in self.last_error:
-                error_feedback = "必须使用unsigned char key[32]，绝对不能用AES_MAX_KEY_LENGTH！"
-            elif "iv" in self.last_error.lower() or "IV" in self.last_error:
-                error_feedback = "OFB模式必须显示IV输入提示并正确处理IV，不能省略！"
-
-        # 构建请求
-        messages = [{"role": "system", "content": base_prompt}]
-        user_content = "生成符合要求的AES-OFB加密代码"
-        if error_feedback:
-            user_content += f"。错误修复：{error_feedback}"
-        messages.append({"role": "user", "content": user_content})
-
-        payload = {
-            "model": "glm-3-turbo",
-            "messages": messages,
-            "temperature": 0.0
-        }
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-
-        try:
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-            raw_code = response.json()["choices"][0]["message"]["content"]
-            
-            # 代码净化与修复
-            clean_code = re.sub(
-                r'//.*?\n|/\*.*?\*/|```c|```|[\u4e00-\u9fa5](?![：:])',
-                '', 
-                raw_code, 
-                flags=re.DOTALL
-            )
-            # 强制替换密钥定义
-            clean_code = re.sub(r'unsigned char key\[\d+\]', 'unsigned char key[32]', clean_code)
-            # 强制替换int为size_t
-            clean_code = re.sub(r'(?<!unsigned )int (\w+len|i)', r'size_t \1', clean_code)
-            
-            # 确保头文件
-            required_includes = [
-                '#include <stddef.h>',
-                '#include <stdio.h>',
-                '#include <stdlib.h>',
-                '#include <string.h>',
-                '#include <openssl/aes.h>',
-                '#pragma GCC diagnostic ignored "-Wdeprecated-declarations"'
-            ]
-            clean_code = '\n'.join(required_includes) + '\n\n' + clean_code
-            
-            # 确保关键函数存在
-            if 'hex_to_bytes' not in clean_code:
-                clean_code += """
-int hex_to_bytes(const char *hex, unsigned char *bytes, size_t max_len) {
-    size_t len = strlen(hex);
-    if (len % 2 != 0 || len / 2 > max_len) return -1;
-    for (size_t i = 0; i < len; i += 2) {
-        sscanf(hex + i, "%02x", (unsigned int *)&bytes[i/2]);
-    }
-    return len / 2;
-}
-"""
-            if 'pkcs7_pad' not in clean_code:
-                clean_code += """
-void pkcs7_pad(unsigned char *data, size_t data_len, size_t block_size, unsigned char *padded, size_t *padded_len) {
-    *padded_len = data_len + (block_size - data_len % block_size);
-    memcpy(padded, data, data_len);
-    unsigned char pad = block_size - (data_len % block_size);
-    for (size_t i = data_len; i < *padded_len; i++) padded[i] = pad;
-}
-"""
-
-            # 确保IV输入提示和处理
-            if '请输入16字节十六进制IV（32字符）: ' not in clean_code:
-                clean_code = re.sub(
-                    r'(?<=scanf\("%64s", hex_key\);)',
-                    '\n    printf("请输入16字节十六进制IV（32字符）: ");\n    scanf("%32s", hex_iv);',
-                    clean_code
-                )
-            # 添加缓冲区清理
-            clean_code = re.sub(
-                r'(?<=scanf\("%64s", hex_key\);)',
-                '\n    while(getchar() != \'\\n\');',
-                clean_code
-            )
-            clean_code = re.sub(
-                r'(?<=scanf\("%32s", hex_iv\);)',
-                '\n    while(getchar() != \'\\n\');',
-                clean_code
-            )
-
-            self.generated_code = clean_code.strip()
-            return self.generated_code, "代码生成成功"
-        except Exception as e:
-            return "", f"API错误: {str(e)}"
-
-    def _compile_and_run(self, code=None):
-        c_code = code or self.generated_code
-        if not c_code:
-            return "无代码可编译"
-
-        # 最终净化
-        c_code = c_code.replace('AES_MAX_KEY_LENGTH', '32')
-        c_code = re.sub(r'//.*?\n|/\*.*?\*/', '', c_code, flags=re.DOTALL)
-
-        # 写入文件
-        code_path = os.path.join(self.work_dir, "aes_ofb_encrypt.c")
-        with open(code_path, "w") as f:
-            f.write(c_code)
-
-        # 编译并运行
-        exec_path = os.path.join(self.work_dir, "aes_ofb_encrypt")
-        compile_cmd = f"gcc {code_path} -o {exec_path} -lcrypto -Wall"
-        compile_result = subprocess.run(
-            compile_cmd,
-            shell=True,
-            capture_output=True,
-            text=True
-        )
-        if compile_result.returncode != 0:
-            self.last_error = compile_result.stderr
-            return f"编译失败: {self.last_error}"
-
-        os.chmod(exec_path, 0o755)
-        print("\n请输入加密信息：")
-        try:
-            subprocess.run([exec_path], stdin=sys.stdin, stdout=sys.stdout, stderr=sys.stderr)
-            return "运行成功"
-        except Exception as e:
-            return f"运行错误: {str(e)}"
-
-    def process(self):
-        while self.retry_count < self.max_retry:
-            self.retry_count += 1
-            print(f"\n===== 第 {self.retry_count}/{self.max_retry} 次尝试 (AES-OFB) =====")
-
-            code, msg = self._generate_c_code()
-            if not code:
-                print(f"生成失败: {msg}")
-                if input("重试？(y/n): ").lower() != 'y':
-                    return
-                continue
-
-            print("\n生成的代码：")
-            print("-" * 70)
-            print(code)
-            print("-" * 70)
-
-            result = self._compile_and_run(code)
-            if result == "运行成功":
-                print("✅ 加密成功")
-                return
-
-            print(f"❌ 失败: {result}")
-            if self.retry_count < self.max_retry and input("重试？(y/n): ").lower() != 'y':
-                return
-
-        print("⚠️ 已达最大重试次数")
 
 if __name__ == "__main__":
     api_key = input("请输入智谱API Key: ")
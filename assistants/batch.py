@@ -0,0 +1,298 @@
+import collections
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from assistants.metrics import JOBS, JOBS_IN_FLIGHT, RUN_SECONDS, cache_lookup
+from assistants.pipeline import BuildPipeline
+from assistants.registry import HELPER_REGISTRY, create_helper, get_entry
+from assistants.stream import _check_key_iv, build_mmap, encrypt_file
+from assistants.trace import span
+from assistants.worker import WorkerPool
+
+# 执行方式：template为内置模板程序（不需要API Key），generated为大模型生成、经已知答案测试校验的程序
+BATCH_ENGINES = ("template", "generated")
+# 各算法所属的后端
+ALGORITHM_BACKENDS = {"AES": "openssl", "DES": "openssl", "SM4": "gmssl"}
+# generated方式从该环境变量读取智谱API Key（批量任务不做交互式输入）
+API_KEY_ENV = "ZHIPU_API_KEY"
+
+
+def parse_job(line):
+    """解析一行任务JSON，返回规范化的任务字典；字段缺失或非法时抛出ValueError
+
+    任务字段：algorithm（如"AES-CBC"，或"AES"配合mode）、backend、mode、key/iv（十六进制）、
+    plaintext（文本）或plaintext_hex或input（输入文件），可选output（输出文件）、api、engine、id
+    """
+    try:
+        job = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"不是合法的JSON: {e}")
+    if not isinstance(job, dict):
+        raise ValueError("任务必须是JSON对象")
+    if not job.get("algorithm"):
+        raise ValueError("缺少algorithm字段")
+
+    name = str(job["algorithm"]).upper()
+    if job.get("mode") and "-" not in name:
+        name = f"{name}-{str(job['mode']).upper()}"
+    elif job.get("mode") and name.split("-")[-1] != str(job["mode"]).upper():
+        raise ValueError(f"algorithm {name} 与 mode {job['mode']} 不一致")
+    algorithm = name.split("-")[0]
+    if algorithm not in ALGORITHM_BACKENDS:
+        raise ValueError(f"不支持的算法: {name}（RSA请使用 rsa-batch 子命令），支持：{list(ALGORITHM_BACKENDS)}")
+    backend = job.get("backend") or ALGORITHM_BACKENDS[algorithm]
+    if backend != ALGORITHM_BACKENDS[algorithm]:
+        raise ValueError(f"{name}应使用{ALGORITHM_BACKENDS[algorithm]}后端，实际为{backend}")
+
+    sources = [field for field in ("plaintext", "plaintext_hex", "input") if job.get(field) is not None]
+    if len(sources) != 1:
+        raise ValueError("plaintext、plaintext_hex与input必须且只能指定一个")
+    if job.get("output") and not job.get("input"):
+        raise ValueError("output只能与input同时使用")
+    try:
+        key = bytes.fromhex(job.get("key") or "")
+        iv = bytes.fromhex(job["iv"]) if job.get("iv") else None
+        plaintext = bytes.fromhex(job["plaintext_hex"]) if job.get("plaintext_hex") is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("key、iv与plaintext_hex必须是十六进制字符串")
+    if job.get("plaintext") is not None:
+        plaintext = str(job["plaintext"]).encode()
+
+    return {
+        "id": job.get("id"),
+        "name": name,
+        "backend": backend,
+        "api": job.get("api") or "legacy",
+        "engine": job.get("engine"),
+        "key": key,
+        "iv": iv,
+        "plaintext": plaintext,
+        "input": job.get("input"),
+        "output": job.get("output"),
+    }
+
+
+class BatchRunner:
+    """并发执行批量加密任务
+
+    template方式按算法/模式/接口共用一个常驻工作进程池（有input与output的任务用内存映射加密文件）；
+    generated方式每种算法/模式/接口只用流水线生成并校验一次程序，之后的任务直接复用，
+    生成失败的结果同样复用，不会为每个任务重复请求大模型；cache_failures为False时（常驻服务）不保留失败的结果，
+    下一个请求重新生成，一次限流、超时或未设置API Key不会让该算法在服务重启前一直失败。
+    """
+
+    def __init__(self, jobs=None, engine="template", api_key=None, work_dir=None, session=None,
+                 cache_failures=True):
+        if engine not in BATCH_ENGINES:
+            raise ValueError(f"不支持的执行方式: {engine}，支持：{list(BATCH_ENGINES)}")
+        self.jobs = jobs or os.cpu_count() or 1
+        self.engine = engine
+        self.api_key = api_key
+        self.work_dir = work_dir
+        self.session = session
+        self.cache_failures = cache_failures
+        self.lock = threading.Lock()
+        self.pools = {}
+        self.builds = {}
+        self.build_locks = {}
+
+    def run_job(self, line):
+        """执行一行任务，返回结果字典（失败时ok为False，error为原因），不抛出异常"""
+        start = time.perf_counter()
+        result = {"id": None, "algorithm": None, "backend": None, "engine": None, "ok": False,
+                  "attempts": 0, "timings": {}, "error": ""}
+        JOBS_IN_FLIGHT.inc()
+        with span("job") as args:
+            try:
+                job = parse_job(line)
+                engine = job["engine"] or self.engine
+                result.update(id=job["id"], algorithm=job["name"], backend=job["backend"], engine=engine)
+                if engine == "template":
+                    self._run_template(job, result)
+                elif engine == "generated":
+                    self._run_generated(job, result)
+                else:
+                    raise ValueError(f"不支持的执行方式: {engine}，支持：{list(BATCH_ENGINES)}")
+            except (OSError, ValueError, RuntimeError) as e:
+                result["error"] = str(e)
+            finally:
+                JOBS_IN_FLIGHT.dec()
+            args.update(id=result["id"], algorithm=result["algorithm"], engine=result["engine"], ok=result["ok"])
+        # 标签只取已登记的算法/模式与执行方式，非法任务不会产生新的标签值
+        JOBS.inc(algorithm=result["algorithm"] if result["algorithm"] in HELPER_REGISTRY else "-",
+                 engine=result["engine"] if result["engine"] in BATCH_ENGINES else "-",
+                 result="ok" if result["ok"] else "error")
+        result["timings"]["total"] = time.perf_counter() - start
+        return result
+
+    def _read_input(self, job):
+        if job["plaintext"] is not None:
+            return job["plaintext"]
+        with open(job["input"], "rb") as f:
+            return f.read()
+
+    def _pool(self, name, api):
+        with self.lock:
+            pool = self.pools.get((name, api))
+            if pool is None:
+                pool = self.pools[(name, api)] = WorkerPool(name, size=self.jobs, work_dir=self.work_dir, api=api)
+            return pool
+
+    def _run_template(self, job, result):
+        name, api, timings = job["name"], job["api"], result["timings"]
+        _check_key_iv(name, job["key"], job["iv"])
+        result["attempts"] = 1
+        start = time.perf_counter()
+        if job["output"]:
+            with span("build", file=True):
+                build_mmap(name, work_dir=self.work_dir, api=api)
+            timings["build"] = time.perf_counter() - start
+            start = time.perf_counter()
+            with span("encrypt", file=True):
+                result["bytes"] = encrypt_file(name, job["key"], job["iv"], job["input"], job["output"],
+                                               work_dir=self.work_dir, api=api)
+            result["output"] = job["output"]
+        else:
+            with span("build", file=False):
+                pool = self._pool(name, api)
+            timings["build"] = time.perf_counter() - start
+            data = self._read_input(job)
+            start = time.perf_counter()
+            with span("encrypt", file=False):
+                result["ciphertext"] = pool.encrypt(job["key"], job["iv"], data).hex()
+        timings["encrypt"] = time.perf_counter() - start
+        RUN_SECONDS.observe(timings["encrypt"], algorithm=name, engine="template")
+        result["ok"] = True
+
+    def _build(self, name, api):
+        # 同一算法/模式的助手共用工作目录，按算法/模式串行生成，不同算法之间并发
+        with self.lock:
+            lock = self.build_locks.setdefault(name, threading.Lock())
+        with lock:
+            build = self.builds.get((name, api))
+            cache_lookup("build", build is not None)
+            if build:
+                return build, True
+
+            build = {"helper": None, "attempts": 0, "timings": {}, "error": ""}
+            try:
+                build["helper"] = helper = self._new_helper(name, api)
+                pipeline = BuildPipeline(helper, name, max_candidates=helper.max_retry)
+                winner = pipeline.run()
+                stats = pipeline.stats()
+                build["attempts"] = len(stats["candidates"])
+                build["timings"] = dict(stats["busy"], build=stats["elapsed"])
+                if not winner:
+                    errors = [c["error"] for c in stats["candidates"] if c["error"]]
+                    last = errors[-1].splitlines()[0] if errors else "没有候选程序"
+                    build["error"] = f"{build['attempts']}次尝试均未通过已知答案测试，最后一次：{last}"
+            except (ImportError, OSError, ValueError, RuntimeError) as e:
+                build["error"] = f"生成失败: {e}"
+            if self.cache_failures or not build["error"]:
+                with self.lock:
+                    self.builds[(name, api)] = build
+            return build, False
+
+    def _new_helper(self, name, api):
+        if not self.api_key:
+            raise ValueError(f"generated方式需要智谱API Key，请设置环境变量{API_KEY_ENV}")
+        helper = create_helper(name, self.api_key, api=api)
+        helper.session = self.session
+        return helper
+
+    def generate(self, name, api="legacy"):
+        """生成（或复用已生成的）指定算法/模式的程序，返回尝试次数、各阶段耗时、错误与源码"""
+        name = name.upper()
+        get_entry(name)
+        build, reused = self._build(name, api)
+        return {
+            "algorithm": name,
+            "api": api,
+            "ok": not build["error"],
+            "attempts": build["attempts"],
+            "build_reused": reused,
+            "timings": {} if reused else dict(build["timings"]),
+            "error": build["error"],
+            "code": None if build["error"] else build["helper"].generated_code,
+        }
+
+    def stats(self):
+        """返回各常驻工作进程池的统计与已生成程序的概况"""
+        with self.lock:
+            pools = [pool.stats() for pool in self.pools.values()]
+        with self.lock:
+            builds = {f"{name}/{api}": {"attempts": build["attempts"], "error": build["error"]}
+                      for (name, api), build in self.builds.items()}
+        return {"pools": pools, "builds": builds}
+
+    def _run_generated(self, job, result):
+        name, timings = job["name"], result["timings"]
+        _check_key_iv(name, job["key"], job["iv"])
+        if job["output"]:
+            raise ValueError("generated方式只输出十六进制密文，不支持output")
+        build, reused = self._build(name, job["api"])
+        result["attempts"] = build["attempts"]
+        result["build_reused"] = reused
+        if not reused:
+            timings.update(build["timings"])
+        if build["error"]:
+            raise RuntimeError(build["error"])
+
+        run = build["helper"].run_headless(job["key"], job["iv"], self._read_input(job))
+        timings.update((stage, run.timings[stage]) for stage in ("run", "parse") if stage in run.timings)
+        if "total" in run.timings:
+            RUN_SECONDS.observe(run.timings["total"], algorithm=name, engine="generated")
+        if not run.ok:
+            raise RuntimeError(run.error)
+        result["ciphertext"] = run.ciphertext.hex()
+        result["ok"] = True
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_batch(src, dst, jobs=None, engine="template", api_key=None, work_dir=None):
+    """从src（文本文件对象，每行一个JSON任务，空行跳过）读取任务并发执行，按输入顺序向dst逐行写入结果JSON
+
+    在途任务数有上限，内存占用与任务数无关；单个任务失败不影响其他任务。返回统计信息。
+    """
+    start = time.perf_counter()
+    total = failed = 0
+    with BatchRunner(jobs, engine, api_key, work_dir) as runner, \
+            ThreadPoolExecutor(max_workers=runner.jobs) as executor:
+        pending = collections.deque()
+
+        def flush(limit):
+            nonlocal total, failed
+            while len(pending) > limit:
+                line_number, future = pending.popleft()
+                result = dict(line=line_number, **future.result())
+                total += 1
+                failed += not result["ok"]
+                dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+                dst.flush()
+
+        for line_number, line in enumerate(src, 1):
+            if not line.strip():
+                continue
+            pending.append((line_number, executor.submit(runner.run_job, line)))
+            flush(2 * runner.jobs)
+        flush(0)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "jobs": total,
+        "failed": failed,
+        "elapsed": elapsed,
+        "jobs_per_second": total / elapsed if elapsed > 0 else 0.0,
+    }
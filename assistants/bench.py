@@ -0,0 +1,520 @@
+import filecmp
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from assistants.fuzz import KEY_LENGTHS, ORACLE_CIPHERS, TEXT_MAX_LEN
+from assistants.hybrid import hybrid_decrypt_file, hybrid_encrypt_file
+from assistants.kat import BLOCK_SIZES, collect_candidates
+from assistants.keypool import generate_key_pair
+from assistants.parallel import is_parallel, parallel_decrypt_file, parallel_encrypt_file
+from assistants.rsa_batch import rsa_decrypt_batch, rsa_encrypt_batch
+from assistants.runner import build_stdin, run_headless
+from assistants.stream import decrypt_file, encrypt_file
+from assistants.templates import TEMPLATE_APIS, TEMPLATE_LIBS, build_binary, get_spec, render, template_libs
+
+# 默认负载大小：openssl speed 的默认块大小，加上1MiB～1GiB的大负载
+DEFAULT_SIZES = [16, 64, 256, 1024, 8192, 16384, 1 << 20, 64 << 20, 1 << 30]
+OPENSSL_SPEED_SIZES = [16, 64, 256, 1024, 8192, 16384]
+# openssl speed 的缓冲区上限；更大的负载以16KiB的结果作为稳态参考
+OPENSSL_SPEED_MAX = 16384
+# gmssl 命令行经管道输入，超过该大小不再测试
+GMSSL_MAX_SIZE = 64 << 20
+
+BENCH_CFLAGS = ("-O3", "-march=native")
+# RSA测试的默认密钥长度，以及每批处理的记录数
+RSA_BENCH_BITS = [2048, 3072, 4096]
+RSA_BENCH_BATCH = 256
+
+# 基准测试程序：bench <字节数> <最短秒数>
+# 按整块加密同一条消息，直到累计耗时达到最短秒数；大于16MiB的消息分段复用缓冲区（保持链接状态）
+BENCH_BODY = r"""
+#include <time.h>
+#define CHUNK_SIZE ((size_t)16 << 20)
+#define CHECK_BYTES (1ULL << 20)
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+}
+
+int main(int argc, char **argv) {
+    if (argc < 3) {
+        fprintf(stderr, "usage: %s <bytes> <min_seconds>\n", argv[0]);
+        return 2;
+    }
+    unsigned long long total = strtoull(argv[1], NULL, 10);
+    double min_seconds = atof(argv[2]);
+    total = total < BLOCK_SIZE ? BLOCK_SIZE : (total + BLOCK_SIZE - 1) / BLOCK_SIZE * BLOCK_SIZE;
+    size_t chunk = total < CHUNK_SIZE ? (size_t)total : CHUNK_SIZE;
+
+    unsigned char key[KEY_LEN], iv[IV_BUF_LEN], ivbuf[IV_BUF_LEN];
+    unsigned char *in = malloc(chunk), *out = malloc(chunk);
+    if (!in || !out) return 1;
+    for (size_t i = 0; i < KEY_LEN; i++) key[i] = (unsigned char)(i * 7 + 1);
+    for (size_t i = 0; i < IV_BUF_LEN; i++) iv[i] = (unsigned char)(i * 13 + 5);
+    for (size_t i = 0; i < chunk; i++) in[i] = (unsigned char)i;
+
+    $key_state
+    $set_key
+    int num = 0;
+    /* 每处理约1MiB检查一次时间，避免小负载时计时开销影响结果 */
+    unsigned long long batch = total >= CHECK_BYTES ? 1 : CHECK_BYTES / total;
+    unsigned long long iterations = 0;
+    double start = now(), elapsed;
+    do {
+        for (unsigned long long b = 0; b < batch; b++) {
+            memcpy(ivbuf, iv, IV_BUF_LEN);
+            num = 0;
+            $set_iv
+            for (unsigned long long done = 0; done < total; done += chunk) {
+                size_t len = total - done < chunk ? (size_t)(total - done) : chunk;
+                $crypt
+            }
+        }
+        iterations += batch;
+        elapsed = now() - start;
+    } while (elapsed < min_seconds);
+    (void)num;
+
+    unsigned char sink = 0;
+    for (size_t i = 0; i < chunk; i++) sink ^= out[i];
+    printf("%llu %llu %.9f %u\n", iterations, total, elapsed, sink);
+    free(in);
+    free(out);
+    return 0;
+}
+"""
+
+
+def parse_size(text):
+    """解析负载大小，支持K/M/G后缀（按1024计）"""
+    match = re.fullmatch(r"(\d+)\s*([KMG]?)I?B?", text.strip().upper())
+    if not match:
+        raise ValueError(f"无效的大小: {text}")
+    return int(match.group(1)) << {"": 0, "K": 10, "M": 20, "G": 30}[match.group(2)]
+
+
+def format_size(size):
+    for shift, unit in ((30, "GiB"), (20, "MiB"), (10, "KiB")):
+        if size >= 1 << shift and size % (1 << shift) == 0:
+            return f"{size >> shift}{unit}"
+    return f"{size}B"
+
+
+def cpu_mhz():
+    """读取CPU主频（MHz），用于换算cycles/byte；无法获取时返回None"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.lower().startswith("cpu mhz"):
+                    return float(line.split(":")[1])
+    except OSError:
+        pass
+    return None
+
+
+def build_bench(name, work_dir=None, cflags=BENCH_CFLAGS, api="legacy"):
+    """以优化参数编译指定算法/模式的基准测试程序（api为legacy或evp），返回可执行文件路径"""
+    return build_binary(name, "bench", render(name, BENCH_BODY, api), work_dir=work_dir, cflags=cflags,
+                        libs=template_libs(name, api))
+
+
+def run_bench_binary(exec_path, size, min_seconds):
+    """运行基准测试程序，返回每秒处理的字节数"""
+    proc = subprocess.run([exec_path, str(size), str(min_seconds)], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"基准测试程序运行失败: {proc.stderr.strip()}")
+    iterations, total, elapsed, _ = proc.stdout.split()
+    return int(iterations) * int(total) / float(elapsed)
+
+
+def openssl_speed(name, sizes, seconds=1, cipher=None, decrypt=False):
+    """运行 openssl speed -evp（decrypt为True时测试解密），返回 {负载大小: 每秒字节数}（仅包含不超过16KiB的大小）"""
+    cipher = cipher or ORACLE_CIPHERS[name][0]
+    base = ["openssl", "speed", "-evp", cipher, "-seconds", str(seconds), "-mr", "-elapsed"]
+    if decrypt:
+        base.append("-decrypt")
+    if name.startswith("DES"):
+        base += ["-provider", "legacy", "-provider", "default"]
+
+    results = {}
+    wanted = sorted({min(size, OPENSSL_SPEED_MAX) for size in sizes})
+    runs = [base] if set(wanted) & set(OPENSSL_SPEED_SIZES) else []
+    runs += [base + ["-bytes", str(size)] for size in wanted if size not in OPENSSL_SPEED_SIZES]
+    for cmd in runs:
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        header = [line for line in proc.stdout.splitlines() if line.startswith("+H:")]
+        values = [line for line in proc.stdout.splitlines() if line.startswith("+F:")]
+        if proc.returncode != 0 or not header or not values:
+            raise RuntimeError(f"openssl speed 运行失败: {proc.stderr.strip()}")
+        run_sizes = [int(s) for s in header[-1].split(":")[1:]]
+        run_values = [float(v) for v in values[-1].split(":")[3:]]
+        results.update(zip(run_sizes, run_values))
+    return {size: results[min(size, OPENSSL_SPEED_MAX)] for size in sizes
+            if min(size, OPENSSL_SPEED_MAX) in results}
+
+
+def openssl_speed_rsa(bits_list, seconds=1):
+    """运行 openssl speed rsaN，返回 {位数: (私钥运算次数/秒, 公钥运算次数/秒)}"""
+    proc = subprocess.run(["openssl", "speed", "-mr", "-seconds", str(seconds)]
+                          + [f"rsa{bits}" for bits in bits_list], capture_output=True, text=True)
+    results = {}
+    for line in proc.stdout.splitlines():
+        # +F2:序号:位数:私钥运算/秒:公钥运算/秒
+        if line.startswith("+F2:"):
+            fields = line.split(":")
+            results[int(fields[2])] = (float(fields[3]), float(fields[4]))
+    if proc.returncode != 0 or not results:
+        raise RuntimeError(f"openssl speed 运行失败: {proc.stderr.strip()}")
+    return results
+
+
+def bench_rsa(bits, min_seconds, work_dir=None):
+    """按批（每批一个进程、只解析一次密钥）重复做RSA-OAEP解密与加密，返回 (解密次数/秒, 加密次数/秒)"""
+    private_pem, public_pem = generate_key_pair(bits)
+    plaintexts = [bytes([i % 256]) * 32 for i in range(RSA_BENCH_BATCH)]
+    ciphertexts, _ = rsa_encrypt_batch(public_pem, plaintexts, work_dir=work_dir)
+
+    speeds = []
+    for run, key, records in ((rsa_decrypt_batch, private_pem, ciphertexts),
+                              (rsa_encrypt_batch, public_pem, plaintexts)):
+        ops, start = 0, time.perf_counter()
+        while True:
+            results, stats = run(key, records, work_dir=work_dir)
+            if stats["failed"]:
+                raise RuntimeError(f"RSA-{bits}批量运算失败: {stats['errors'][0][1]}")
+            ops += len(results)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                speeds.append(ops / elapsed)
+                break
+    return tuple(speeds)
+
+
+def gmssl_speed(name, size, min_seconds):
+    """重复调用 gmssl 命令行加密同一负载（含进程启动开销），返回每秒字节数"""
+    cmd = ["gmssl", ORACLE_CIPHERS[name][0].replace("-", "_"), "-encrypt", "-key", bytes(16).hex()]
+    if not name.endswith("ECB"):
+        cmd += ["-iv", bytes(16).hex()]
+    data = bytes(size)
+    runs, start = 0, time.perf_counter()
+    while True:
+        proc = subprocess.run(cmd, input=data, capture_output=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"gmssl 运行失败: {proc.stderr.decode(errors='replace').strip()}")
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return runs * size / elapsed
+
+
+def bench_generated(candidate, size, min_seconds, work_dir=None):
+    """以优化参数重新编译生成程序，按非交互式方式重复运行（含进程启动开销），返回每秒字节数"""
+    name = candidate["name"]
+    exec_path = candidate["exec_path"]
+    source_path = exec_path + ".c"
+    if os.path.exists(source_path):
+        libs = TEMPLATE_LIBS["gmssl" if name.startswith("SM4") else "openssl"]
+        with open(source_path) as f:
+            exec_path = build_binary(name, "generated", f.read(), work_dir=work_dir,
+                                     cflags=BENCH_CFLAGS, libs=libs)
+
+    algorithm, mode = name.split("-")
+    key = bytes(range(KEY_LENGTHS[algorithm]))
+    iv = None if mode == "ECB" else bytes(BLOCK_SIZES[algorithm])
+    stdin_data = build_stdin(key, iv, b"A" * size)
+    runs, start = 0, time.perf_counter()
+    while True:
+        result = run_headless(exec_path, stdin_data)
+        if not result.ok:
+            raise RuntimeError(result.error)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return runs * size / elapsed
+
+
+def bench_file_io(name, size, min_seconds, use_mmap, work_dir=None, jobs=None, api="legacy"):
+    """在临时文件上重复加密（含进程启动开销），比较内存映射、分段读写与并行分片，返回每秒字节数"""
+    spec = get_spec(name, api)
+    key = bytes(spec["key_length"])
+    iv = bytes(spec["iv_length"]) if spec["iv_length"] else None
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        in_path, out_path = os.path.join(tmp, "plain"), os.path.join(tmp, "cipher")
+        with open(in_path, "wb") as f:
+            chunk = bytes(range(256)) * 4096
+            for offset in range(0, size, len(chunk)):
+                f.write(chunk[:size - offset])
+        if jobs:
+            def encrypt():
+                parallel_encrypt_file(name, key, iv, in_path, out_path, jobs=jobs, work_dir=work_dir, api=api)
+        else:
+            def encrypt():
+                encrypt_file(name, key, iv, in_path, out_path, use_mmap=use_mmap, work_dir=work_dir, api=api)
+
+        # 先运行一次完成编译并预热页缓存
+        encrypt()
+        runs, start = 0, time.perf_counter()
+        while True:
+            encrypt()
+            runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                return runs * size / elapsed
+
+
+def bench_roundtrip(name, size, min_seconds, work_dir=None, jobs=None, api="legacy"):
+    """在临时文件上加密后重复解密，先校验解密结果与原文一致，返回 {实现: 每秒字节数}
+
+    dec-mmap为单进程内存映射解密，dec-parallel为jobs个进程并行分片解密（ECB/CBC/CFB/CTR），
+    roundtrip为加密加解密的完整往返（按明文字节数计）。
+    """
+    spec = get_spec(name, api)
+    key = bytes(range(spec["key_length"]))
+    iv = bytes(range(spec["iv_length"])) if spec["iv_length"] else None
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        in_path = os.path.join(tmp, "plain")
+        cipher_path, out_path = os.path.join(tmp, "cipher"), os.path.join(tmp, "decrypted")
+        with open(in_path, "wb") as f:
+            chunk = bytes(range(256)) * 4096
+            for offset in range(0, size, len(chunk)):
+                f.write(chunk[:size - offset])
+
+        runs = {
+            "dec-mmap": lambda: decrypt_file(name, key, iv, cipher_path, out_path, work_dir=work_dir, api=api),
+            "roundtrip": lambda: (encrypt_file(name, key, iv, in_path, cipher_path, work_dir=work_dir, api=api),
+                                  decrypt_file(name, key, iv, cipher_path, out_path, work_dir=work_dir, api=api)),
+        }
+        if is_parallel(name, decrypt=True):
+            runs["dec-parallel"] = lambda: parallel_decrypt_file(name, key, iv, cipher_path, out_path,
+                                                                 jobs=jobs or os.cpu_count() or 1,
+                                                                 work_dir=work_dir, api=api)
+
+        speeds = {}
+        for implementation, run in runs.items():
+            # 先运行一次完成编译并预热页缓存，同时校验往返结果
+            encrypt_file(name, key, iv, in_path, cipher_path, work_dir=work_dir, api=api)
+            run()
+            if not filecmp.cmp(in_path, out_path, shallow=False):
+                raise RuntimeError(f"{implementation}解密结果与原文不一致")
+            iterations, start = 0, time.perf_counter()
+            while True:
+                run()
+                iterations += 1
+                elapsed = time.perf_counter() - start
+                if elapsed >= min_seconds:
+                    speeds[implementation] = iterations * size / elapsed
+                    break
+        return speeds
+
+
+def bench_hybrid(size, min_seconds, work_dir=None, bits=2048):
+    """在临时文件上重复做RSA-OAEP + AES-256-GCM混合加密与解密（含进程启动与RSA运算），
+    返回 (加密每秒字节数, 解密每秒字节数)"""
+    private_pem, public_pem = generate_key_pair(bits)
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        in_path = os.path.join(tmp, "plain")
+        sealed_path, opened_path = os.path.join(tmp, "sealed"), os.path.join(tmp, "opened")
+        with open(in_path, "wb") as f:
+            chunk = bytes(range(256)) * 4096
+            for offset in range(0, size, len(chunk)):
+                f.write(chunk[:size - offset])
+
+        speeds = []
+        for run in (lambda: hybrid_encrypt_file(public_pem, in_path, sealed_path, work_dir=work_dir),
+                    lambda: hybrid_decrypt_file(private_pem, sealed_path, opened_path, work_dir=work_dir)):
+            # 先运行一次完成编译并预热页缓存
+            run()
+            runs, start = 0, time.perf_counter()
+            while True:
+                run()
+                runs += 1
+                elapsed = time.perf_counter() - start
+                if elapsed >= min_seconds:
+                    speeds.append(runs * size / elapsed)
+                    break
+        return tuple(speeds)
+
+
+def _row(name, implementation, size, bytes_per_second, hz, note=""):
+    return {
+        "name": name,
+        "implementation": implementation,
+        "size": size,
+        "bytes_per_second": bytes_per_second,
+        "mb_per_second": bytes_per_second / 1e6,
+        "cycles_per_byte": hz / bytes_per_second if hz and bytes_per_second else None,
+        "note": note,
+    }
+
+
+def run_bench(names=None, sizes=None, min_seconds=1.0, include_generated=True, file_io=False,
+              jobs=None, api="legacy", work_dir=None, hybrid=False, rsa_bits=None, roundtrip=False):
+    """依次测试模板程序、openssl speed、gmssl 与已编译的生成程序，返回吞吐量报告
+
+    模板程序分别以旧版接口（legacy）和EVP接口（evp）编译测试。
+    file_io为True时，另外用api指定的接口比较文件加密的内存映射（mmap）与分段读写（buffered），
+    可并行的模式再测试jobs个进程的并行分片（parallel）。
+    roundtrip为True时，另外用api指定的接口测试文件解密（dec-mmap，ECB/CBC/CFB/CTR另有dec-parallel）
+    与加密+解密往返（roundtrip），每项先校验解密结果与原文一致，并以 openssl speed -decrypt（openssl-dec）作为对比。
+    hybrid为True时，另外测试RSA-OAEP + AES-256-GCM混合加密的文件加密与解密（HYBRID行），
+    以 openssl speed aes-256-gcm 作为对比。
+    rsa_bits为密钥长度列表时，另外测试RSA-OAEP批量解密（CRT私钥运算）与加密的每秒次数，
+    与 openssl speed rsaN 的私钥/公钥运算次数一同写入报告的rsa项。
+
+    各项测试顺序执行，避免相互争用CPU影响结果。
+    """
+    sizes = sorted(sizes or DEFAULT_SIZES)
+    names = [n.upper() for n in (names if names is not None else ORACLE_CIPHERS)]
+    mhz = cpu_mhz()
+    hz = mhz * 1e6 if mhz else None
+    rows, skipped = [], []
+
+    generated = {}
+    if include_generated:
+        for candidate in collect_candidates():
+            if candidate["interface"] == "headless" and candidate["name"] in names:
+                generated.setdefault(candidate["name"], []).append(candidate)
+
+    for name in names:
+        for template_api in TEMPLATE_APIS:
+            try:
+                exec_path = build_bench(name, work_dir=work_dir, api=template_api)
+            except (ValueError, RuntimeError) as e:
+                # 该接口没有此算法的模板，或缺少对应的密码库（如未安装GmSSL）
+                skipped.append(f"{name} {template_api}: {str(e).splitlines()[0]}")
+                continue
+            for size in sizes:
+                value = run_bench_binary(exec_path, size, min_seconds)
+                rows.append(_row(name, template_api, size, value, hz, "模板程序"))
+
+        if file_io:
+            try:
+                for size in sizes:
+                    for implementation, use_mmap in (("mmap", True), ("buffered", False)):
+                        value = bench_file_io(name, size, min_seconds, use_mmap, work_dir=work_dir, api=api)
+                        rows.append(_row(name, implementation, size, value, hz, f"{api}，文件读写，含进程启动"))
+                    if is_parallel(name):
+                        count = jobs or os.cpu_count() or 1
+                        value = bench_file_io(name, size, min_seconds, True, work_dir=work_dir, jobs=count, api=api)
+                        rows.append(_row(name, "parallel", size, value, hz, f"{api}，{count}进程并行分片"))
+            except (ValueError, RuntimeError) as e:
+                skipped.append(f"{name} 文件读写（{api}）: {str(e).splitlines()[0]}")
+
+        if roundtrip:
+            count = jobs or os.cpu_count() or 1
+            notes = {"dec-mmap": f"{api}，文件解密，含进程启动", "dec-parallel": f"{api}，{count}进程并行分片解密",
+                     "roundtrip": f"{api}，文件加密+解密往返，按明文计"}
+            try:
+                for size in sizes:
+                    for implementation, value in bench_roundtrip(name, size, min_seconds, work_dir=work_dir,
+                                                                 jobs=count, api=api).items():
+                        rows.append(_row(name, implementation, size, value, hz, notes[implementation]))
+            except (ValueError, RuntimeError) as e:
+                skipped.append(f"{name} 往返测试（{api}）: {str(e).splitlines()[0]}")
+
+        for implementation, decrypt in (("openssl", False), ("openssl-dec", True)):
+            if decrypt and not roundtrip:
+                continue
+            try:
+                speeds = openssl_speed(name, sizes, seconds=max(1, round(min_seconds)), decrypt=decrypt)
+            except RuntimeError as e:
+                skipped.append(f"{name} {implementation}: {e}")
+                speeds = {}
+            for size, value in speeds.items():
+                note = f"按{OPENSSL_SPEED_MAX}B结果" if size > OPENSSL_SPEED_MAX else ""
+                rows.append(_row(name, implementation, size, value, hz, note))
+
+        if name.startswith("SM4") and shutil.which("gmssl"):
+            for size in sizes:
+                if size > GMSSL_MAX_SIZE:
+                    continue
+                try:
+                    rows.append(_row(name, "gmssl", size, gmssl_speed(name, size, min_seconds), hz, "含进程启动"))
+                except RuntimeError as e:
+                    skipped.append(f"{name} gmssl: {e}")
+                    break
+
+        for candidate in generated.get(name, []):
+            for size in sizes:
+                if size > TEXT_MAX_LEN:
+                    continue
+                try:
+                    value = bench_generated(candidate, size, min_seconds, work_dir=work_dir)
+                except RuntimeError as e:
+                    skipped.append(f"{name} {candidate['exec_path']}: {e}")
+                    break
+                rows.append(_row(name, f"generated:{candidate['exec_path']}", size, value, hz, "含进程启动"))
+
+    if hybrid:
+        try:
+            for size in sizes:
+                seal, open_ = bench_hybrid(size, min_seconds, work_dir=work_dir)
+                rows.append(_row("HYBRID", "seal", size, seal, hz, "RSA-2048 OAEP + AES-256-GCM，文件读写，含进程启动"))
+                rows.append(_row("HYBRID", "open", size, open_, hz, "含RSA私钥解封与标签校验"))
+            speeds = openssl_speed("HYBRID", sizes, seconds=max(1, round(min_seconds)), cipher="aes-256-gcm")
+            for size, value in speeds.items():
+                note = f"aes-256-gcm，按{OPENSSL_SPEED_MAX}B结果" if size > OPENSSL_SPEED_MAX else "aes-256-gcm"
+                rows.append(_row("HYBRID", "openssl", size, value, hz, note))
+        except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+            skipped.append(f"HYBRID: {str(e).splitlines()[0]}")
+
+    rsa_rows = []
+    if rsa_bits:
+        try:
+            reference = openssl_speed_rsa(rsa_bits, seconds=max(1, round(min_seconds)))
+        except RuntimeError as e:
+            skipped.append(f"RSA openssl: {e}")
+            reference = {}
+        for bits in rsa_bits:
+            try:
+                decrypt_ops, encrypt_ops = bench_rsa(bits, min_seconds, work_dir=work_dir)
+            except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+                skipped.append(f"RSA-{bits}: {str(e).splitlines()[0]}")
+                continue
+            private_ops, public_ops = reference.get(bits, (None, None))
+            rsa_rows.append({
+                "bits": bits,
+                "decrypt_per_second": decrypt_ops,
+                "encrypt_per_second": encrypt_ops,
+                "openssl_private_per_second": private_ops,
+                "openssl_public_per_second": public_ops,
+            })
+
+    return {"cpu_mhz": mhz, "min_seconds": min_seconds, "results": rows, "rsa": rsa_rows, "skipped": skipped}
+
+
+def format_table(report):
+    """把报告格式化为文本表格；每行附上同算法同大小下相对openssl的速度比（解密行对比openssl-dec）"""
+    reference = {(r["name"], r["size"], r["implementation"]): r["bytes_per_second"]
+                 for r in report["results"] if r["implementation"] in ("openssl", "openssl-dec")}
+    lines = []
+    if report["results"]:
+        lines.append(f"{'算法':<8} {'实现':<12} {'大小':>8} {'MB/s':>10} {'cycles/B':>9} {'对比openssl':>11}  备注")
+    for r in report["results"]:
+        cpb = f"{r['cycles_per_byte']:.2f}" if r["cycles_per_byte"] is not None else "-"
+        base = "openssl-dec" if r["implementation"].startswith("dec-") else "openssl"
+        ref = reference.get((r["name"], r["size"], base))
+        ratio = f"{r['bytes_per_second'] / ref:.3g}x" if ref else "-"
+        implementation = r["implementation"].split(":")[0]
+        lines.append(f"{r['name']:<8} {implementation:<12} {format_size(r['size']):>8} "
+                     f"{r['mb_per_second']:>10.2f} {cpb:>9} {ratio:>11}  {r['note']}")
+
+    if report.get("rsa"):
+        # RSA按每秒运算次数比较：解密对应openssl的私钥运算，加密对应公钥运算
+        if lines:
+            lines.append("")
+        lines.append(f"{'RSA':<8} {'解密/秒':>10} {'openssl私钥/秒':>14} {'比值':>7} "
+                     f"{'加密/秒':>10} {'openssl公钥/秒':>14} {'比值':>7}")
+        for r in report["rsa"]:
+            cells = []
+            for ours, ref in ((r["decrypt_per_second"], r["openssl_private_per_second"]),
+                              (r["encrypt_per_second"], r["openssl_public_per_second"])):
+                cells.append(f"{ours:>10.0f} {ref or 0:>14.0f} {f'{ours / ref:.3g}x' if ref else '-':>7}")
+            lines.append(f"{'RSA-' + str(r['bits']):<8} {cells[0]} {cells[1]}")
+    return "\n".join(lines)
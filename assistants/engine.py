@@ -0,0 +1,673 @@
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+
+import requests
+from retrying import retry
+
+from assistants.evp import check_api, evp_includes, evp_prompt
+from assistants.metrics import LLM_REQUESTS, cache_lookup
+from assistants.runner import CIPHERTEXT_LABEL, HeadlessRunMixin, TIMEOUT_FEEDBACK, is_timeout, run_interactive
+from assistants.trace import span
+
+API_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+COMPILE_FLAGS = "-lcrypto -Wall"
+# 编译缓存目录（位于各助手的工作目录下），按源码与编译参数的哈希保存编译成功的可执行文件
+COMPILE_CACHE_DIR = "compile_cache"
+
+HEX_TO_BYTES_CODE = """
+int hex_to_bytes(const char *hex, unsigned char *bytes, size_t max_len) {
+    size_t len = strlen(hex);
+    if (len % 2 != 0 || len / 2 > max_len) return -1;
+    for (size_t i = 0; i < len; i += 2) {
+        sscanf(hex + i, "%02x", (unsigned int *)&bytes[i/2]);
+    }
+    return len / 2;
+}
+"""
+PAD_CODE = """
+void {name}(unsigned char *data, size_t data_len, size_t block_size, unsigned char *padded, size_t *padded_len) {{
+    *padded_len = data_len + (block_size - data_len % block_size);
+    memcpy(padded, data, data_len);
+    unsigned char pad = block_size - (data_len % block_size);
+    for (size_t i = data_len; i < *padded_len; i++) padded[i] = pad;
+}}
+"""
+GETCHAR_CLEANUP = '\n    { int c; while ((c = getchar()) != \'\\n\' && c != EOF); }'
+# scanf之后紧跟着的清理循环（如 int c; while ((c = getchar()) != '\n' && c != EOF);）
+HAS_GETCHAR_CLEANUP = r'(?!\s*\{?\s*(?:int\s+\w+\s*;\s*)?while\s*\(\s*\(?\s*(?:\w+\s*=\s*)?getchar\(\))'
+
+
+@dataclass(frozen=True)
+class ModeSpec:
+    """一种算法/模式的生成规则：提示词、错误反馈与生成代码的修复规则
+
+    fixups在补充头文件之前对净化后的代码依次执行，post_fixups在补充hex_to_bytes与填充函数之后执行，
+    compile_fixups在编译前执行；每条规则为 rule(spec, code) -> code。
+    feedback(spec, last_error)返回给大模型的修复提示，feedback_replaces为True时修复提示代替默认的用户消息。
+    """
+    algorithm: str
+    mode: str
+    encrypt_func: str
+    needs_iv: bool
+    key_length: int
+    block_size: int
+    iv_type: str
+    header: str
+    pad_func: str
+    prompt: str
+    strip_pattern: str
+    feedback: object
+    feedback_replaces: bool = False
+    fixups: tuple = ()
+    post_fixups: tuple = ()
+    compile_fixups: tuple = ()
+
+    @property
+    def name(self):
+        return f"{self.algorithm}-{self.mode}"
+
+    @property
+    def includes(self):
+        return [
+            '#include <stddef.h>',
+            '#include <stdio.h>',
+            '#include <stdlib.h>',
+            '#include <string.h>',
+            f'#include <{self.header}>',
+            '#pragma GCC diagnostic ignored "-Wdeprecated-declarations"'
+        ]
+
+
+# ---- 通用修复规则 ----
+
+def _strip_comments(spec, code):
+    return re.sub(r'//.*?\n|/\*.*?\*/', '', code, flags=re.DOTALL)
+
+
+def _size_t_lengths(spec, code):
+    # 强制替换int为size_t
+    return re.sub(r'(?<!unsigned )int (\w+len|i)', r'size_t \1', code)
+
+
+def _fix_key_array(spec, code):
+    # 强制替换密钥定义
+    return re.sub(r'unsigned char key\[\d+\]', f'unsigned char key[{spec.key_length}]', code)
+
+
+def _no_max_key_length(spec, code):
+    return code.replace('AES_MAX_KEY_LENGTH', str(spec.key_length))
+
+
+# ---- AES规则 ----
+
+def _aes_iv_input(spec, code):
+    # 确保IV输入提示和处理（中文提示已被净化删除，按读取语句判断）
+    if not re.search(r'scanf\([^;]*hex_iv', code):
+        code = re.sub(
+            r'(?<=scanf\("%64s", hex_key\);)',
+            '\n    printf("请输入16字节十六进制IV（32字符）: ");\n    scanf("%32s", hex_iv);',
+            code
+        )
+    # 添加缓冲区清理（代码中已有清理循环时不再重复添加，否则会多读掉下一行输入）；
+    # 替换参数用函数，GETCHAR_CLEANUP中的C转义字符不被re.sub解释
+    code = re.sub(r'(?<=scanf\("%64s", hex_key\);)' + HAS_GETCHAR_CLEANUP, lambda m: GETCHAR_CLEANUP, code)
+    return re.sub(r'(?<=scanf\("%32s", hex_iv\);)' + HAS_GETCHAR_CLEANUP, lambda m: GETCHAR_CLEANUP, code)
+
+
+def _aes_remove_iv(spec, code):
+    # 确保没有IV相关代码
+    code = re.sub(r'unsigned char iv\[[^\]]+\];', '', code)
+    code = re.sub(r'char hex_iv\[[^\]]+\];', '', code)
+    code = re.sub(r'printf\([^;]+IV[^;]+\);', '', code)
+    return re.sub(r'scanf\([^;]+hex_iv[^;]+\);', '', code)
+
+
+def _aes_feedback(spec, error):
+    if not error:
+        return ""
+    if is_timeout(error):
+        return TIMEOUT_FEEDBACK
+    if "AES_MAX_KEY_LENGTH" in error:
+        return "必须使用unsigned char key[32]，绝对不能用AES_MAX_KEY_LENGTH！"
+    if spec.needs_iv and ("iv" in error.lower() or "IV" in error):
+        return f"{spec.mode}模式必须显示IV输入提示并正确处理IV，不能省略！"
+    return ""
+
+
+AES_PROMPT = """仅输出纯C代码，实现AES-{mode}加密：
+
+1. 头文件（按此顺序）：
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/aes.h>
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+2. 函数：
+- hex_to_bytes：转换十六进制到字节
+- pkcs7_pad：PKCS#7填充
+- main：程序入口
+
+3. 变量强制要求：
+- 密钥：unsigned char key[32]（必须是32字节，禁止使用任何宏）
+- 长度变量：全部使用size_t类型
+- IV：unsigned char iv[16]（必须定义，{mode}模式必需）
+
+4. 输入输出流程（关键要求）：
+1) 显示"请输入32字节十六进制密钥（64字符）: "，然后用scanf读取
+2) 显示"请输入16字节十六进制IV（32字符）: "，然后用scanf读取
+3) 显示"请输入要加密的明文: "，然后用fgets读取
+4) 密文用%02x格式输出，显示"密文: "前缀
+
+5. 加密函数：{encrypt_func}
+
+6. 禁止：
+- 任何注释
+- 任何自然语言
+- 代码标记
+- 使用AES_MAX_KEY_LENGTH
+- 合并输入步骤或省略IV相关处理
+
+只输出C代码！"""
+
+AES_ECB_PROMPT = """仅输出纯C代码，实现AES-ECB加密：
+
+1. 头文件：
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/aes.h>
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+2. 函数：
+- hex_to_bytes：转换十六进制到字节数组
+- pkcs7_pad：PKCS#7填充（块大小16字节）
+- main：程序入口
+
+3. 变量：
+- 密钥：unsigned char key[32]
+- 明文：char plaintext[1024]
+- 密文：unsigned char ciphertext[1024]
+- 长度变量：size_t类型
+
+4. 输入输出：
+- 密钥：提示"请输入32字节十六进制密钥（64字符）: "
+- 明文：提示"请输入要加密的明文: "
+- 密文：提示"密文: "，%02x格式输出
+
+5. 加密函数：AES_ecb_encrypt
+
+6. 注意：
+- ECB模式不需要IV，禁止出现任何IV相关代码
+- 禁止使用AES_MAX_KEY_LENGTH
+- 不要任何注释和多余内容
+
+只输出C代码！"""
+
+
+def _aes_spec(mode):
+    encrypt_func = f"AES_{mode.lower()}_encrypt"
+    needs_iv = mode != "ECB"
+    return ModeSpec(
+        algorithm="AES",
+        mode=mode,
+        encrypt_func=encrypt_func,
+        needs_iv=needs_iv,
+        key_length=32,
+        block_size=16,
+        iv_type="unsigned char iv[16]" if needs_iv else None,
+        header="openssl/aes.h",
+        pad_func="pkcs7_pad",
+        prompt=AES_PROMPT.format(mode=mode, encrypt_func=encrypt_func) if needs_iv else AES_ECB_PROMPT,
+        strip_pattern=r'//.*?\n|/\*.*?\*/|```c|```|[\u4e00-\u9fa5](?![：:])',
+        feedback=_aes_feedback,
+        fixups=(_fix_key_array, _size_t_lengths),
+        post_fixups=(_aes_iv_input,) if needs_iv else (_aes_remove_iv,),
+        compile_fixups=(_no_max_key_length, _strip_comments),
+    )
+
+
+# ---- DES规则 ----
+
+def _des_iv_type(spec, code):
+    return re.sub(r'unsigned char iv\[\d+\]', 'DES_cblock iv;', code)
+
+
+def _des_remove_iv(spec, code):
+    # 移除任何IV定义
+    return re.sub(r'(DES_cblock|unsigned char) iv\[[^\]]*\];', '', code)
+
+
+def _des_num(spec, code):
+    # 确保包含num变量定义（CFB/OFB的第6个参数）
+    if 'int num = 8;' not in code:
+        code = re.sub(r'(DES_key_schedule schedule;)', r'\1\n    int num = 8;', code)
+    return code
+
+
+def _des_fgets(spec, code):
+    # 修复输入方式
+    if 'fgets' not in code:
+        code = code.replace('scanf', 'fgets')
+        if 'strcspn' not in code:
+            names = ("hex_key", "hex_iv") if spec.needs_iv else ("hex_key",)
+            for name in names:
+                code = code.replace(f'fgets({name}, sizeof({name}), stdin);',
+                                    f'fgets({name}, sizeof({name}), stdin); {name}[strcspn({name}, "\\n")] = \'\\0\';')
+    return code
+
+
+def _des_compile_iv_type(spec, code):
+    code = code.replace('unsigned char iv[8];', 'DES_cblock iv;')
+    return code.replace('unsigned char iv[', 'DES_cblock iv; // 修正IV类型\n    unsigned char ')
+
+
+def _des_feedback(lines, spec, error):
+    if error and "incompatible pointer type" in error:
+        return "修复以下问题，只输出纯C代码：\n" + "".join(f"- {line}\n" for line in lines)
+    if is_timeout(error):
+        return f"修复以下问题，只输出纯C代码：\n- {TIMEOUT_FEEDBACK}\n"
+    return ""
+
+
+DES_PROMPT = """仅输出纯C代码，不包含任何其他内容。
+必须满足：
+
+1. 头文件（按此顺序）：
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/des.h>
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+2. 函数：
+- hex_to_bytes：转换十六进制到字节
+- pkcs5_pad：PKCS#5填充（块大小8字节）
+- main：程序入口
+
+3. 变量强制要求：
+- 密钥：unsigned char key[8]
+- IV：DES_cblock iv（不是unsigned char数组，用于{encrypt_func}）
+- 长度变量：全部使用size_t类型
+- 密钥调度表：DES_key_schedule schedule
+{num_variable}
+4. 输入输出：
+- 密钥：16个十六进制字符
+- IV：16个十六进制字符，用hex_to_bytes转换到DES_cblock类型变量
+- 明文：字符串输入（用fgets读取）
+- 密文：%02x格式输出，显示"密文: "前缀
+
+5. 加密函数调用要求：
+对于{encrypt_func}：
+- 第5个参数必须是DES_cblock*类型（IV参数）
+{num_argument}- 正确传递所有参数类型
+
+6. 禁止：
+- 任何注释
+- 任何自然语言
+- 代码标记
+- 非代码内容
+
+只输出C代码！"""
+
+DES_ECB_PROMPT = """仅输出纯C代码，不包含任何其他内容。
+必须满足：
+
+1. 头文件（按此顺序）：
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/des.h>
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+2. 函数：
+- hex_to_bytes：转换十六进制到字节
+- pkcs5_pad：PKCS#5填充（块大小8字节）
+- main：程序入口
+
+3. 变量强制要求：
+- 密钥：unsigned char key[8]
+- 长度变量：全部使用size_t类型
+- 密钥调度表：DES_key_schedule schedule
+
+4. 输入输出：
+- 密钥：16个十六进制字符
+- 明文：字符串输入（用fgets读取）
+- 密文：%02x格式输出，显示"密文: "前缀
+
+5. 加密函数调用要求：
+使用DES_ecb_encrypt，不需要IV参数
+
+6. 禁止：
+- 任何注释
+- 任何自然语言
+- 代码标记
+- 非代码内容
+- IV相关代码
+
+只输出C代码！"""
+
+
+def _des_spec(mode):
+    encrypt_func = f"DES_{mode.lower()}_encrypt"
+    needs_iv = mode != "ECB"
+    # CFB/OFB的加密函数多一个加密位数参数
+    needs_num = mode in ("CFB", "OFB")
+    if not needs_iv:
+        prompt = DES_ECB_PROMPT
+        feedback_lines = ("ECB模式不需要IV", "DES_ecb_encrypt调用参数正确")
+    else:
+        prompt = DES_PROMPT.format(
+            encrypt_func=encrypt_func,
+            num_variable=f"- 加密位数变量：int num = 8;（用于{encrypt_func}第6个参数）\n" if needs_num else "",
+            num_argument="- 第6个参数为加密位数（使用int num = 8）\n" if needs_num else "",
+        )
+        feedback_lines = (
+            "IV必须定义为DES_cblock iv（不是unsigned char iv[8]）",
+            f"{encrypt_func}的第5个参数必须是DES_cblock*类型",
+        ) + (("必须定义int num = 8;作为第6个参数",) if needs_num else ()) + (
+            "使用hex_to_bytes将输入的IV十六进制字符串转换到DES_cblock变量",
+        ) + (() if needs_num else ("添加用户输入提示（密钥、IV、明文）",))
+    iv_fixup = _des_iv_type if needs_iv else _des_remove_iv
+    num_fixups = (_des_num,) if needs_num else ()
+    return ModeSpec(
+        algorithm="DES",
+        mode=mode,
+        encrypt_func=encrypt_func,
+        needs_iv=needs_iv,
+        key_length=8,
+        block_size=8,
+        iv_type="DES_cblock iv" if needs_iv else None,
+        header="openssl/des.h",
+        pad_func="pkcs5_pad",
+        prompt=prompt,
+        strip_pattern=r'//.*?\n|/\*.*?\*/|```c|```|[\u4e00-\u9fa5]',
+        feedback=partial(_des_feedback, feedback_lines),
+        feedback_replaces=True,
+        fixups=(iv_fixup, _size_t_lengths) + num_fixups,
+        post_fixups=(_des_fgets,),
+        compile_fixups=(_strip_comments, _des_compile_iv_type if needs_iv else _des_remove_iv) + num_fixups,
+    )
+
+
+MODE_SPECS = {spec.name: spec for spec in
+              [_aes_spec(mode) for mode in ("ECB", "CBC", "CFB", "OFB")]
+              + [_des_spec(mode) for mode in ("ECB", "CBC", "CFB", "OFB")]}
+
+
+class CodeRejected(ValueError):
+    """大模型输出不符合要求，不能作为候选代码（消息反馈给下一次生成）"""
+
+
+class CodeGenMixin(HeadlessRunMixin):
+    """大模型生成C代码的公共路径：请求、净化修复与编译，各算法的助手都走这一条路径
+
+    子类实现 _messages() 返回对话消息，_fix_code(raw_code) 返回净化修复后的代码
+    （不符合要求时抛出CodeRejected），并指定compile_flags；__init__中调用 _init_codegen()。
+    大模型请求共用self.session（为None时每次新建连接）；编译结果按源码与编译参数的哈希缓存在
+    工作目录的compile_cache中，大模型温度为0，相同的代码再次出现时不必重新调用gcc；
+    self.metrics累计生成与编译的次数、耗时和缓存命中数。
+    """
+    api_url = API_URL
+    model = "glm-3-turbo"
+    compile_flags = COMPILE_FLAGS
+
+    def _init_codegen(self):
+        self.metrics_lock = threading.Lock()
+        self.metrics = {"generate": 0, "generate_seconds": 0.0, "compile": 0, "compile_seconds": 0.0,
+                        "compile_cache_hits": 0}
+
+    @property
+    def name(self):
+        return f"{self.algorithm}-{self.mode}"
+
+    def _count(self, stage, start):
+        with self.metrics_lock:
+            self.metrics[stage] += 1
+            self.metrics[f"{stage}_seconds"] += time.perf_counter() - start
+
+    @retry(stop_max_attempt_number=3, wait_fixed=2000)
+    def _request_code(self):
+        """请求大模型并净化修复代码，返回 (代码, 消息)；不修改助手状态，流水线在后台线程中调用"""
+        payload = {
+            "model": self.model,
+            "messages": self._messages(),
+            "temperature": 0.0
+        }
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+        start = time.perf_counter()
+        response = None
+        try:
+            with span("http", model=payload["model"]):
+                response = (self.session or requests).post(
+                    self.api_url,
+                    headers=headers,
+                    json=payload,
+                    timeout=60
+                )
+                response.raise_for_status()
+                raw_code = response.json()["choices"][0]["message"]["content"]
+            with span("sanitize"):
+                code = self._fix_code(raw_code)
+            return code, "代码生成成功"
+        except CodeRejected as e:
+            return "", str(e)
+        except Exception as e:
+            return "", f"API错误: {str(e)}"
+        finally:
+            self._count("generate", start)
+            LLM_REQUESTS.inc(algorithm=self.name, status=getattr(response, "status_code", None) or "error")
+
+    def _compile_source(self, c_code, base):
+        """把c_code写入工作目录并编译，返回None或编译错误；成功时记录可执行文件路径
+
+        源码与可执行文件先写到本线程独有的临时路径，编译成功后再重命名：共用工作目录的其他助手
+        （batch与serve中同一算法/模式的其他任务）正在运行的程序不会被覆盖，也不会读到写了一半的文件。
+        """
+        code_path = os.path.join(self.work_dir, f"{base}.c")
+        exec_path = os.path.join(self.work_dir, base)
+        tmp_id = f"tmp{os.getpid()}-{threading.get_ident()}"
+        tmp_code, tmp_exec = os.path.join(self.work_dir, f"{base}.{tmp_id}.c"), f"{exec_path}.{tmp_id}"
+        with open(tmp_code, "w") as f:
+            f.write(c_code)
+
+        start = time.perf_counter()
+        try:
+            error = self._compile_cached(c_code, tmp_code, tmp_exec)
+        finally:
+            self._count("compile", start)
+        if error is not None:
+            os.remove(tmp_code)
+            return error.replace(tmp_code, code_path)
+
+        os.chmod(tmp_exec, 0o755)
+        os.replace(tmp_code, code_path)
+        os.replace(tmp_exec, exec_path)
+        self.exec_path = exec_path
+        return None
+
+    def _compile_cached(self, c_code, code_path, exec_path):
+        """编译code_path到exec_path，返回None或编译错误；相同源码与编译参数直接复用缓存的可执行文件"""
+        cache_dir = os.path.join(self.work_dir, COMPILE_CACHE_DIR)
+        cached = os.path.join(cache_dir, hashlib.sha256(f"{self.compile_flags}\0{c_code}".encode()).hexdigest())
+        hit = os.path.exists(cached)
+        cache_lookup("compile", hit)
+        if hit:
+            with self.metrics_lock:
+                self.metrics["compile_cache_hits"] += 1
+            with span("gcc", cached=True):
+                shutil.copy2(cached, exec_path)
+            return None
+
+        compile_cmd = f"gcc {code_path} -o {exec_path} {self.compile_flags}"
+        with span("gcc", cached=False) as result:
+            compile_result = subprocess.run(
+                compile_cmd,
+                shell=True,
+                capture_output=True,
+                text=True
+            )
+            result["ok"] = compile_result.returncode == 0
+        if compile_result.returncode != 0:
+            return compile_result.stderr
+        # 先复制到临时文件再重命名，共用工作目录的其他进程不会读到不完整的缓存文件
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cached}.tmp{os.getpid()}-{threading.get_ident()}"
+        shutil.copy2(exec_path, tmp_path)
+        os.replace(tmp_path, cached)
+        return None
+
+
+class ModeHelper(CodeGenMixin):
+    """按ModeSpec生成、修复并编译对称加密代码的助手，AES/DES各模式的助手类均为其子类
+
+    子类只需指定 spec = MODE_SPECS["AES-CBC"] 等，请求、修复后的编译与缓存见CodeGenMixin。
+    """
+    spec = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.spec is not None:
+            cls.algorithm = cls.spec.algorithm
+            cls.needs_iv = cls.spec.needs_iv
+
+    def __init__(self, api_key, api="legacy"):
+        spec = self.spec
+        self.api_key = api_key
+        self.api = check_api(api)
+        self.mode = spec.mode
+        self.supported_mode = spec.mode
+
+        self.mode_config = {
+            "encrypt_func": spec.encrypt_func,
+            "needs_iv": spec.needs_iv,
+            "key_length": spec.key_length
+        }
+
+        self.work_dir = os.path.join(os.getcwd(), f"{spec.algorithm.lower()}_{spec.mode.lower()}_workdir")
+        os.makedirs(self.work_dir, exist_ok=True)
+
+        self.generated_code = None
+        self.exec_path = None
+        self.retry_count = 0
+        self.max_retry = 5
+        self.last_error = ""
+        self.compilation_errors = []
+        self.code_history = []
+        self._init_codegen()
+
+    def _messages(self):
+        spec = self.spec
+        prompt = spec.prompt
+        if self.api == "evp":
+            prompt = evp_prompt(spec.name, prompt)
+
+        # 错误反馈
+        user_content = f"生成符合要求的{spec.name}加密代码"
+        error_feedback = spec.feedback(spec, self.last_error)
+        if error_feedback:
+            user_content = error_feedback if spec.feedback_replaces else f"{user_content}。错误修复：{error_feedback}"
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": user_content}]
+
+    def _fix_code(self, raw_code):
+        """净化大模型输出并按规则修复：补充头文件、hex_to_bytes与填充函数"""
+        spec = self.spec
+        # 净化会删除中文，先把密文前缀换成ASCII，非交互式运行据此提取密文
+        code = raw_code.replace("密文", CIPHERTEXT_LABEL)
+        code = re.sub(spec.strip_pattern, '', code, flags=re.DOTALL)
+        for rule in spec.fixups:
+            code = rule(spec, code)
+
+        required_includes = spec.includes
+        if self.api == "evp":
+            required_includes += evp_includes(spec.name)
+        code = '\n'.join(required_includes) + '\n\n' + code
+
+        if 'hex_to_bytes' not in code:
+            code += HEX_TO_BYTES_CODE
+        if spec.pad_func not in code:
+            code += PAD_CODE.format(name=spec.pad_func)
+        for rule in spec.post_fixups:
+            code = rule(spec, code)
+        return code.strip()
+
+    def _generate_c_code(self):
+        """生成当前算法/模式的加密代码，返回 (代码, 消息)，失败时代码为空字符串"""
+        code, msg = self._request_code()
+        if code:
+            self.generated_code = code
+        return code, msg
+
+    def _compile(self, code=None):
+        """净化并编译代码，成功时记录可执行文件路径"""
+        spec = self.spec
+        c_code = code or self.generated_code
+        if not c_code:
+            return "无代码可编译"
+
+        # 最终净化
+        for rule in spec.compile_fixups:
+            c_code = rule(spec, c_code)
+
+        # EVP接口的程序与旧版接口分开保存，batch与serve中两种接口的任务可能同时运行各自的程序
+        base = f"{spec.algorithm.lower()}_{spec.mode.lower()}" + ("_evp" if self.api == "evp" else "")
+        error = self._compile_source(c_code, f"{base}_encrypt")
+        if error is not None:
+            self.last_error = error
+            return f"编译失败: {self.last_error}"
+        return "编译成功"
+
+    def _compile_and_run(self, code=None):
+        result = self._compile(code)
+        if result != "编译成功":
+            return result
+
+        print("\n请输入加密信息：")
+        result = run_interactive(self.exec_path)
+        if is_timeout(result):
+            self.last_error = result
+        return result
+
+    def process(self):
+        while self.retry_count < self.max_retry:
+            self.retry_count += 1
+            print(f"\n===== 第 {self.retry_count}/{self.max_retry} 次尝试 ({self.spec.name}) =====")
+
+            code, msg = self._generate_c_code()
+            if not code:
+                print(f"生成失败: {msg}")
+                if input("重试？(y/n): ").lower() != 'y':
+                    return
+                continue
+
+            print("\n生成的代码：")
+            print("-" * 70)
+            print(code)
+            print("-" * 70)
+
+            result = self._compile_and_run(code)
+            if result == "运行成功":
+                print("✅ 加密成功")
+                return
+
+            print(f"❌ 失败: {result}")
+            if self.retry_count < self.max_retry and input("重试？(y/n): ").lower() != 'y':
+                return
+
+        print("⚠️ 已达最大重试次数")
@@ -0,0 +1,36 @@
+import re
+
+from assistants.templates import EVP_CIPHERS, EVP_LEGACY_PROVIDER, TEMPLATE_APIS
+
+
+def check_api(api):
+    """检查助手类的OpenSSL接口选项（legacy为AES_*/DES_*旧版接口，evp为EVP接口）"""
+    if api not in TEMPLATE_APIS:
+        raise ValueError(f"不支持的接口: {api}，支持：{list(TEMPLATE_APIS)}")
+    return api
+
+
+def evp_prompt(name, prompt):
+    """把助手类的旧版接口提示词改写为EVP接口：替换头文件与加密函数要求，保留输入输出约定"""
+    cipher = EVP_CIPHERS[name]
+    iv_arg = "NULL" if name.endswith("ECB") else "iv"
+    section = f"""5. 加密函数：使用EVP接口 {cipher}()，禁止使用AES_*/DES_*旧版加密函数：
+- EVP_CIPHER_CTX *ctx = EVP_CIPHER_CTX_new();
+- EVP_EncryptInit_ex(ctx, {cipher}(), NULL, key, {iv_arg});
+- EVP_CIPHER_CTX_set_padding(ctx, 0);（明文已手动PKCS#7填充）
+- int outl; EVP_EncryptUpdate(ctx, ciphertext, &outl, padded, (int)padded_len);（outl必须是int类型）
+- EVP_CIPHER_CTX_free(ctx);"""
+
+    prompt = prompt.replace("#include <openssl/aes.h>", "#include <openssl/evp.h>")
+    prompt = prompt.replace("#include <openssl/des.h>", "#include <openssl/des.h>\n#include <openssl/evp.h>")
+    prompt = re.sub(r"5\. 加密函数.*?(?=\n\n6\.)", lambda m: section, prompt, flags=re.S)
+    prompt = re.sub(r"\n- 密钥调度表：DES_key_schedule \w+", "", prompt)
+    return re.sub(r"（不是unsigned char数组，用于\w+）", "（不是unsigned char数组）", prompt)
+
+
+def evp_includes(name):
+    """EVP接口代码需要补充的头文件（DES还需在OpenSSL 3中加载legacy提供者）"""
+    includes = ["#include <openssl/evp.h>"]
+    if name.startswith("DES"):
+        includes.append(EVP_LEGACY_PROVIDER)
+    return includes
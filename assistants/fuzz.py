@@ -0,0 +1,243 @@
+import functools
+import random
+import shutil
+import string
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from assistants.kat import BLOCK_SIZES
+from assistants.runner import build_stdin, run_headless
+from assistants.worker import WorkerError, WorkerProcess
+
+# 算法/模式 -> (openssl enc 密码名, 是否PKCS#7填充)；与生成程序的约定一致：AES/DES各模式均填充
+ORACLE_CIPHERS = {
+    "AES-ECB": ("aes-256-ecb", True),
+    "AES-CBC": ("aes-256-cbc", True),
+    "AES-CFB": ("aes-256-cfb", True),
+    "AES-OFB": ("aes-256-ofb", True),
+    "DES-ECB": ("des-ecb", True),
+    "DES-CBC": ("des-cbc", True),
+    "DES-CFB": ("des-cfb", True),
+    "DES-OFB": ("des-ofb", True),
+    "SM4-ECB": ("sm4-ecb", True),
+    "SM4-CBC": ("sm4-cbc", True),
+    "SM4-CTR": ("sm4-ctr", False),
+}
+
+KEY_LENGTHS = {"AES": 32, "DES": 8, "SM4": 16}
+
+# 生成程序用fgets读入1024字节缓冲区，文本明文的最大长度留出换行符和结束符
+TEXT_MAX_LEN = 1000
+BINARY_MAX_LEN = 64 * 1024
+TEXT_ALPHABET = (string.ascii_letters + string.digits + string.punctuation + " ").encode()
+
+
+def pkcs7_pad(data, block_size):
+    pad = block_size - len(data) % block_size
+    return data + bytes([pad]) * pad
+
+
+@functools.lru_cache(maxsize=None)
+def openssl_supports(cipher):
+    """检查本机openssl enc是否支持指定密码（如SM4需要OpenSSL 1.1.1+）"""
+    proc = subprocess.run(["openssl", "list", "-cipher-algorithms"], capture_output=True, text=True)
+    return cipher.lower() in proc.stdout.lower()
+
+
+class OracleError(RuntimeError):
+    """参考实现（openssl enc或gmssl）无法计算期望密文"""
+
+
+def oracle_unavailable(name):
+    """本机没有该算法/模式的参考实现时返回原因，否则返回None"""
+    cipher, _ = ORACLE_CIPHERS[name]
+    if not shutil.which("openssl"):
+        return "未找到openssl命令"
+    if name.startswith("SM4") and not openssl_supports(cipher) and not shutil.which("gmssl"):
+        return f"本机openssl enc不支持{cipher}，也未安装gmssl"
+    return None
+
+
+def oracle_encrypt(name, key, iv, plaintext):
+    """用本机openssl enc（SM4在openssl不支持时使用gmssl）计算期望密文"""
+    cipher, padded = ORACLE_CIPHERS[name]
+    block_size = BLOCK_SIZES[name.split("-")[0]]
+
+    if name.startswith("SM4") and not openssl_supports(cipher) and shutil.which("gmssl"):
+        # gmssl sm4_cbc 自带PKCS#7填充，sm4_ctr 不填充
+        cmd = ["gmssl", cipher.replace("-", "_"), "-encrypt", "-key", key.hex()]
+        if iv is not None:
+            cmd += ["-iv", iv.hex()]
+        proc = subprocess.run(cmd, input=plaintext, capture_output=True)
+    else:
+        data = pkcs7_pad(plaintext, block_size) if padded else plaintext
+        cmd = ["openssl", "enc", f"-{cipher}", "-nopad", "-K", key.hex()]
+        if iv is not None:
+            cmd += ["-iv", iv.hex()]
+        if name.startswith("DES"):
+            cmd += ["-provider", "legacy", "-provider", "default"]
+        proc = subprocess.run(cmd, input=data, capture_output=True)
+    if proc.returncode != 0:
+        raise OracleError(f"参考实现运行失败: {proc.stderr.decode(errors='replace')}")
+    return proc.stdout
+
+
+def generate_cases(name, count, seed=0, text_only=True):
+    """生成随机用例 (key, iv, plaintext)：先覆盖空输入与块边界长度，再随机长度"""
+    rng = random.Random(seed)
+    algorithm, mode = name.split("-")
+    block_size = BLOCK_SIZES[algorithm]
+    max_len = TEXT_MAX_LEN if text_only else BINARY_MAX_LEN
+
+    lengths = [0, 1, block_size - 1, block_size, block_size + 1,
+               2 * block_size - 1, 2 * block_size, 2 * block_size + 1, max_len - 1, max_len]
+    while len(lengths) < count:
+        lengths.append(rng.randint(0, max_len))
+
+    cases = []
+    for length in lengths[:count]:
+        key = bytes(rng.getrandbits(8) for _ in range(KEY_LENGTHS[algorithm]))
+        iv = None if mode == "ECB" else bytes(rng.getrandbits(8) for _ in range(block_size))
+        if text_only:
+            plaintext = bytes(rng.choice(TEXT_ALPHABET) for _ in range(length))
+        else:
+            plaintext = bytes(rng.getrandbits(8) for _ in range(length))
+        cases.append((key, iv, plaintext))
+    return cases
+
+
+class _Target:
+    """在子进程中运行候选程序：生成程序按次运行，工作进程常驻复用"""
+
+    def __init__(self, candidate):
+        self.candidate = candidate
+        self.worker = WorkerProcess(candidate["exec_path"]) if candidate["interface"] == "worker" else None
+
+    def encrypt(self, key, iv, plaintext):
+        if self.worker:
+            try:
+                return self.worker.encrypt(key, iv, plaintext), ""
+            except WorkerError as e:
+                self.worker.close()
+                self.worker = WorkerProcess(self.candidate["exec_path"])
+                return None, str(e)
+        result = run_headless(self.candidate["exec_path"], build_stdin(key, iv, plaintext))
+        return (result.ciphertext, "") if result.ok else (None, result.error)
+
+    def fails(self, name, case):
+        expected = oracle_encrypt(name, *case)
+        actual, error = self.encrypt(*case)
+        return actual != expected, expected, actual, error
+
+    def close(self):
+        if self.worker:
+            self.worker.close()
+
+
+def minimize(target, name, case):
+    """缩减失败用例：先尽量缩短明文，再把字节替换为'A'，保持失败不变"""
+    key, iv, plaintext = case
+    block_size = BLOCK_SIZES[name.split("-")[0]]
+
+    changed = True
+    while changed and plaintext:
+        changed = False
+        for size in sorted({0, 1, block_size - 1, block_size, len(plaintext) // 2, len(plaintext) - 1}):
+            if size >= len(plaintext):
+                continue
+            if target.fails(name, (key, iv, plaintext[:size]))[0]:
+                plaintext = plaintext[:size]
+                changed = True
+                break
+
+    for i in range(len(plaintext)):
+        if plaintext[i] != ord("A"):
+            simpler = plaintext[:i] + b"A" + plaintext[i + 1:]
+            if target.fails(name, (key, iv, simpler))[0]:
+                plaintext = simpler
+    return key, iv, plaintext
+
+
+def fuzz_batch(candidate, cases, max_minimize=3):
+    """在子进程中对一批用例做差分测试，返回 (失败用例（已缩减）, 耗时)"""
+    start = time.perf_counter()
+    name = candidate["name"]
+    target = _Target(candidate)
+    failures = []
+    try:
+        for case in cases:
+            failed, expected, actual, error = target.fails(name, case)
+            if not failed:
+                continue
+            if len(failures) < max_minimize:
+                case = minimize(target, name, case)
+                _, expected, actual, error = target.fails(name, case)
+            key, iv, plaintext = case
+            failures.append({
+                "key": key.hex(),
+                "iv": iv.hex() if iv is not None else None,
+                "plaintext": plaintext.hex(),
+                "expected": expected.hex(),
+                "actual": actual.hex() if actual is not None else None,
+                "error": error,
+            })
+    finally:
+        target.close()
+    return failures, time.perf_counter() - start
+
+
+def run_fuzz(candidates, cases_per_candidate=200, workers=None, seed=0, batch_size=25):
+    """把所有候选程序的用例分批放入进程池并发测试，返回汇总与各候选的失败用例
+
+    本机没有参考实现（或参考实现运行失败）的候选不计入用例数，报告的oracle_error为原因。
+    """
+    candidates = [c for c in candidates if c["name"] in ORACLE_CIPHERS]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        submitted = []
+        for candidate in candidates:
+            reason = oracle_unavailable(candidate["name"])
+            if reason:
+                submitted.append((candidate, 0, [], reason))
+                continue
+            cases = generate_cases(candidate["name"], cases_per_candidate, seed=seed,
+                                   text_only=candidate["interface"] != "worker")
+            futures = [executor.submit(fuzz_batch, candidate, cases[i:i + batch_size])
+                       for i in range(0, len(cases), batch_size)]
+            submitted.append((candidate, len(cases), futures, ""))
+
+        reports = []
+        for candidate, count, futures, oracle_error in submitted:
+            failures, busy = [], 0.0
+            for future in futures:
+                try:
+                    batch_failures, elapsed = future.result()
+                except OracleError as e:
+                    # 参考实现运行失败：跳过该候选的其余用例，继续测试下一个候选
+                    oracle_error = str(e)
+                    for rest in futures:
+                        rest.cancel()
+                    break
+                failures.extend(batch_failures)
+                busy += elapsed
+            if oracle_error:
+                count, failures, busy = 0, [], 0.0
+            reports.append(dict(
+                candidate,
+                cases=count,
+                failed=len(failures),
+                busy_seconds=busy,
+                cases_per_second=count / busy if busy > 0 else 0.0,
+                failures=failures,
+                oracle_error=oracle_error,
+            ))
+
+    elapsed = time.perf_counter() - start
+    total = sum(r["cases"] for r in reports)
+    return {
+        "cases": total,
+        "elapsed": elapsed,
+        "cases_per_second": total / elapsed if elapsed > 0 else 0.0,
+        "reports": reports,
+    }
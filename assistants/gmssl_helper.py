@@ -3,8 +3,244 @@ import json
 import subprocess
 import os
 import re
+from string import Template
+from assistants.engine import CodeGenMixin, CodeRejected
+from assistants.runner import HeadlessRunMixin, TIMEOUT_FEEDBACK, is_timeout, run_interactive
+from assistants.templates import TEMPLATE_LIBS
 
-class GmSSLHelper:
+# 大模型输出不符合要求（未使用多块接口、硬编码密钥）时生成失败消息的前缀
+CODE_REJECTED = "生成的代码不符合要求"
+
+# SM4各模式使用的GmSSL 3.x多块接口（一次调用处理整个缓冲区，而不是逐块循环）
+SM4_MODES = {
+    "ECB": {
+        "encrypt_func": "sm4_encrypt_blocks",
+        "prototype": "void sm4_encrypt_blocks(const SM4_KEY *key, const uint8_t *in, size_t nblocks, uint8_t *out)",
+        "needs_iv": False,
+        "pad_len": "text_len + SM4_BLOCK_SIZE - text_len % SM4_BLOCK_SIZE",
+        "crypt": "sm4_encrypt_blocks(&sm4_key, padded, padded_len / SM4_BLOCK_SIZE, ciphertext);",
+    },
+    "CBC": {
+        "encrypt_func": "sm4_cbc_encrypt_blocks",
+        "prototype": "void sm4_cbc_encrypt_blocks(const SM4_KEY *key, uint8_t iv[16], const uint8_t *in, size_t nblocks, uint8_t *out)",
+        "needs_iv": True,
+        "pad_len": "text_len + SM4_BLOCK_SIZE - text_len % SM4_BLOCK_SIZE",
+        "crypt": "sm4_cbc_encrypt_blocks(&sm4_key, iv, padded, padded_len / SM4_BLOCK_SIZE, ciphertext);",
+    },
+    # CTR是流模式，不填充，密文与明文等长
+    "CTR": {
+        "encrypt_func": "sm4_ctr_encrypt",
+        "prototype": "void sm4_ctr_encrypt(const SM4_KEY *key, uint8_t ctr[16], const uint8_t *in, size_t inlen, uint8_t *out)",
+        "needs_iv": True,
+        "pad_len": "text_len",
+        "crypt": "sm4_ctr_encrypt(&sm4_key, iv, padded, padded_len, ciphertext);",
+    },
+}
+
+SM4_READ_IV = r"""
+    char hex_iv[65] = {0};
+    uint8_t iv[SM4_BLOCK_SIZE];
+    printf("请输入16字节十六进制IV（32字符）: ");
+    if (scanf("%64s", hex_iv) != 1 || hex_to_bytes(hex_iv, iv, SM4_BLOCK_SIZE) != 0) {
+        printf("错误：IV必须是32个十六进制字符\n");
+        return 1;
+    }"""
+
+# SM4代码模板：用户输入密钥/IV，ECB/CBC使用PKCS#7填充，一次调用多块接口加密
+SM4_CODE_TEMPLATE = Template(r"""#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <gmssl/sm4.h>
+
+int hex_to_bytes(const char *hex, uint8_t *bytes, size_t len) {
+    if (strlen(hex) != len * 2) return -1;
+    for (size_t i = 0; i < len; i++) {
+        unsigned int b;
+        if (sscanf(hex + 2 * i, "%2x", &b) != 1) return -1;
+        bytes[i] = (uint8_t)b;
+    }
+    return 0;
+}
+
+int main() {
+    char hex_key[65] = {0};
+    char plaintext[2048] = {0};
+    uint8_t key[SM4_KEY_SIZE];
+    SM4_KEY sm4_key;
+
+    printf("请输入16字节十六进制密钥（32字符）: ");
+    if (scanf("%64s", hex_key) != 1 || hex_to_bytes(hex_key, key, SM4_KEY_SIZE) != 0) {
+        printf("错误：密钥必须是32个十六进制字符\n");
+        return 1;
+    }$read_iv
+    { int c; while ((c = getchar()) != '\n' && c != EOF); }
+
+    printf("请输入要加密的明文: ");
+    if (fgets(plaintext, sizeof(plaintext), stdin) == NULL) plaintext[0] = '\0';
+    plaintext[strcspn(plaintext, "\n")] = '\0';
+
+    size_t text_len = strlen(plaintext);
+    size_t padded_len = $pad_len;
+    uint8_t *padded = malloc(padded_len + SM4_BLOCK_SIZE);
+    uint8_t *ciphertext = malloc(padded_len + SM4_BLOCK_SIZE);
+    if (!padded || !ciphertext) {
+        printf("错误：内存分配失败\n");
+        return 1;
+    }
+    memcpy(padded, plaintext, text_len);
+    memset(padded + text_len, (int)(padded_len - text_len), padded_len - text_len);
+
+    sm4_set_encrypt_key(&sm4_key, key);
+    $crypt
+
+    printf("密文: ");
+    for (size_t i = 0; i < padded_len; i++) {
+        printf("%02x", ciphertext[i]);
+    }
+    printf("\n");
+
+    free(padded);
+    free(ciphertext);
+    return 0;
+}
+""")
+
+
+def sm4_code_template(mode):
+    """生成指定模式的SM4参考代码"""
+    config = SM4_MODES[mode]
+    return SM4_CODE_TEMPLATE.substitute(
+        read_iv=SM4_READ_IV if config["needs_iv"] else "",
+        pad_len=config["pad_len"],
+        crypt=config["crypt"],
+    )
+
+
+class SM4Helper(CodeGenMixin):
+    """SM4各模式的加密代码生成助手，请求、编译与缓存见CodeGenMixin"""
+    algorithm = "SM4"
+    compile_flags = "-O2 -Wall " + " ".join(TEMPLATE_LIBS["gmssl"])
+
+    def __init__(self, api_key, mode="CBC"):
+        self.api_key = api_key
+        self.mode = mode.upper()
+        if self.mode not in SM4_MODES:
+            raise ValueError(f"不支持的SM4模式: {mode}，支持：{list(SM4_MODES.keys())}")
+        self.mode_config = SM4_MODES[self.mode]
+        self.needs_iv = self.mode_config["needs_iv"]
+        self.work_dir = os.path.join(os.getcwd(), f"sm4_{self.mode.lower()}_workdir")
+        os.makedirs(self.work_dir, exist_ok=True)
+
+        self.generated_code = None
+        self.exec_path = None
+        self.retry_count = 0
+        self.max_retry = 5
+        self.last_error = ""
+        self._init_codegen()
+
+    def _generate_c_code(self):
+        """基于模板生成SM4加密代码，返回 (代码, 消息)，失败时代码为空字符串"""
+        code, msg = self._request_code()
+        if code:
+            self.generated_code = code
+        elif msg.startswith(CODE_REJECTED):
+            # 把不符合要求的原因反馈给下一次生成
+            self.last_error = msg
+        return code, msg
+
+    def _messages(self):
+        """要求使用GmSSL多块加密接口的提示词，附带参考模板与上次失败原因"""
+        code_template = sm4_code_template(self.mode)
+        encrypt_func = self.mode_config["encrypt_func"]
+        padding = "不填充，密文与明文等长" if self.mode == "CTR" else "PKCS#7填充（块大小16字节）"
+        system_prompt = f"""生成纯C代码，实现SM4-{self.mode}加密，严格匹配GmSSL 3.x的SM4接口：
+1. 密钥设置：void sm4_set_encrypt_key(SM4_KEY *key, const uint8_t raw_key[16])
+2. 加密函数：{self.mode_config["prototype"]}
+3. 必须一次调用{encrypt_func}处理整个缓冲区，禁止逐块循环调用sm4_encrypt
+4. 填充：{padding}
+5. 输入输出：scanf读取十六进制密钥""" + ("和IV" if self.needs_iv else "") + f"""，fgets读取明文，密文用%02x格式输出，显示"密文: "前缀
+6. 使用SM4_BLOCK_SIZE和SM4_KEY_SIZE宏
+7. 只返回可编译的纯代码，无注释和解释"""
+
+        user_content = f"生成SM4-{self.mode}加密代码，基于模板：\n{code_template}"
+        if self.last_error:
+            if is_timeout(self.last_error):
+                user_content += f"\n错误修复：{TIMEOUT_FEEDBACK}"
+            else:
+                user_content += f"\n上次失败原因：{self.last_error[:500]}"
+        return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_content}]
+
+    def _fix_code(self, raw_code):
+        """去掉代码块标记与注释，没有使用多块接口或硬编码了密钥时抛出CodeRejected"""
+        encrypt_func = self.mode_config["encrypt_func"]
+        clean_code = re.sub(r'```c|```|//.*$', '', raw_code, flags=re.MULTILINE)
+        problems = []
+        if encrypt_func + "(" not in clean_code:
+            problems.append(f"没有调用{encrypt_func}一次处理整个缓冲区")
+        if "scanf" not in clean_code:
+            problems.append("没有用scanf读取十六进制密钥" + ("和IV" if self.needs_iv else "") + "（不能硬编码）")
+        if problems:
+            raise CodeRejected(f"{CODE_REJECTED}：" + "；".join(problems))
+        if '#include <gmssl/sm4.h>' not in clean_code:
+            clean_code = '#include <gmssl/sm4.h>\n' + clean_code
+        return clean_code.strip()
+
+    def _compile(self, code=None):
+        """编译代码，成功时记录可执行文件路径"""
+        c_code = code or self.generated_code
+        if not c_code:
+            return "没有有效的代码可运行"
+
+        error = self._compile_source(c_code, f"sm4_{self.mode.lower()}_encrypt")
+        if error is not None:
+            self.last_error = error
+            return f"编译失败: {self.last_error}"
+        return "编译成功"
+
+    def _compile_and_run(self, code=None):
+        result = self._compile(code)
+        if result != "编译成功":
+            return result
+
+        print("\n请输入加密信息：")
+        result = run_interactive(self.exec_path, check_returncode=True)
+        if is_timeout(result):
+            self.last_error = result
+        return result
+
+    def process(self):
+        while self.retry_count < self.max_retry:
+            self.retry_count += 1
+            print(f"\n===== 第 {self.retry_count}/{self.max_retry} 次尝试 (SM4-{self.mode}) =====")
+
+            code, msg = self._generate_c_code()
+            if not code:
+                print(f"生成失败: {msg}")
+                if input("重试？(y/n): ").lower() != 'y':
+                    return
+                continue
+
+            print("\n生成的代码：")
+            print("-" * 70)
+            print(code)
+            print("-" * 70)
+
+            result = self._compile_and_run(code)
+            if result == "运行成功":
+                print("✅ 加密成功")
+                return
+
+            print(f"❌ 失败: {result}")
+            if "gmssl/sm4.h" in result:
+                print("💡 请确认已安装GmSSL 3.x（make && sudo make install && sudo ldconfig /usr/local/lib）")
+            if self.retry_count < self.max_retry and input("重试？(y/n): ").lower() != 'y':
+                return
+
+        print("⚠️ 已达最大重试次数")
+
+
+class GmSSLHelper(HeadlessRunMixin):
+    """旧版SM4助手：固定生成内置密钥、零填充的CTR代码，新代码请使用SM4Helper"""
     def __init__(self, api_key, algorithm):
         self.api_key = api_key
         self.algorithm = algorithm  # 仅支持SM4
@@ -12,6 +248,10 @@ class GmSSLHelper:
         self.work_dir = os.path.join(os.getcwd(), f"{algorithm}_workdir")
         os.makedirs(self.work_dir, exist_ok=True)
         self.generated_code = None
+        self.exec_path = None
+        self.retry_count = 0
+        self.max_retry = 5
+        self.last_error = ""
 
     def _generate_c_code(self):
         """生成完全匹配GmSSL 3.2.1接口的SM4代码"""
@@ -90,11 +330,15 @@ int main() {
         3. 使用SM4_BLOCK_SIZE和SM4_KEY_SIZE宏
         4. 只返回可编译的纯代码，无注释和解释"""
 
+        user_content = f"生成SM4加密代码，基于模板：\n{code_template}"
+        if is_timeout(self.last_error):
+            user_content += f"\n错误修复：{TIMEOUT_FEEDBACK}"
+
         payload = {
             "model": "glm-3-turbo",
             "messages": [
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"生成SM4加密代码，基于模板：\n{code_template}"}
+                {"role": "user", "content": user_content}
             ]
         }
 
@@ -104,7 +348,7 @@ int main() {
         }
 
         try:
-            response = requests.post(
+            response = (self.session or requests).post(
                 self.api_url,
                 headers=headers,
                 json=payload,
@@ -119,7 +363,8 @@ int main() {
         except Exception as e:
             return "", f"API请求失败: {str(e)}"
 
-    def _compile_and_run(self, code=None):
+    def _compile(self, code=None):
+        """编译代码，成功时记录可执行文件路径"""
         c_code = code or self.generated_code
         if not c_code:
             return "没有有效的代码可运行"
@@ -142,18 +387,32 @@ int main() {
             text=True
         )
         if compile_result.returncode != 0:
+            self.last_error = compile_result.stderr
             return (f"编译失败:\n{compile_result.stderr}\n"
                     f"确认GmSSL版本正确：\n"
                     f"cd GmSSL && git checkout v3.2.1 && make clean && make && sudo make install\n"
                     f"sudo ldconfig /usr/local/lib")
 
         os.chmod(exec_path, 0o755)
+        self.exec_path = exec_path
+        return "编译成功"
+
+    def _compile_and_run(self, code=None):
+        result = self._compile(code)
+        if result != "编译成功":
+            return result
+
         print("\n📌 请在下方输入要加密的明文：")
-        try:
-            exit_code = os.system(exec_path)
-            return "加密完成" if exit_code == 0 else f"运行出错，退出代码: {exit_code}"
-        except Exception as e:
-            return f"运行失败: {str(e)}"
+        result = run_interactive(self.exec_path, check_returncode=True)
+        if is_timeout(result):
+            self.last_error = result
+        return "加密完成" if result == "运行成功" else result
+
+    def _headless_input(self, key, iv, plaintext):
+        """当前模板使用内置密钥和计数器，仅从标准输入读取明文"""
+        if b"\n" in plaintext:
+            raise ValueError("明文不能包含换行符（生成程序使用fgets按行读取明文）")
+        return plaintext + b"\n"
 
     def process(self, generate_only=True, code=None):
         if generate_only:
@@ -0,0 +1,228 @@
+import os
+
+from assistants.stream import STREAM_CHUNK, run_stream_process
+from assistants.templates import build_binary
+
+# 信封格式（整数为大端）：
+#   "CAE1" | 封装密钥长度(2字节) | RSA-OAEP封装的AES-256密钥 | 12字节nonce | AES-256-GCM密文 | 16字节认证标签
+# 魔数、封装密钥与nonce作为GCM的附加认证数据，篡改任何部分都会导致解密失败
+HYBRID_MAGIC = b"CAE1"
+# 单个nonce下GCM最多加密 2^36-32 字节（约64GiB）
+HYBRID_MAX_BYTES = (1 << 36) - 32
+
+# 混合加密程序：hybrid seal|open [分段大小]，PEM密钥通过环境变量 HYBRID_KEY_PEM 传入。
+# seal为每条消息随机生成AES密钥与nonce，用公钥做OAEP封装后按分段流式加密；
+# open用私钥解开AES密钥后流式解密，始终保留最后16字节作为标签，到输入结束时才校验，
+# 校验失败时退出代码非零（此前已输出的明文必须丢弃）
+HYBRID_SOURCE = r"""#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/err.h>
+#include <openssl/evp.h>
+#include <openssl/pem.h>
+#include <openssl/rand.h>
+#include <openssl/rsa.h>
+
+#define MAGIC "CAE1"
+#define AES_KEY_LEN 32
+#define NONCE_LEN 12
+#define TAG_LEN 16
+#define MAX_BYTES ((((uint64_t)1) << 36) - 32)
+
+static int fail(const char *msg) {
+    fprintf(stderr, "%s\n", msg);
+    ERR_print_errors_fp(stderr);
+    return 1;
+}
+
+static int read_exact(unsigned char *buf, size_t len) {
+    return fread(buf, 1, len, stdin) == len;
+}
+
+static int write_all(const unsigned char *buf, size_t len) {
+    return len == 0 || fwrite(buf, 1, len, stdout) == len;
+}
+
+static EVP_PKEY_CTX *oaep_ctx(EVP_PKEY *pkey, int seal) {
+    EVP_PKEY_CTX *pctx = EVP_PKEY_CTX_new(pkey, NULL);
+    if (!pctx || (seal ? EVP_PKEY_encrypt_init(pctx) : EVP_PKEY_decrypt_init(pctx)) <= 0
+        || EVP_PKEY_CTX_set_rsa_padding(pctx, RSA_PKCS1_OAEP_PADDING) <= 0) {
+        EVP_PKEY_CTX_free(pctx);
+        return NULL;
+    }
+    return pctx;
+}
+
+static int seal(EVP_PKEY *pkey, unsigned char *in, unsigned char *out, size_t chunk) {
+    unsigned char key[AES_KEY_LEN], tag[TAG_LEN];
+    unsigned char header[4 + 2 + 1024 + NONCE_LEN];
+    if (RAND_bytes(key, AES_KEY_LEN) != 1) return fail("RAND_bytes failed");
+
+    EVP_PKEY_CTX *pctx = oaep_ctx(pkey, 1);
+    size_t wrapped_len = 0;
+    if (!pctx || EVP_PKEY_encrypt(pctx, NULL, &wrapped_len, key, AES_KEY_LEN) <= 0 || wrapped_len > 1024)
+        return fail("RSA-OAEP init failed");
+    memcpy(header, MAGIC, 4);
+    if (EVP_PKEY_encrypt(pctx, header + 6, &wrapped_len, key, AES_KEY_LEN) <= 0)
+        return fail("RSA-OAEP encrypt failed");
+    EVP_PKEY_CTX_free(pctx);
+    header[4] = (unsigned char)(wrapped_len >> 8);
+    header[5] = (unsigned char)wrapped_len;
+    unsigned char *nonce = header + 6 + wrapped_len;
+    if (RAND_bytes(nonce, NONCE_LEN) != 1) return fail("RAND_bytes failed");
+    size_t header_len = 6 + wrapped_len + NONCE_LEN;
+
+    EVP_CIPHER_CTX *ctx = EVP_CIPHER_CTX_new();
+    int outl;
+    if (!ctx || !EVP_EncryptInit_ex(ctx, EVP_aes_256_gcm(), NULL, key, nonce)
+        || !EVP_EncryptUpdate(ctx, NULL, &outl, header, (int)header_len))
+        return fail("AES-GCM init failed");
+    OPENSSL_cleanse(key, AES_KEY_LEN);
+    if (!write_all(header, header_len)) return fail("write failed");
+
+    uint64_t total = 0;
+    for (;;) {
+        size_t len = fread(in, 1, chunk, stdin);
+        if (ferror(stdin)) return fail("read failed");
+        total += len;
+        if (total > MAX_BYTES) return fail("input exceeds the AES-GCM limit for one nonce");
+        if (len && (!EVP_EncryptUpdate(ctx, out, &outl, in, (int)len) || !write_all(out, (size_t)outl)))
+            return fail("AES-GCM encrypt failed");
+        if (len < chunk) break;
+    }
+    if (!EVP_EncryptFinal_ex(ctx, out, &outl) || !write_all(out, (size_t)outl)
+        || !EVP_CIPHER_CTX_ctrl(ctx, EVP_CTRL_GCM_GET_TAG, TAG_LEN, tag) || !write_all(tag, TAG_LEN))
+        return fail("AES-GCM finalize failed");
+    EVP_CIPHER_CTX_free(ctx);
+    return 0;
+}
+
+static int open_envelope(EVP_PKEY *pkey, unsigned char *in, unsigned char *out, size_t chunk) {
+    unsigned char key[AES_KEY_LEN + 512];
+    unsigned char header[4 + 2 + 1024 + NONCE_LEN];
+    if (!read_exact(header, 6) || memcmp(header, MAGIC, 4) != 0) return fail("not a hybrid envelope");
+    size_t wrapped_len = ((size_t)header[4] << 8) | header[5];
+    if (wrapped_len > 1024 || !read_exact(header + 6, wrapped_len + NONCE_LEN)) return fail("truncated envelope header");
+    size_t header_len = 6 + wrapped_len + NONCE_LEN;
+
+    EVP_PKEY_CTX *pctx = oaep_ctx(pkey, 0);
+    size_t key_len = sizeof(key);
+    if (!pctx || EVP_PKEY_decrypt(pctx, key, &key_len, header + 6, wrapped_len) <= 0 || key_len != AES_KEY_LEN)
+        return fail("RSA-OAEP unwrap failed");
+    EVP_PKEY_CTX_free(pctx);
+
+    EVP_CIPHER_CTX *ctx = EVP_CIPHER_CTX_new();
+    int outl;
+    if (!ctx || !EVP_DecryptInit_ex(ctx, EVP_aes_256_gcm(), NULL, key, header + 6 + wrapped_len)
+        || !EVP_DecryptUpdate(ctx, NULL, &outl, header, (int)header_len))
+        return fail("AES-GCM init failed");
+    OPENSSL_cleanse(key, sizeof(key));
+
+    /* 缓冲区开头始终保留已读入的最后TAG_LEN字节，输入结束时它们就是认证标签 */
+    size_t have = 0;
+    for (;;) {
+        size_t len = fread(in + have, 1, chunk, stdin);
+        if (ferror(stdin)) return fail("read failed");
+        have += len;
+        if (have > TAG_LEN) {
+            size_t body = have - TAG_LEN;
+            if (!EVP_DecryptUpdate(ctx, out, &outl, in, (int)body) || !write_all(out, (size_t)outl))
+                return fail("AES-GCM decrypt failed");
+            memmove(in, in + body, TAG_LEN);
+            have = TAG_LEN;
+        }
+        if (len < chunk) break;
+    }
+    if (have != TAG_LEN) return fail("truncated envelope");
+    if (!EVP_CIPHER_CTX_ctrl(ctx, EVP_CTRL_GCM_SET_TAG, TAG_LEN, in) || EVP_DecryptFinal_ex(ctx, out, &outl) <= 0)
+        return fail("authentication failed: envelope was modified or the key is wrong");
+    EVP_CIPHER_CTX_free(ctx);
+    return 0;
+}
+
+int main(int argc, char **argv) {
+    if (argc < 2 || (strcmp(argv[1], "seal") != 0 && strcmp(argv[1], "open") != 0)) {
+        fprintf(stderr, "usage: %s seal|open [chunk]\n", argv[0]);
+        return 2;
+    }
+    int sealing = strcmp(argv[1], "seal") == 0;
+    size_t chunk = argc > 2 ? strtoul(argv[2], NULL, 10) : 0;
+    if (chunk < 4096) chunk = 4096;
+    if (chunk > (1 << 30)) chunk = 1 << 30;
+
+    const char *pem = getenv("HYBRID_KEY_PEM");
+    if (!pem) return fail("HYBRID_KEY_PEM is not set");
+    BIO *bio = BIO_new_mem_buf(pem, -1);
+    EVP_PKEY *pkey = sealing ? PEM_read_bio_PUBKEY(bio, NULL, NULL, NULL)
+                             : PEM_read_bio_PrivateKey(bio, NULL, NULL, NULL);
+    BIO_free(bio);
+    if (!pkey || EVP_PKEY_base_id(pkey) != EVP_PKEY_RSA)
+        return fail(sealing ? "invalid RSA public key PEM" : "invalid RSA private key PEM");
+
+    unsigned char *in = malloc(chunk + TAG_LEN), *out = malloc(chunk + TAG_LEN);
+    if (!in || !out) return fail("out of memory");
+    int rc = sealing ? seal(pkey, in, out, chunk) : open_envelope(pkey, in, out, chunk);
+    EVP_PKEY_free(pkey);
+    free(in);
+    free(out);
+    if (rc == 0 && fflush(stdout) != 0) return fail("write failed");
+    return rc;
+}
+"""
+
+
+def build_hybrid(work_dir=None, cflags=("-O2",)):
+    """编译混合加密程序，返回可执行文件路径"""
+    return build_binary("RSA-HYBRID", "envelope", HYBRID_SOURCE, work_dir=work_dir, cflags=cflags)
+
+
+def _key_pem(key):
+    # 接受PEM字节（如密钥池发放的密钥）或PEM文件路径
+    if isinstance(key, bytes):
+        return key.decode()
+    with open(key) as f:
+        return f.read()
+
+
+def _run(command, key, src, dst, chunk_size, work_dir):
+    exec_path = build_hybrid(work_dir=work_dir)
+    env = dict(os.environ, HYBRID_KEY_PEM=_key_pem(key))
+    what = "混合加密" if command == "seal" else "混合解密"
+    return run_stream_process([exec_path, command, str(chunk_size)], env, src, dst, chunk_size, what=what)
+
+
+def hybrid_encrypt_stream(public_key, src, dst, chunk_size=STREAM_CHUNK, work_dir=None):
+    """用RSA公钥（PEM字节或文件路径）把src流式加密为信封写入dst，返回写入的字节数
+
+    每条消息随机生成AES-256密钥，明文大小不受OAEP长度限制，内存占用与输入大小无关。
+    """
+    return _run("seal", public_key, src, dst, chunk_size, work_dir)
+
+
+def hybrid_decrypt_stream(private_key, src, dst, chunk_size=STREAM_CHUNK, work_dir=None):
+    """用RSA私钥解密信封写入dst，返回写入的字节数
+
+    认证标签在输入结束时才能校验，校验失败时抛出RuntimeError，此前写入dst的明文必须丢弃。
+    """
+    return _run("open", private_key, src, dst, chunk_size, work_dir)
+
+
+def hybrid_encrypt_file(public_key, in_path, out_path, chunk_size=STREAM_CHUNK, work_dir=None):
+    """把文件加密为信封文件，返回信封字节数"""
+    if os.path.abspath(in_path) == os.path.abspath(out_path):
+        raise ValueError("输入文件与输出文件不能相同")
+    with open(in_path, "rb") as src, open(out_path, "wb") as dst:
+        return hybrid_encrypt_stream(public_key, src, dst, chunk_size, work_dir)
+
+
+def hybrid_decrypt_file(private_key, in_path, out_path, chunk_size=STREAM_CHUNK, work_dir=None):
+    """解密信封文件，认证失败时删除输出文件并抛出RuntimeError；返回明文字节数"""
+    if os.path.abspath(in_path) == os.path.abspath(out_path):
+        raise ValueError("输入文件与输出文件不能相同")
+    try:
+        with open(in_path, "rb") as src, open(out_path, "wb") as dst:
+            return hybrid_decrypt_stream(private_key, src, dst, chunk_size, work_dir)
+    except RuntimeError:
+        os.remove(out_path)
+        raise
@@ -0,0 +1,293 @@
+import glob
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from assistants.metrics import cache_lookup
+from assistants.runner import build_rsa_path_stdin, build_rsa_pem_stdin, build_stdin, run_headless
+from assistants.templates import EVP_TEMPLATE_SPECS, TEMPLATE_SPECS
+from assistants.worker import WorkerError, WorkerProcess, build_worker
+
+# 向量或判定规则变化时递增，使旧的缓存判定失效
+KAT_VERSION = 1
+
+_NIST_AES256_KEY = "603deb1015ca71be2b73aef0857d77811f352c073b6108d72d9810a30914dff4"
+_NIST_IV = "000102030405060708090a0b0c0d0e0f"
+_NIST_PLAINTEXT = ("6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51"
+                   "30c81c46a35ce411e5fbc1191a0a52eff69f2445df4f9b17ad2b417be66c3710")
+# FIPS 81 示例："Now is the time for all "
+_FIPS81_KEY = "0123456789abcdef"
+_FIPS81_IV = "1234567890abcdef"
+_FIPS81_PLAINTEXT = "4e6f77206973207468652074696d6520666f7220616c6c20"
+_SM4_KEY = "0123456789abcdeffedcba9876543210"
+
+# 已知答案向量（十六进制），iv为None表示该模式不使用IV
+KAT_VECTORS = {
+    "AES-ECB": [{
+        "id": "SP800-38A F.1.5 ECB-AES256", "key": _NIST_AES256_KEY, "iv": None,
+        "plaintext": _NIST_PLAINTEXT,
+        "ciphertext": "f3eed1bdb5d2a03c064b5a7e3db181f8591ccb10d410ed26dc5ba74a31362870"
+                      "b6ed21b99ca6f4f9f153e7b1beafed1d23304b7a39f9f3ff067d8d8f9e24ecc7",
+    }],
+    "AES-CBC": [{
+        "id": "SP800-38A F.2.5 CBC-AES256", "key": _NIST_AES256_KEY, "iv": _NIST_IV,
+        "plaintext": _NIST_PLAINTEXT,
+        "ciphertext": "f58c4c04d6e5f1ba779eabfb5f7bfbd69cfc4e967edb808d679f777bc6702c7d"
+                      "39f23369a9d9bacfa530e26304231461b2eb05e2c39be9fcda6c19078c6a9d1b",
+    }],
+    "AES-CFB": [{
+        "id": "SP800-38A F.3.17 CFB128-AES256", "key": _NIST_AES256_KEY, "iv": _NIST_IV,
+        "plaintext": _NIST_PLAINTEXT,
+        "ciphertext": "dc7e84bfda79164b7ecd8486985d386039ffed143b28b1c832113c6331e5407b"
+                      "df10132415e54b92a13ed0a8267ae2f975a385741ab9cef82031623d55b1e471",
+    }],
+    "AES-OFB": [{
+        "id": "SP800-38A F.4.5 OFB-AES256", "key": _NIST_AES256_KEY, "iv": _NIST_IV,
+        "plaintext": _NIST_PLAINTEXT,
+        "ciphertext": "dc7e84bfda79164b7ecd8486985d38604febdc6740d20b3ac88f6ad82a4fb08d"
+                      "71ab47a086e86eedf39d1c5bba97c4080126141d67f37be8538f5a8be740e484",
+    }],
+    "DES-ECB": [{
+        "id": "FIPS 81 ECB", "key": _FIPS81_KEY, "iv": None, "plaintext": _FIPS81_PLAINTEXT,
+        "ciphertext": "3fa40e8a984d48156a271787ab8883f9893d51ec4b563b53",
+    }],
+    "DES-CBC": [{
+        "id": "FIPS 81 CBC", "key": _FIPS81_KEY, "iv": _FIPS81_IV, "plaintext": _FIPS81_PLAINTEXT,
+        "ciphertext": "e5c7cdde872bf27c43e934008c389c0f683788499a7c05f6",
+    }],
+    "DES-CFB": [{
+        "id": "FIPS 81 CFB-64", "key": _FIPS81_KEY, "iv": _FIPS81_IV, "plaintext": _FIPS81_PLAINTEXT,
+        "ciphertext": "f3096249c7f46e51a69e839b1a92f78403467133898ea622",
+    }],
+    "DES-OFB": [{
+        "id": "FIPS 81 OFB-64", "key": _FIPS81_KEY, "iv": _FIPS81_IV, "plaintext": _FIPS81_PLAINTEXT,
+        "ciphertext": "f3096249c7f46e5135f24a242eeb3d3f3d6d5be3255af8c3",
+    }],
+    "SM4-ECB": [{
+        "id": "GB/T 32907-2016 A.1", "key": _SM4_KEY, "iv": None, "plaintext": _SM4_KEY,
+        "ciphertext": "681edf34d206965e86b3e94f536e4246",
+    }],
+    "SM4-CBC": [{
+        "id": "draft-ribose-cfrg-sm4 CBC", "key": _SM4_KEY, "iv": _NIST_IV,
+        "plaintext": "aaaaaaaabbbbbbbbccccccccddddddddeeeeeeeeffffffffaaaaaaaabbbbbbbb",
+        "ciphertext": "78ebb11cc40b0a48312aaeb2040244cb4cb7016951909226979b0d15dc6a8f6d",
+    }],
+    "SM4-CTR": [{
+        "id": "draft-ribose-cfrg-sm4 CTR", "key": _SM4_KEY, "iv": _NIST_IV,
+        "plaintext": ("aaaaaaaaaaaaaaaabbbbbbbbbbbbbbbbccccccccccccccccdddddddddddddddd"
+                      "eeeeeeeeeeeeeeeeffffffffffffffffaaaaaaaaaaaaaaaabbbbbbbbbbbbbbbb"),
+        "ciphertext": ("ac3236cb970cc20791364c395a1342d1a3cbc1878c6f30cd074cce385cdd70c7"
+                       "f234bc0e24c11980fd1286310ce37b926e02fcd0faa0baf38b2933851d824514"),
+    }],
+}
+
+BLOCK_SIZES = {"AES": 16, "DES": 8, "SM4": 16}
+
+# RSA-OAEP往返测试的明文（2048位密钥、SHA-1 OAEP的上限为214字节）
+RSA_MESSAGES = [b"A", b"CryptoAssist RSA-OAEP round trip", b"x" * 214]
+
+# 助手类编译产物的位置 -> 算法/模式
+# （旧版GmSSLHelper的sm4_encrypt使用内置的ASCII密钥与计数器、零填充，不从输入读取密钥，无法用向量校验，不收集）
+HELPER_BINARIES = {
+    "aes_ecb_workdir/aes_ecb_encrypt": "AES-ECB",
+    "aes_cbc_workdir/aes_cbc_encrypt": "AES-CBC",
+    "aes_cfb_workdir/aes_cfb_encrypt": "AES-CFB",
+    "aes_ofb_workdir/aes_ofb_encrypt": "AES-OFB",
+    "des_ecb_workdir/des_ecb_encrypt": "DES-ECB",
+    "des_cbc_workdir/des_cbc_encrypt": "DES-CBC",
+    "des_cfb_workdir/des_cfb_encrypt": "DES-CFB",
+    "des_ofb_workdir/des_ofb_encrypt": "DES-OFB",
+    "sm4_ecb_workdir/sm4_ecb_encrypt": "SM4-ECB",
+    "sm4_cbc_workdir/sm4_cbc_encrypt": "SM4-CBC",
+    "sm4_ctr_workdir/sm4_ctr_encrypt": "SM4-CTR",
+    "rsa_workdir/rsa_encrypt": "RSA",
+}
+# EVP接口生成的AES/DES程序（与旧版接口的程序分开保存）
+HELPER_BINARIES.update({pattern.replace("_encrypt", "_evp_encrypt"): name
+                        for pattern, name in list(HELPER_BINARIES.items()) if name[:3] in ("AES", "DES")})
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def collect_candidates(root=None, include_templates=False):
+    """收集已编译的候选程序：各助手工作目录中的生成程序，以及（可选）模板工作进程"""
+    root = root or os.getcwd()
+    candidates = []
+    for pattern, name in HELPER_BINARIES.items():
+        for exec_path in sorted(glob.glob(os.path.join(root, pattern))):
+            interface = "headless"
+            if name == "RSA":
+                # 两种RSA助手共用工作目录，按源码判断公钥的输入方式
+                source_path = exec_path + ".c"
+                source = open(source_path).read() if os.path.exists(source_path) else ""
+                interface = "rsa_path" if "fopen" in source else "rsa_pem"
+            candidates.append({"name": name, "exec_path": exec_path, "interface": interface})
+    if include_templates:
+        for api, specs in (("legacy", TEMPLATE_SPECS), ("evp", EVP_TEMPLATE_SPECS)):
+            for name in specs:
+                try:
+                    exec_path = build_worker(name, api=api)
+                except RuntimeError as e:
+                    # 缺少对应的密码库（如未安装GmSSL）时跳过该模板
+                    print(f"⚠️ 跳过{name}（{api}）模板: {str(e).splitlines()[0]}")
+                    continue
+                candidates.append({"name": name, "exec_path": exec_path, "interface": "worker", "api": api})
+    return candidates
+
+
+def _text_safe(vector, block_size):
+    """生成程序用fgets按行读取明文：截取不含换行符和NUL的最长整块前缀"""
+    plaintext = bytes.fromhex(vector["plaintext"])
+    ciphertext = bytes.fromhex(vector["ciphertext"])
+    usable = len(plaintext)
+    for bad in (b"\n", b"\0"):
+        pos = plaintext.find(bad)
+        if pos != -1:
+            usable = min(usable, pos)
+    usable -= usable % block_size
+    return plaintext[:usable], ciphertext[:usable]
+
+
+def _matches(output, expected, block_size):
+    """输出以期望密文开头，且长度为原长或多出一个填充块"""
+    return output[:len(expected)] == expected and len(output) in (len(expected), len(expected) + block_size)
+
+
+def _check_symmetric(candidate):
+    name = candidate["name"]
+    block_size = BLOCK_SIZES[name.split("-")[0]]
+    cases = []
+    worker = WorkerProcess(candidate["exec_path"]) if candidate["interface"] == "worker" else None
+    try:
+        for vector in KAT_VECTORS.get(name, []):
+            key = bytes.fromhex(vector["key"])
+            iv = bytes.fromhex(vector["iv"]) if vector["iv"] else None
+            case = {"vector": vector["id"], "passed": False, "error": ""}
+            if worker:
+                plaintext = bytes.fromhex(vector["plaintext"])
+                expected = bytes.fromhex(vector["ciphertext"])
+                try:
+                    output = worker.encrypt(key, iv, plaintext)
+                except WorkerError as e:
+                    case["error"] = str(e)
+                    cases.append(case)
+                    continue
+            else:
+                plaintext, expected = _text_safe(vector, block_size)
+                result = run_headless(candidate["exec_path"], build_stdin(key, iv, plaintext))
+                if not result.ok:
+                    case["error"] = result.error
+                    cases.append(case)
+                    continue
+                output = result.ciphertext
+            case["passed"] = _matches(output, expected, block_size)
+            if not case["passed"]:
+                case["error"] = f"期望 {expected.hex()}，实际 {output.hex()}"
+            cases.append(case)
+    finally:
+        if worker:
+            worker.close()
+    return cases
+
+
+def _check_rsa(candidate, private_key, public_key):
+    with open(public_key, "rb") as f:
+        pem = f.read()
+    cases = []
+    for message in RSA_MESSAGES:
+        case = {"vector": f"RSA-OAEP round trip ({len(message)} bytes)", "passed": False, "error": ""}
+        if candidate["interface"] == "rsa_path":
+            stdin_data = build_rsa_path_stdin(public_key, message)
+        else:
+            stdin_data = build_rsa_pem_stdin(pem, message)
+        result = run_headless(candidate["exec_path"], stdin_data)
+        if not result.ok:
+            case["error"] = result.error
+            cases.append(case)
+            continue
+        decrypted = subprocess.run(
+            ["openssl", "pkeyutl", "-decrypt", "-inkey", private_key,
+             "-pkeyopt", "rsa_padding_mode:oaep"],
+            input=result.ciphertext,
+            capture_output=True
+        )
+        case["passed"] = decrypted.returncode == 0 and decrypted.stdout == message
+        if not case["passed"]:
+            case["error"] = "私钥解密结果与明文不一致"
+        cases.append(case)
+    return cases
+
+
+def check_candidate(candidate, rsa_keys=None):
+    """对单个候选程序运行全部适用的向量，返回判定结果（在进程池中执行）"""
+    verdict = dict(candidate)
+    try:
+        if candidate["name"] == "RSA":
+            cases = _check_rsa(candidate, *rsa_keys)
+        else:
+            cases = _check_symmetric(candidate)
+    except Exception as e:
+        cases = [{"vector": "-", "passed": False, "error": f"运行错误: {str(e)}"}]
+    verdict["cases"] = cases
+    verdict["passed"] = bool(cases) and all(c["passed"] for c in cases)
+    return verdict
+
+
+def ensure_rsa_keys(work_dir):
+    """生成（或复用）RSA往返测试使用的2048位密钥对"""
+    private_key = os.path.join(work_dir, "kat_rsa_private.pem")
+    public_key = os.path.join(work_dir, "kat_rsa_public.pem")
+    if not (os.path.exists(private_key) and os.path.exists(public_key)):
+        subprocess.run(["openssl", "genpkey", "-algorithm", "RSA", "-pkeyopt", "rsa_keygen_bits:2048",
+                        "-out", private_key], check=True, capture_output=True)
+        subprocess.run(["openssl", "pkey", "-in", private_key, "-pubout", "-out", public_key],
+                       check=True, capture_output=True)
+    return private_key, public_key
+
+
+def run_kat(candidates, workers=None, work_dir=None, use_cache=True):
+    """在进程池中并发检查所有候选程序，判定结果按程序哈希缓存"""
+    work_dir = work_dir or os.path.join(os.getcwd(), "kat_workdir")
+    os.makedirs(work_dir, exist_ok=True)
+    cache_path = os.path.join(work_dir, "kat_cache.json")
+    cache = {}
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+
+    rsa_keys = None
+    if any(c["name"] == "RSA" for c in candidates):
+        rsa_keys = ensure_rsa_keys(work_dir)
+
+    verdicts = [None] * len(candidates)
+    pending = {}
+    for i, candidate in enumerate(candidates):
+        digest = file_sha256(candidate["exec_path"])
+        cache_key = f"{digest}:{candidate['name']}:{candidate['interface']}:{KAT_VERSION}"
+        if use_cache:
+            cache_lookup("kat", cache_key in cache)
+        if cache_key in cache:
+            verdicts[i] = dict(cache[cache_key], exec_path=candidate["exec_path"], sha256=digest, cached=True)
+        else:
+            pending[i] = (cache_key, digest)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {i: executor.submit(check_candidate, candidates[i], rsa_keys) for i in pending}
+            for i, future in futures.items():
+                cache_key, digest = pending[i]
+                verdict = future.result()
+                cache[cache_key] = {k: v for k, v in verdict.items() if k != "exec_path"}
+                verdicts[i] = dict(verdict, sha256=digest, cached=False)
+
+        with open(cache_path, "w") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+    return verdicts
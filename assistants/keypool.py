@@ -0,0 +1,197 @@
+import os
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+# 默认的密钥池目录、密钥长度与每种长度预先生成的数量
+KEYPOOL_DIR = "keypool_workdir"
+KEYPOOL_SIZES = (2048,)
+KEYPOOL_TARGET = 4
+# 后台补充线程在没有取用时的检查间隔（秒）
+REFILL_INTERVAL = 5.0
+
+
+@dataclass
+class KeyPair:
+    """从密钥池取出的RSA密钥对（PEM格式），每个密钥对只发放一次"""
+    bits: int
+    private_pem: bytes
+    public_pem: bytes
+    hit: bool = True
+
+
+def generate_key_pair(bits):
+    """用本机openssl生成一个RSA密钥对，返回 (私钥PEM, 公钥PEM)"""
+    private_pem = subprocess.run(
+        ["openssl", "genpkey", "-algorithm", "RSA", "-pkeyopt", f"rsa_keygen_bits:{bits}"],
+        check=True, capture_output=True
+    ).stdout
+    public_pem = subprocess.run(
+        ["openssl", "pkey", "-pubout"], input=private_pem, check=True, capture_output=True
+    ).stdout
+    return private_pem, public_pem
+
+
+class RSAKeyPool:
+    """预先生成并以PEM文件保存的RSA密钥对池
+
+    密钥对保存在 <work_dir>/<bits>/ 下（<id>.pub.pem 与 <id>.key.pem，私钥文件最后写入，
+    存在即表示密钥对完整）。取用时先把私钥文件原子重命名，多个进程共用同一目录也不会重复发放。
+    池中没有可用密钥时当场生成（记为未命中），后台线程在数量低于target时补充。
+    """
+
+    def __init__(self, work_dir=None, sizes=KEYPOOL_SIZES, target=KEYPOOL_TARGET):
+        self.work_dir = work_dir or os.path.join(os.getcwd(), KEYPOOL_DIR)
+        self.sizes = tuple(int(bits) for bits in sizes)
+        for bits in self.sizes:
+            if bits < 1024 or bits % 8:
+                raise ValueError(f"不支持的RSA密钥长度: {bits}（至少1024位且为8的倍数）")
+            os.makedirs(self._dir(bits), exist_ok=True)
+        self.target = target
+
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.hits = 0
+        self.misses = 0
+        self.generated = {bits: 0 for bits in self.sizes}
+        self.generate_time = {bits: 0.0 for bits in self.sizes}
+
+    def _dir(self, bits):
+        return os.path.join(self.work_dir, str(bits))
+
+    def available(self, bits):
+        """池中指定长度的可用密钥对数量"""
+        return len(self._key_ids(bits))
+
+    def _key_ids(self, bits):
+        names = os.listdir(self._dir(bits))
+        return sorted(name[:-len(".key.pem")] for name in names if name.endswith(".key.pem"))
+
+    def _generate(self, bits):
+        start = time.perf_counter()
+        private_pem, public_pem = generate_key_pair(bits)
+        with self.lock:
+            self.generated[bits] += 1
+            self.generate_time[bits] += time.perf_counter() - start
+        return private_pem, public_pem
+
+    def _store(self, bits, private_pem, public_pem):
+        key_id = uuid.uuid4().hex
+        base = os.path.join(self._dir(bits), key_id)
+        with open(base + ".pub.pem", "wb") as f:
+            f.write(public_pem)
+        tmp_path = base + ".key.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(private_pem)
+        os.replace(tmp_path, base + ".key.pem")
+
+    def _claim(self, bits):
+        for key_id in self._key_ids(bits):
+            base = os.path.join(self._dir(bits), key_id)
+            claimed = f"{base}.claimed-{os.getpid()}-{threading.get_ident()}"
+            try:
+                os.rename(base + ".key.pem", claimed)
+            except FileNotFoundError:
+                # 已被其他线程或进程取走
+                continue
+            with open(claimed, "rb") as f:
+                private_pem = f.read()
+            with open(base + ".pub.pem", "rb") as f:
+                public_pem = f.read()
+            os.remove(claimed)
+            os.remove(base + ".pub.pem")
+            return private_pem, public_pem
+        return None
+
+    def acquire(self, bits=2048):
+        """取出一个指定长度的密钥对，池为空时当场生成"""
+        if bits not in self.sizes:
+            raise ValueError(f"密钥池未配置{bits}位密钥，已配置：{list(self.sizes)}")
+        pair = self._claim(bits)
+        with self.lock:
+            if pair:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self.wake.set()
+        if pair:
+            return KeyPair(bits, *pair)
+        return KeyPair(bits, *self._generate(bits), hit=False)
+
+    def fill(self, bits=None):
+        """同步补充到target个（bits为None时补充所有长度），返回新生成的数量"""
+        count = 0
+        for size in ([bits] if bits else self.sizes):
+            while not self.stopping.is_set() and self.available(size) < self.target:
+                self._store(size, *self._generate(size))
+                count += 1
+        return count
+
+    def _refill_loop(self):
+        while not self.stopping.is_set():
+            try:
+                self.fill()
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"⚠️ RSA密钥池补充失败: {e}")
+            self.wake.wait(REFILL_INTERVAL)
+            self.wake.clear()
+
+    def start(self):
+        """启动后台补充线程（守护线程）"""
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._refill_loop, name="rsa-keypool", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        """返回命中率与各长度的可用数量、生成耗时和补充速度"""
+        with self.lock:
+            requests = self.hits + self.misses
+            sizes = {}
+            for bits in self.sizes:
+                generated, seconds = self.generated[bits], self.generate_time[bits]
+                sizes[bits] = {
+                    "available": self.available(bits),
+                    "target": self.target,
+                    "generated": generated,
+                    "avg_generate_ms": seconds / generated * 1000 if generated else None,
+                    "refill_per_second": generated / seconds if seconds > 0 else None,
+                }
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else None,
+                "sizes": sizes,
+            }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def default_pool():
+    """进程内共享的默认密钥池（当前目录下的keypool_workdir，首次调用时启动后台补充）"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = RSAKeyPool().start()
+        return _default_pool
@@ -0,0 +1,185 @@
+import math
+import os
+import threading
+
+# Prometheus文本格式（0.0.4）的Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 各类耗时直方图的桶上限（秒）
+GENERATE_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+COMPILE_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+RUN_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+ATTEMPT_BUCKETS = (1, 2, 3, 4, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format(value):
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}的标签应为{list(self.labelnames)}，实际为{list(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        with self.lock:
+            return [(self.name, key, (), value) for key, value in sorted(self.values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_labels(self.labelnames, key, extra)} {_format(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        if not self.labelnames:
+            # 没有标签的指标从0开始输出
+            self.values[()] = 0
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    """可增可减的当前值（如在途任务数）"""
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """按桶累计的观测值分布，另记总和与次数"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=RUN_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.values[key] = (counts, total + value)
+
+    def _samples(self):
+        samples = []
+        with self.lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key, (f'le="{_format(bound)}"',), cumulative))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """进程内的指标集合，render()输出Prometheus文本格式"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _add(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"指标已存在: {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=RUN_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write(self, path):
+        """写入文件（先写临时文件再重命名，node_exporter等读取方不会读到写了一半的文件）"""
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = MetricsRegistry()
+
+# 生成流水线（按算法/模式）
+GENERATE_SECONDS = REGISTRY.histogram(
+    "cryptoassist_generate_seconds", "大模型生成一个候选程序的耗时（含净化与修复）", ["algorithm"], GENERATE_BUCKETS)
+COMPILE_SECONDS = REGISTRY.histogram(
+    "cryptoassist_compile_seconds", "编译一个候选程序的耗时", ["algorithm"], COMPILE_BUCKETS)
+VERIFY_SECONDS = REGISTRY.histogram(
+    "cryptoassist_verify_seconds", "对一个候选程序运行已知答案测试的耗时", ["algorithm"], COMPILE_BUCKETS)
+BUILDS = REGISTRY.counter(
+    "cryptoassist_builds_total",
+    "流水线生成次数，result为first_pass（第一个候选即通过）、retried（重试后通过）或failed", ["algorithm", "result"])
+BUILD_ATTEMPTS = REGISTRY.histogram(
+    "cryptoassist_build_attempts", "每次流水线生成用到的候选程序数", ["algorithm"], ATTEMPT_BUCKETS)
+LLM_REQUESTS = REGISTRY.counter(
+    "cryptoassist_llm_requests_total", "大模型API请求数，status为HTTP状态码（连接失败或超时为error）",
+    ["algorithm", "status"])
+
+# 加密任务（batch与serve）
+RUN_SECONDS = REGISTRY.histogram(
+    "cryptoassist_run_seconds", "执行一次加密的耗时（模板工作进程或生成的程序）", ["algorithm", "engine"], RUN_BUCKETS)
+JOBS = REGISTRY.counter("cryptoassist_jobs_total", "加密任务数", ["algorithm", "engine", "result"])
+JOBS_IN_FLIGHT = REGISTRY.gauge("cryptoassist_jobs_in_flight", "正在执行的加密任务数")
+
+# 缓存：compile为生成程序的编译缓存，template为模板程序，build为batch/serve复用已生成的程序，kat为已知答案测试判定
+CACHE_LOOKUPS = REGISTRY.counter("cryptoassist_cache_lookups_total", "缓存查找次数", ["cache", "result"])
+
+# 常驻服务
+HTTP_RESPONSES = REGISTRY.counter("cryptoassist_http_responses_total", "常驻服务的响应数", ["path", "status"])
+REQUESTS_IN_FLIGHT = REGISTRY.gauge("cryptoassist_requests_in_flight", "常驻服务正在处理的请求数")
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
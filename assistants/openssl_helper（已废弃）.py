@@ -3,6 +3,7 @@ import json
 import subprocess
 import os
 import re
+from assistants.keypool import default_pool
 
 class OpenSSLHelper:
     def __init__(self, api_key, algorithm):
@@ -84,11 +85,15 @@ class OpenSSLHelper:
         if compile_result.returncode != 0:
             return f"编译失败:\n{compile_result.stderr}\n请安装OpenSSL: sudo apt install libssl-dev"
 
-        # 运行加密
+        # 运行加密（RSA从密钥池取预先生成的密钥对，避免每次运行都生成2048位密钥）
         os.chmod(exec_path, 0o755)
+        env = None
+        if self.algorithm == "rsa":
+            key_pair = default_pool().acquire(2048)
+            env = dict(os.environ, RSA_PRIVATE_KEY_PEM=key_pair.private_pem.decode())
         print("\n📌 请在下方输入要加密的明文：")
         try:
-            exit_code = os.system(exec_path)
+            exit_code = subprocess.run(exec_path, env=env).returncode
             return "加密完成" if exit_code == 0 else f"加密出错，退出代码: {exit_code}"
         except Exception as e:
             return f"运行失败: {str(e)}"
@@ -106,10 +111,17 @@ int main() {{
     int ciphertext_len;
     RSA *rsa = NULL;
 
-    // 生成RSA密钥
-    rsa = RSA_generate_key(2048, RSA_F4, NULL, NULL);
+    // 优先使用密钥池通过环境变量传入的PEM私钥，未提供时才生成RSA密钥
+    const char *key_pem = getenv("RSA_PRIVATE_KEY_PEM");
+    if (key_pem) {{
+        BIO *bio = BIO_new_mem_buf(key_pem, -1);
+        rsa = PEM_read_bio_RSAPrivateKey(bio, NULL, NULL, NULL);
+        BIO_free(bio);
+    }} else {{
+        rsa = RSA_generate_key(2048, RSA_F4, NULL, NULL);
+    }}
     if (!rsa) {{
-        printf("错误：生成RSA密钥失败\\n");
+        printf("错误：加载或生成RSA密钥失败\\n");
         return 1;
     }}
 
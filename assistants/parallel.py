@@ -0,0 +1,242 @@
+import collections
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from assistants.runner import STREAM_LIMITS, limit_resources
+from assistants.stream import _check_key_iv, build_mmap
+from assistants.templates import get_spec
+from assistants.worker import WorkerPool
+
+# 分片边界按64KiB对齐（页大小与块大小的整数倍，满足mmap偏移要求）
+SHARD_ALIGN = 64 * 1024
+# 小于该大小的输入分片收益不明显，直接单进程处理
+MIN_PARALLEL_SIZE = 4 << 20
+# 流式并行时每个分片的大小（块大小的整数倍），在途分片数为线程数的两倍
+STREAM_SHARD = 4 << 20
+
+
+def _ecb_shard_iv(iv, offset, block_size, previous=None):
+    return None
+
+
+def _ctr_shard_iv(iv, offset, block_size, previous=None):
+    # 计数器按整个IV做大端加法（与OpenSSL/GmSSL的CTR实现一致），溢出时回绕
+    bits = 8 * len(iv)
+    counter = (int.from_bytes(iv, "big") + offset // block_size) % (1 << bits)
+    return counter.to_bytes(len(iv), "big")
+
+
+def _chained_shard_iv(iv, offset, block_size, previous=None):
+    # CBC/CFB解密时每块只依赖前一个密文块，分片的起始IV就是分片前的最后一个密文块
+    return previous if offset else iv
+
+
+# 块之间互不依赖的模式 -> 计算分片起始IV/计数器的函数 (iv, 分片偏移, 块大小, 分片前的最后一个密文块)
+SHARD_IV = {
+    "ECB": _ecb_shard_iv,
+    "CTR": _ctr_shard_iv,
+}
+# 解密还可以并行CBC与CFB（OFB的密钥流依赖前一块的输出，加密解密都只能顺序处理）
+DECRYPT_SHARD_IV = dict(SHARD_IV, CBC=_chained_shard_iv, CFB=_chained_shard_iv)
+
+
+def is_parallel(name, decrypt=False):
+    """该算法/模式的加密（decrypt为True时为解密）是否可以分片并行"""
+    return name.upper().split("-")[-1] in (DECRYPT_SHARD_IV if decrypt else SHARD_IV)
+
+
+def _check_parallel(name, decrypt):
+    if not is_parallel(name, decrypt):
+        table = DECRYPT_SHARD_IV if decrypt else SHARD_IV
+        what = "解密" if decrypt else "加密"
+        raise ValueError(f"{name}的{what}不能分片并行，支持的模式：{list(table.keys())}")
+
+
+def _unpad(data, block_size):
+    pad = data[-1] if data else 0
+    if not 0 < pad <= block_size or data[-pad:] != bytes([pad]) * pad:
+        raise RuntimeError("解密失败：填充无效（密钥错误或密文已损坏）")
+    return data[:-pad]
+
+
+def shard_ranges(full, shards, align=SHARD_ALIGN):
+    """把前full字节（整块部分）切成不超过shards个按align对齐的分片，返回 [(偏移, 长度)]"""
+    step = -(-full // max(shards, 1))
+    step = max(align, -(-step // align) * align)
+    ranges = [(offset, min(step, full - offset)) for offset in range(0, full, step)]
+    # 最后一个分片负责尾部与填充，输入不足一块时也需要它
+    return ranges or [(0, 0)]
+
+
+def _run_shards(exec_path, key, in_path, out_path, shards):
+    # shards: [(偏移, 长度, 起始IV)]，各分片进程同时运行，返回错误信息列表
+    procs = []
+    for offset, length, shard_iv in shards:
+        env = dict(os.environ, STREAM_KEY=key.hex(), STREAM_IV=(shard_iv or b"").hex())
+        procs.append(subprocess.Popen(
+            [exec_path, in_path, out_path, str(offset), str(length)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=env,
+            preexec_fn=limit_resources(STREAM_LIMITS["cpu_seconds"], STREAM_LIMITS["memory_bytes"])
+        ))
+
+    errors = []
+    for proc in procs:
+        stderr = proc.stderr.read()
+        proc.wait()
+        if proc.returncode != 0:
+            errors.append(f"退出代码{proc.returncode}: {stderr.decode(errors='replace').strip()}")
+    return errors
+
+
+def parallel_encrypt_file(name, key, iv, in_path, out_path, jobs=None, work_dir=None, api="legacy"):
+    """把可并行模式的文件加密拆成按块对齐的分片，各分片由独立进程直接写入预先扩展的输出文件
+
+    各分片按自身偏移计算起始IV/计数器，输出与单进程加密逐字节一致；返回密文字节数。
+    """
+    name = name.upper()
+    _check_parallel(name, decrypt=False)
+    _check_key_iv(name, key, iv)
+    if os.path.abspath(in_path) == os.path.abspath(out_path):
+        raise ValueError("输入文件与输出文件不能相同")
+
+    spec = get_spec(name, api)
+    block_size = spec["block_size"]
+    size = os.path.getsize(in_path)
+    full = size // block_size * block_size
+    padded = size + block_size - size % block_size if spec["padding"] else size
+    jobs = jobs or os.cpu_count() or 1
+    if size < MIN_PARALLEL_SIZE:
+        jobs = 1
+
+    exec_path = build_mmap(name, work_dir=work_dir, api=api)
+    with open(out_path, "wb") as f:
+        f.truncate(padded)
+
+    shard_iv = SHARD_IV[name.split("-")[-1]]
+    shards = [(offset, length, shard_iv(iv, offset, block_size)) for offset, length in shard_ranges(full, jobs)]
+    errors = _run_shards(exec_path, key, in_path, out_path, shards)
+    if errors:
+        raise RuntimeError(f"并行加密失败: {'; '.join(errors)}")
+    return padded
+
+
+def parallel_decrypt_file(name, key, iv, in_path, out_path, jobs=None, work_dir=None, api="legacy"):
+    """把ECB/CBC/CFB/CTR模式的文件解密拆成按块对齐的分片，由多个进程同时解密
+
+    CBC/CFB分片的起始IV取自分片前的最后一个密文块；处理最后一个分片的进程检查填充并把输出截断为明文大小。
+    填充无效时删除输出文件并抛出RuntimeError；返回明文字节数。
+    """
+    name = name.upper()
+    _check_parallel(name, decrypt=True)
+    _check_key_iv(name, key, iv)
+    if os.path.abspath(in_path) == os.path.abspath(out_path):
+        raise ValueError("输入文件与输出文件不能相同")
+
+    spec = get_spec(name, api)
+    block_size = spec["block_size"]
+    size = os.path.getsize(in_path)
+    full = size // block_size * block_size
+    if spec["padding"] and (size == 0 or size != full):
+        raise ValueError(f"{name}密文长度应为{block_size}字节的非零整数倍，实际为{size}字节")
+    jobs = jobs or os.cpu_count() or 1
+    if size < MIN_PARALLEL_SIZE:
+        jobs = 1
+
+    exec_path = build_mmap(name, work_dir=work_dir, api=api, decrypt=True)
+    with open(out_path, "wb") as f:
+        f.truncate(size)
+
+    shard_iv = DECRYPT_SHARD_IV[name.split("-")[-1]]
+    shards = []
+    with open(in_path, "rb") as f:
+        for offset, length in shard_ranges(full, jobs):
+            previous = None
+            if offset:
+                f.seek(offset - block_size)
+                previous = f.read(block_size)
+            shards.append((offset, length, shard_iv(iv, offset, block_size, previous)))
+    errors = _run_shards(exec_path, key, in_path, out_path, shards)
+    if errors:
+        os.remove(out_path)
+        raise RuntimeError(f"并行解密失败: {'; '.join(errors)}")
+    return os.path.getsize(out_path)
+
+
+def _read_full(src, size):
+    chunks = []
+    while size > 0:
+        chunk = src.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _parallel_stream(name, key, iv, src, dst, jobs, shard_size, work_dir, api, decrypt):
+    name = name.upper()
+    _check_parallel(name, decrypt)
+    _check_key_iv(name, key, iv)
+
+    spec = get_spec(name, api)
+    block_size = spec["block_size"]
+    shard_size = max(block_size, shard_size // block_size * block_size)
+    jobs = jobs or os.cpu_count() or 1
+    shard_iv = (DECRYPT_SHARD_IV if decrypt else SHARD_IV)[name.split("-")[-1]]
+
+    with WorkerPool(name, size=jobs, work_dir=work_dir, api=api, decrypt=decrypt) as pool, \
+            ThreadPoolExecutor(max_workers=jobs) as executor:
+        def encrypt_shard(offset, data, previous, last):
+            ciphertext = pool.encrypt(key, shard_iv(iv, offset, block_size), data)
+            # 工作进程对每条记录都做填充，中间分片（整块）去掉多出的填充块
+            return ciphertext if last or not spec["padding"] else ciphertext[:len(data)]
+
+        def decrypt_shard(offset, data, previous, last):
+            plaintext = pool.decrypt(key, shard_iv(iv, offset, block_size, previous), data)
+            # 工作进程不去除填充，只有最后一个分片带填充
+            return _unpad(plaintext, block_size) if last and spec["padding"] else plaintext
+
+        crypt_shard = decrypt_shard if decrypt else encrypt_shard
+        pending = collections.deque()
+        written = offset = 0
+        previous = None
+        data = _read_full(src, shard_size)
+        while True:
+            # 预读下一个分片，以判断当前分片是否为最后一个（只有它需要填充或去除填充）
+            following = _read_full(src, shard_size) if len(data) == shard_size else b""
+            last = not following
+            if decrypt and spec["padding"] and (len(data) % block_size or (last and offset + len(data) == 0)):
+                raise ValueError(f"{name}密文长度应为{block_size}字节的非零整数倍")
+            pending.append(executor.submit(crypt_shard, offset, data, previous, last))
+            offset += len(data)
+            previous = data[-block_size:]
+            while pending and (last or len(pending) > 2 * jobs):
+                result = pending.popleft().result()
+                dst.write(result)
+                written += len(result)
+            if last:
+                break
+            data = following
+    dst.flush()
+    return written
+
+
+def parallel_encrypt_stream(name, key, iv, src, dst, jobs=None, shard_size=STREAM_SHARD, work_dir=None, api="legacy"):
+    """把可并行模式的流式输入按固定大小切成分片，由多个线程交给常驻工作进程加密，按顺序写入dst
+
+    各分片按自身在流中的偏移计算起始IV/计数器，在途分片数有上限，内存占用与输入大小无关；
+    输出与单线程流式加密逐字节一致，返回写入的密文字节数。
+    """
+    return _parallel_stream(name, key, iv, src, dst, jobs, shard_size, work_dir, api, decrypt=False)
+
+
+def parallel_decrypt_stream(name, key, iv, src, dst, jobs=None, shard_size=STREAM_SHARD, work_dir=None, api="legacy"):
+    """把ECB/CBC/CFB/CTR模式的流式密文按固定大小切成分片，由多个线程交给常驻解密进程处理，按顺序写入dst
+
+    CBC/CFB分片的起始IV取自上一个分片的最后一个密文块，最后一个分片去除填充；
+    填充无效时抛出RuntimeError（此前写入dst的明文必须丢弃），返回写入的明文字节数。
+    """
+    return _parallel_stream(name, key, iv, src, dst, jobs, shard_size, work_dir, api, decrypt=True)
@@ -0,0 +1,285 @@
+import hashlib
+import os
+import queue
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+
+from assistants import trace
+from assistants.kat import KAT_VECTORS, check_candidate
+from assistants.metrics import BUILD_ATTEMPTS, BUILDS, COMPILE_SECONDS, GENERATE_SECONDS, VERIFY_SECONDS
+
+# 各阶段之间队列的长度，同时限制在途候选数（生成中的候选最多领先正在编译/校验的候选depth个）
+PIPELINE_DEPTH = 1
+PIPELINE_STAGES = ("generate", "compile", "verify")
+STAGE_LABELS = {"generate": "生成", "compile": "编译", "verify": "校验"}
+# 阶段线程等待队列时检查停止标志的间隔（秒）
+POLL_INTERVAL = 0.05
+
+
+@dataclass
+class Candidate:
+    """流水线中的一个候选程序；timings为各阶段相对流水线开始的 (开始, 结束) 秒数"""
+    index: int
+    code: str = ""
+    feedback: str = ""
+    exec_path: str = None
+    passed: bool = False
+    error: str = ""
+    timings: dict = field(default_factory=dict)
+
+
+class BuildPipeline:
+    """生成 → 编译 → 校验 三个阶段各由一个线程处理，阶段之间用有界队列连接
+
+    当前候选编译或校验时，下一个候选的大模型请求已经开始；下一个候选只能用到开始生成时已知的错误反馈。
+    生成阶段调用helper._request_code()，不修改助手状态：有候选通过后不等待仍在进行的推测生成，
+    它的结果直接丢弃。重试次数、生成的代码与可执行文件在流水线结束时统一写回助手。
+    编译成功的程序复制为 <可执行文件>.candidate<N> 后再校验，不会被后续候选的编译覆盖；
+    第一个通过已知答案测试的候选恢复为助手的可执行文件与源码，其余候选的副本被删除。
+    """
+
+    def __init__(self, helper, name, max_candidates=None, depth=PIPELINE_DEPTH):
+        self.helper = helper
+        self.name = name.upper()
+        if self.name not in KAT_VECTORS:
+            raise ValueError(f"{self.name}没有已知答案向量，无法在流水线中校验，支持：{list(KAT_VECTORS.keys())}")
+        self.max_candidates = max_candidates or helper.max_retry
+        self.slots = threading.Semaphore(depth + 1)
+        self.to_compile = queue.Queue(maxsize=depth)
+        self.to_verify = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self.candidates = []
+        self.winner = None
+        self.seen = {}
+        self.started = None
+        self.elapsed = None
+
+    def _now(self):
+        return time.perf_counter() - self.started
+
+    def _put(self, q, item):
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return None
+
+    def _finish(self, candidate):
+        # 候选失败或通过，释放在途名额；失败时把错误反馈给下一次生成
+        if not candidate.passed and candidate.error:
+            self.helper.last_error = candidate.error
+        self.slots.release()
+
+    def _generate_stage(self):
+        for index in range(1, self.max_candidates + 1):
+            while not self.slots.acquire(timeout=POLL_INTERVAL):
+                if self.stop.is_set():
+                    return
+            candidate = Candidate(index, feedback=self.helper.last_error)
+            with self.lock:
+                # 与_run中的停止和统计互斥：停止之后不再加入新的候选
+                if self.stop.is_set():
+                    return
+                self.candidates.append(candidate)
+            start = self._now()
+            try:
+                with trace.span("generate", attempt=index):
+                    code, msg = self.helper._request_code()
+            except Exception as e:
+                code, msg = "", f"生成错误: {str(e)}"
+            end = self._now()
+            GENERATE_SECONDS.observe(end - start, algorithm=self.name)
+            with self.lock:
+                if self.stop.is_set():
+                    # 流水线已结束，丢弃这次推测生成的结果（该候选显示为已取消）
+                    return
+                candidate.timings["generate"] = (start, end)
+            candidate.code = code
+            if not code:
+                candidate.error = msg
+            if not self._put(self.to_compile, candidate):
+                return
+        self._put(self.to_compile, None)
+
+    def _compile_stage(self):
+        while True:
+            candidate = self._get(self.to_compile)
+            if candidate is None:
+                self._put(self.to_verify, None)
+                return
+            if not candidate.code:
+                self._finish(candidate)
+                continue
+            digest = hashlib.sha256(candidate.code.encode()).hexdigest()
+            if digest in self.seen:
+                candidate.error = f"与第{self.seen[digest]}个候选的代码相同"
+                self._finish(candidate)
+                continue
+            self.seen[digest] = candidate.index
+
+            start = self._now()
+            try:
+                with trace.span("compile", attempt=candidate.index):
+                    result = self.helper._compile(candidate.code)
+                if result == "编译成功":
+                    candidate.exec_path = f"{self.helper.exec_path}.candidate{candidate.index}"
+                    shutil.copy2(self.helper.exec_path, candidate.exec_path)
+                    if os.path.exists(self.helper.exec_path + ".c"):
+                        shutil.copy2(self.helper.exec_path + ".c", candidate.exec_path + ".c")
+                else:
+                    candidate.error = result
+            except Exception as e:
+                candidate.error = f"编译错误: {str(e)}"
+            end = self._now()
+            candidate.timings["compile"] = (start, end)
+            COMPILE_SECONDS.observe(end - start, algorithm=self.name)
+            if candidate.error:
+                self._finish(candidate)
+            elif not self._put(self.to_verify, candidate):
+                return
+
+    def _verify_stage(self):
+        while True:
+            candidate = self._get(self.to_verify)
+            if candidate is None:
+                self.done.set()
+                return
+            start = self._now()
+            with trace.span("verify", attempt=candidate.index) as result:
+                verdict = check_candidate({"name": self.name, "exec_path": candidate.exec_path,
+                                           "interface": "headless"})
+                result["passed"] = verdict["passed"]
+            end = self._now()
+            candidate.timings["verify"] = (start, end)
+            VERIFY_SECONDS.observe(end - start, algorithm=self.name)
+            candidate.passed = verdict["passed"]
+            if candidate.passed:
+                with self.lock:
+                    self.winner = candidate
+                self.done.set()
+                return
+            errors = [f"{case['vector']}: {case['error']}" for case in verdict["cases"] if not case["passed"]]
+            candidate.error = f"已知答案测试不通过：{'; '.join(errors)}"
+            self._finish(candidate)
+
+    def run(self):
+        """运行流水线直到有候选通过或候选数用完，返回通过的Candidate（没有时返回None）"""
+        with trace.span("pipeline", algorithm=self.name) as result:
+            winner = self._run()
+            result.update(candidates=len(self.candidates), passed=winner is not None)
+        self._trace_attempts()
+        self._record_build(winner)
+        return winner
+
+    def _run(self):
+        self.started = time.perf_counter()
+        threads = [threading.Thread(target=getattr(self, f"_{stage}_stage"), name=f"pipeline-{stage}", daemon=True)
+                   for stage in PIPELINE_STAGES]
+        for thread in threads:
+            thread.start()
+        self.done.wait()
+        with self.lock:
+            self.stop.set()
+            winner = self.winner
+            candidates = list(self.candidates)
+        self.elapsed = self._now()
+        # 生成线程可能还在等待大模型响应，不等它结束（它不修改助手状态）；编译与校验很快结束
+        for thread in threads[1:]:
+            thread.join()
+
+        self.helper.retry_count += len(candidates)
+        for candidate in candidates:
+            if candidate is winner or not candidate.exec_path:
+                continue
+            for path in (candidate.exec_path, candidate.exec_path + ".c"):
+                if os.path.exists(path):
+                    os.remove(path)
+        if winner:
+            exec_path = winner.exec_path[:-len(f".candidate{winner.index}")]
+            if os.path.exists(winner.exec_path + ".c"):
+                os.replace(winner.exec_path + ".c", exec_path + ".c")
+            os.replace(winner.exec_path, exec_path)
+            self.helper.exec_path = exec_path
+            self.helper.generated_code = winner.code
+        return winner
+
+    def _record_build(self, winner):
+        # 通过时计到通过的候选为止（之后推测生成的候选不算），失败时计全部候选
+        if winner:
+            attempts = winner.index
+            result = "first_pass" if winner.index == 1 else "retried"
+        else:
+            attempts = len(self.candidates)
+            result = "failed"
+        BUILDS.inc(algorithm=self.name, result=result)
+        BUILD_ATTEMPTS.observe(attempts, algorithm=self.name)
+
+    def _trace_attempts(self):
+        # 每个候选的生成、编译、校验分属不同线程，整个尝试记为一个跨线程的时间段
+        tracer = trace.active()
+        if tracer is None:
+            return
+        with self.lock:
+            candidates = list(self.candidates)
+        for c in candidates:
+            if not c.timings:
+                continue
+            start = self.started + min(begin for begin, _ in c.timings.values())
+            end = self.started + max(finish for _, finish in c.timings.values())
+            tracer.complete_async(f"{self.name} #{c.index}", f"{id(self):x}-{c.index}", start, end, cat="attempt",
+                                  args={"passed": c.passed, "error": c.error.splitlines()[0] if c.error else ""})
+
+    def stats(self):
+        """返回墙钟时间、各阶段累计耗时与重叠时间，以及每个候选的阶段时间线"""
+        with self.lock:
+            candidates = list(self.candidates)
+        busy = {stage: 0.0 for stage in PIPELINE_STAGES}
+        for candidate in candidates:
+            for stage, (start, end) in candidate.timings.items():
+                busy[stage] += end - start
+        elapsed = self.elapsed or 0.0
+        return {
+            "name": self.name,
+            "elapsed": elapsed,
+            "busy": busy,
+            # 各阶段累计耗时超出墙钟时间的部分，即阶段之间重叠执行的时间
+            "overlap": max(0.0, sum(busy.values()) - elapsed),
+            "candidates": [{
+                "index": c.index,
+                "passed": c.passed,
+                "error": c.error,
+                "feedback": c.feedback,
+                "timings": {stage: list(span) for stage, span in c.timings.items()},
+            } for c in candidates],
+        }
+
+    def format_timeline(self):
+        """把各候选的阶段时间线格式化为文本"""
+        stats = self.stats()
+        lines = [f"📊 {stats['name']} 流水线：{len(stats['candidates'])} 个候选，墙钟 {stats['elapsed']:.2f} 秒，"
+                 f"各阶段累计 {sum(stats['busy'].values()):.2f} 秒（重叠 {stats['overlap']:.2f} 秒）"]
+        for c in stats["candidates"]:
+            spans = "  ".join(f"{STAGE_LABELS[stage]} {start:.2f}–{end:.2f}"
+                              for stage, (start, end) in c["timings"].items())
+            if c["passed"]:
+                mark = "✅"
+            elif c["error"]:
+                mark = f"❌ {c['error'].splitlines()[0][:80]}"
+            else:
+                mark = "⏹️ 已取消"
+            lines.append(f"    #{c['index']} {spans}  {mark}")
+        return "\n".join(lines)
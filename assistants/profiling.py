@@ -0,0 +1,273 @@
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 采样间隔（秒）：每次采样记录所有线程的调用栈（墙钟时间，等待大模型响应的时间同样计入）
+SAMPLE_INTERVAL = 0.005
+PERF_MODES = ("stat", "record")
+# perf record的采样频率（Hz）
+PERF_FREQUENCY = 999
+# Python 3.12起cProfile基于sys.monitoring，一个Profile即可记录所有线程，且同一时间只能启用一个
+# （再为线程启用会抛出ValueError，线程随之退出）；更早的版本只记录启用它的线程，需为每个线程各建一个
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+_profiler = None
+
+
+class _RusagePopen(subprocess.Popen):
+    """用os.wait4回收子进程，同时取得该子进程自己的资源用量（并发运行的其他子进程不计入）"""
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        try:
+            pid, sts, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+        if pid:
+            self.rusage = rusage
+        return pid, sts
+
+
+def perf_available():
+    """本机是否能用perf stat统计子进程（需要安装perf且perf_event_paranoid允许）"""
+    if not shutil.which("perf"):
+        return False
+    try:
+        return subprocess.run(["perf", "stat", "-o", os.devnull, "--", "true"],
+                              capture_output=True, timeout=10).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+
+class Profiler:
+    """同时剖析Python流水线与生成的程序
+
+    Python部分：Python 3.12起一个cProfile记录所有线程；更早的版本中主线程与剖析期间启动的线程各用一个
+    cProfile（线程结束时停止，合并写入python.pstats，剖析结束时仍未结束的线程不计入）。另有采样线程记录所有线程的调用栈，写入python.folded
+    （折叠栈格式，可用flamegraph.pl、inferno或speedscope生成火焰图）。
+    生成的程序：有perf时在perf stat（或perf record）下运行，输出写入perf/目录；
+    否则用wait4取得每次运行的CPU时间与最大内存。每次运行的记录与按程序汇总的结果写入binaries.json。
+    """
+
+    def __init__(self, out_dir, perf_mode="stat", interval=SAMPLE_INTERVAL):
+        if perf_mode not in PERF_MODES:
+            raise ValueError(f"不支持的perf方式: {perf_mode}，支持：{list(PERF_MODES)}")
+        self.out_dir = out_dir
+        self.perf_mode = perf_mode if perf_available() else None
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.profile = cProfile.Profile()
+        self.thread_profiles = []
+        self.samples = {}
+        self.sample_count = 0
+        self.runs = []
+        self.run_index = itertools.count(1)
+        self.stopping = threading.Event()
+        self.sampler = None
+        self.original_run = None
+        self.wrapper_code = None
+        self.started = None
+        self.elapsed = None
+        os.makedirs(os.path.join(out_dir, "perf") if self.perf_mode else out_dir, exist_ok=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        # 采样线程先于替换Thread.run启动（Python 3.12以前），本身不被剖析
+        self.sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+        self.sampler.start()
+        if PER_THREAD_PROFILES:
+            self._patch_thread_run()
+        self.profile.enable()
+        return self
+
+    def _patch_thread_run(self):
+        self.original_run = original_run = threading.Thread.run
+        profiler = self
+
+        def run(thread):
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                original_run(thread)
+            finally:
+                profile.disable()
+                with profiler.lock:
+                    profiler.thread_profiles.append(profile)
+
+        threading.Thread.run = run
+        self.wrapper_code = run.__code__
+
+    def stop(self):
+        self.profile.disable()
+        self.elapsed = time.perf_counter() - self.started
+        if self.original_run is not None:
+            threading.Thread.run = self.original_run
+        self.stopping.set()
+        self.sampler.join()
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    # 跳过为线程启用cProfile的包装函数
+                    if code is not self.wrapper_code:
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                stacks.append(";".join(reversed(stack)))
+            with self.lock:
+                self.sample_count += 1
+                for stack in stacks:
+                    self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def _perf_argv(self, exec_path, index):
+        base = os.path.join(self.out_dir, "perf", f"{index:05d}_{os.path.basename(exec_path)}")
+        if self.perf_mode == "record":
+            return ["perf", "record", "-q", "-g", "-F", str(PERF_FREQUENCY), "-o", base + ".data", "--"], base + ".data"
+        return ["perf", "stat", "-o", base + ".stat", "--"], base + ".stat"
+
+    def run_binary(self, exec_path, stdin_data, cwd=None, timeout=None, preexec_fn=None):
+        """运行生成的程序并记录资源用量，返回subprocess.CompletedProcess（rusage属性为资源用量）；
+        超时时抛出subprocess.TimeoutExpired
+
+        在perf下运行时，被信号终止的程序由perf以非零退出码返回（而不是负数）。
+        """
+        index = next(self.run_index)
+        argv, perf_output = self._perf_argv(exec_path, index) if self.perf_mode else ([], None)
+        argv = argv + [exec_path]
+        start = time.perf_counter()
+        with _RusagePopen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          cwd=cwd, preexec_fn=preexec_fn) as proc:
+            try:
+                stdout, stderr = proc.communicate(stdin_data, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                raise
+            finally:
+                self._record(exec_path, proc, time.perf_counter() - start, perf_output)
+        result = subprocess.CompletedProcess(argv, proc.returncode, stdout, stderr)
+        result.rusage = proc.rusage
+        return result
+
+    def _record(self, exec_path, proc, wall, perf_output):
+        rusage = proc.rusage
+        record = {
+            "program": os.path.basename(exec_path),
+            "path": exec_path,
+            "wall": wall,
+            "returncode": proc.returncode,
+            "user": rusage.ru_utime if rusage else None,
+            "system": rusage.ru_stime if rusage else None,
+            # Linux下ru_maxrss单位为KiB
+            "max_rss_kb": rusage.ru_maxrss if rusage else None,
+            "perf": perf_output,
+        }
+        with self.lock:
+            self.runs.append(record)
+
+    def binary_summary(self):
+        """按程序汇总运行次数、墙钟时间、CPU时间与最大内存"""
+        with self.lock:
+            runs = list(self.runs)
+        summary = {}
+        for run in runs:
+            item = summary.setdefault(run["program"], {"runs": 0, "wall": 0.0, "user": 0.0, "system": 0.0,
+                                                       "max_rss_kb": 0})
+            item["runs"] += 1
+            item["wall"] += run["wall"]
+            item["user"] += run["user"] or 0.0
+            item["system"] += run["system"] or 0.0
+            item["max_rss_kb"] = max(item["max_rss_kb"], run["max_rss_kb"] or 0)
+        return summary
+
+    def python_stats(self):
+        """合并主线程与已结束线程的cProfile结果"""
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        with self.lock:
+            profiles = list(self.thread_profiles)
+        for profile in profiles:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # 线程内没有执行任何被剖析的调用
+                pass
+        return stats
+
+    def write(self):
+        """写入python.pstats、python.folded与binaries.json，返回写入的文件列表"""
+        paths = []
+        stats = self.python_stats()
+        path = os.path.join(self.out_dir, "python.pstats")
+        stats.dump_stats(path)
+        paths.append(path)
+
+        path = os.path.join(self.out_dir, "python.folded")
+        with self.lock:
+            samples = sorted(self.samples.items())
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in samples)
+        paths.append(path)
+
+        path = os.path.join(self.out_dir, "binaries.json")
+        with self.lock:
+            runs = list(self.runs)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"perf": self.perf_mode, "elapsed": self.elapsed, "summary": self.binary_summary(),
+                       "runs": runs}, f, ensure_ascii=False, indent=2)
+        paths.append(path)
+        return paths
+
+    def format_summary(self, top=15):
+        """Python热点函数（按自身耗时排序）与生成程序的资源用量汇总"""
+        stream = io.StringIO()
+        stats = self.python_stats()
+        stats.stream = stream
+        stats.sort_stats("tottime").print_stats(top)
+        lines = [f"📊 Python（墙钟 {self.elapsed:.2f} 秒，{self.sample_count} 次采样）：", stream.getvalue().rstrip()]
+        summary = self.binary_summary()
+        if summary:
+            how = f"perf {self.perf_mode}" if self.perf_mode else "wait4资源用量（未检测到可用的perf）"
+            lines.append(f"📊 生成的程序（{how}）：")
+            for program, item in sorted(summary.items(), key=lambda kv: -kv[1]["wall"]):
+                lines.append(f"    {program}: {item['runs']} 次，墙钟 {item['wall'] * 1000:.1f} ms，"
+                             f"用户态 {item['user'] * 1000:.1f} ms，内核态 {item['system'] * 1000:.1f} ms，"
+                             f"最大内存 {item['max_rss_kb']} KiB")
+        return "\n".join(lines)
+
+
+def active():
+    """当前正在剖析的Profiler（未开启时为None）"""
+    return _profiler
+
+
+@contextmanager
+def profiling(out_dir, perf_mode="stat"):
+    """out_dir不为空时剖析with块内的Python代码与生成程序的运行，结束时写入out_dir；为空时不剖析"""
+    global _profiler
+    if not out_dir:
+        yield None
+        return
+    profiler = _profiler = Profiler(out_dir, perf_mode).start()
+    try:
+        yield profiler
+    finally:
+        _profiler = None
+        profiler.stop()
+        profiler.write()
@@ -0,0 +1,53 @@
+import importlib
+
+# 算法/模式 -> 后端与助手类。助手模块依赖requests等库，只在第一次创建助手时导入，
+# 模板程序、批量任务与缓存路径不需要它们。api为True的助手接受api参数（legacy/evp），
+# mode_arg为True的助手以mode参数区分模式（同一个类支持多种模式）
+HELPER_REGISTRY = {
+    "RSA": {"backend": "openssl", "module": "assistants.rsa_helper (读取PEM文件型)", "class": "RSAHelper"},
+    "AES-ECB": {"backend": "openssl", "module": "assistants.aes_ecb_helper", "class": "AESECBHelper", "api": True},
+    "AES-CBC": {"backend": "openssl", "module": "assistants.aes_cbc_helper", "class": "AESCBCHelper", "api": True},
+    "AES-CFB": {"backend": "openssl", "module": "assistants.aes_cfb_helper", "class": "AESCFBHelper", "api": True},
+    "AES-OFB": {"backend": "openssl", "module": "assistants.aes_ofb_helper", "class": "AESOFBHelper", "api": True},
+    "DES-ECB": {"backend": "openssl", "module": "assistants.des_ecb_helper", "class": "DESECBHelper", "api": True},
+    "DES-CBC": {"backend": "openssl", "module": "assistants.des_cbc_helper", "class": "DESCBCHelper", "api": True},
+    "DES-CFB": {"backend": "openssl", "module": "assistants.des_cfb_helper", "class": "DESCFBHelper", "api": True},
+    "DES-OFB": {"backend": "openssl", "module": "assistants.des_ofb_helper", "class": "DESOFBHelper", "api": True},
+    "SM4-ECB": {"backend": "gmssl", "module": "assistants.gmssl_helper", "class": "SM4Helper", "mode_arg": True},
+    "SM4-CBC": {"backend": "gmssl", "module": "assistants.gmssl_helper", "class": "SM4Helper", "mode_arg": True},
+    "SM4-CTR": {"backend": "gmssl", "module": "assistants.gmssl_helper", "class": "SM4Helper", "mode_arg": True},
+}
+BACKENDS = ("openssl", "gmssl")
+
+
+def supported(backend=None):
+    """返回指定后端（为None时为全部后端）支持的算法/模式名称列表"""
+    return [name for name, entry in HELPER_REGISTRY.items() if backend in (None, entry["backend"])]
+
+
+def get_entry(name, backend=None):
+    """按算法/模式名称（不区分大小写）查找登记项，不存在或不属于指定后端时抛出ValueError"""
+    entry = HELPER_REGISTRY.get(name.upper())
+    if entry is None or backend not in (None, entry["backend"]):
+        where = f"{backend}后端" if backend else ""
+        raise ValueError(f"不支持的算法: {name}，{where}支持：{supported(backend)}")
+    return entry
+
+
+def load_helper_class(name, backend=None):
+    """导入并返回助手类（模块在第一次调用时才导入）"""
+    entry = get_entry(name, backend)
+    return getattr(importlib.import_module(entry["module"]), entry["class"])
+
+
+def create_helper(name, api_key, api="legacy", backend=None):
+    """创建指定算法/模式的助手实例；api仅适用于登记为支持EVP接口的助手"""
+    entry = get_entry(name, backend)
+    if api != "legacy" and not entry.get("api"):
+        raise ValueError("api参数仅适用于AES/DES算法")
+    helper_class = load_helper_class(name, backend)
+    if entry.get("mode_arg"):
+        return helper_class(api_key, mode=name.upper().split("-")[-1])
+    if entry.get("api"):
+        return helper_class(api_key, api=api)
+    return helper_class(api_key)
@@ -0,0 +1,278 @@
+import os
+import struct
+import subprocess
+import threading
+import time
+
+from assistants.runner import STREAM_LIMITS, limit_resources
+from assistants.stream import _fileno, _pump
+from assistants.templates import build_binary
+
+RSA_BATCH_FRAMINGS = ("lines", "framed")
+RSA_BATCH_DIRECTIONS = ("encrypt", "decrypt")
+
+# RSA批量程序：rsa_batch lines|framed [encrypt|decrypt]，PEM密钥通过环境变量 RSA_KEY_PEM 传入
+# （加密为公钥，解密为私钥）。密钥只解析一次，OAEP上下文在记录之间复用。
+#   lines：加密时每行一条明文记录（不含行尾的\n或\r\n），每条输出一行十六进制密文；
+#          解密时每行一条十六进制密文，每条输出一行明文；失败时输出 "error: 原因"
+#   framed：请求为 长度(4字节大端) | 数据，响应与常驻工作进程相同：status | len | payload
+# 私钥运算使用OpenSSL的CRT实现（私钥PEM中的p、q、dP、dQ、qInv）并开启盲化，防御计时攻击
+RSA_BATCH_SOURCE = r"""#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/err.h>
+#include <openssl/evp.h>
+#include <openssl/pem.h>
+#include <openssl/rsa.h>
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+static int read_exact(void *buf, size_t len) {
+    return len == 0 || fread(buf, 1, len, stdin) == len;
+}
+
+static void write_u32(uint32_t value) {
+    unsigned char b[4] = {value >> 24, value >> 16, value >> 8, value};
+    fwrite(b, 1, 4, stdout);
+}
+
+static int hex_decode(unsigned char *buf, size_t *len) {
+    if (*len % 2) return 0;
+    for (size_t i = 0; i < *len / 2; i++) {
+        unsigned int b;
+        if (sscanf((const char *)buf + 2 * i, "%2x", &b) != 1) return 0;
+        buf[i] = (unsigned char)b;
+    }
+    *len /= 2;
+    return 1;
+}
+
+/* 私钥缺少CRT参数时OpenSSL会退回到慢得多的 m = c^d mod n；盲化默认开启，这里确保没有被关闭 */
+static int check_private_key(EVP_PKEY *pkey) {
+    RSA *rsa = EVP_PKEY_get1_RSA(pkey);
+    const BIGNUM *dmp1 = NULL, *dmq1 = NULL, *iqmp = NULL;
+    if (!rsa) return 0;
+    RSA_get0_crt_params(rsa, &dmp1, &dmq1, &iqmp);
+    if (!dmp1 || !dmq1 || !iqmp) fprintf(stderr, "warning: private key has no CRT parameters\n");
+    RSA_clear_flags(rsa, RSA_FLAG_NO_BLINDING);
+    RSA_free(rsa);
+    return 1;
+}
+
+int main(int argc, char **argv) {
+    int framed = argc > 1 && strcmp(argv[1], "framed") == 0;
+    int decrypt = argc > 2 && strcmp(argv[2], "decrypt") == 0;
+    if (argc < 2 || (!framed && strcmp(argv[1], "lines") != 0)
+        || (argc > 2 && !decrypt && strcmp(argv[2], "encrypt") != 0)) {
+        fprintf(stderr, "usage: %s lines|framed [encrypt|decrypt]\n", argv[0]);
+        return 2;
+    }
+    const char *pem = getenv("RSA_KEY_PEM");
+    BIO *bio = pem ? BIO_new_mem_buf(pem, -1) : NULL;
+    EVP_PKEY *pkey = !bio ? NULL : decrypt ? PEM_read_bio_PrivateKey(bio, NULL, NULL, NULL)
+                                           : PEM_read_bio_PUBKEY(bio, NULL, NULL, NULL);
+    BIO_free(bio);
+    if (!pkey || EVP_PKEY_base_id(pkey) != EVP_PKEY_RSA || (decrypt && !check_private_key(pkey))) {
+        fprintf(stderr, decrypt ? "invalid RSA private key PEM\n" : "invalid RSA public key PEM\n");
+        ERR_print_errors_fp(stderr);
+        return 1;
+    }
+    EVP_PKEY_CTX *pctx = EVP_PKEY_CTX_new(pkey, NULL);
+    if (!pctx || (decrypt ? EVP_PKEY_decrypt_init(pctx) : EVP_PKEY_encrypt_init(pctx)) <= 0
+        || EVP_PKEY_CTX_set_rsa_padding(pctx, RSA_PKCS1_OAEP_PADDING) <= 0) {
+        fprintf(stderr, "RSA-OAEP init failed\n");
+        return 1;
+    }
+
+    size_t rsa_len = (size_t)EVP_PKEY_size(pkey);
+    size_t max_len = decrypt ? rsa_len : rsa_len - 42;
+    unsigned char *out = malloc(rsa_len);
+    char *hex = malloc(rsa_len * 2 + 2);
+    unsigned char *in = NULL;
+    size_t cap = 0;
+    static const char too_long[] = "record longer than the OAEP limit";
+    static const char bad_hex[] = "invalid hex ciphertext";
+    static const char bad_len[] = "ciphertext length does not match the key size";
+    static const char failed[] = "RSA encrypt failed";
+    static const char decrypt_failed[] = "RSA decrypt failed";
+    if (!out || !hex) return 1;
+
+    for (;;) {
+        size_t len;
+        if (framed) {
+            unsigned char b[4];
+            if (!read_exact(b, 4)) break;
+            len = ((size_t)b[0] << 24) | ((size_t)b[1] << 16) | ((size_t)b[2] << 8) | b[3];
+            if (len + 1 > cap) {
+                unsigned char *p = realloc(in, len + 1);
+                if (!p) return 1;
+                in = p;
+                cap = len + 1;
+            }
+            if (!read_exact(in, len)) return 1;
+        } else {
+            ssize_t n = getline((char **)&in, &cap, stdin);
+            if (n < 0) break;
+            len = (size_t)n;
+            if (len && in[len - 1] == '\n') len--;
+            if (len && in[len - 1] == '\r') len--;
+        }
+
+        size_t out_len = rsa_len;
+        const char *error = NULL;
+        if (decrypt && !framed && !hex_decode(in, &len)) error = bad_hex;
+        else if (decrypt && len != rsa_len) error = bad_len;
+        else if (len > max_len) error = too_long;
+        else if (decrypt && EVP_PKEY_decrypt(pctx, out, &out_len, in, len) <= 0) error = decrypt_failed;
+        else if (!decrypt && EVP_PKEY_encrypt(pctx, out, &out_len, in, len) <= 0) error = failed;
+
+        if (framed) {
+            write_u32(error ? 1 : 0);
+            write_u32(error ? (uint32_t)strlen(error) : (uint32_t)out_len);
+            fwrite(error ? (const unsigned char *)error : out, 1, error ? strlen(error) : out_len, stdout);
+        } else if (error) {
+            printf("error: %s\n", error);
+        } else if (decrypt) {
+            fwrite(out, 1, out_len, stdout);
+            fputc('\n', stdout);
+        } else {
+            for (size_t i = 0; i < out_len; i++) sprintf(hex + 2 * i, "%02x", out[i]);
+            hex[2 * out_len] = '\n';
+            fwrite(hex, 1, 2 * out_len + 1, stdout);
+        }
+        if (error) ERR_clear_error();
+    }
+    EVP_PKEY_CTX_free(pctx);
+    EVP_PKEY_free(pkey);
+    free(in);
+    free(out);
+    free(hex);
+    return fflush(stdout) == 0 ? 0 : 1;
+}
+"""
+
+
+def build_rsa_batch(work_dir=None, cflags=("-O2",)):
+    """编译RSA批量加密/解密程序，返回可执行文件路径"""
+    return build_binary("RSA", "batch", RSA_BATCH_SOURCE, work_dir=work_dir, cflags=cflags)
+
+
+def _key_pem(key):
+    # 接受PEM字节或PEM文件路径
+    if isinstance(key, bytes):
+        return key.decode()
+    with open(key) as f:
+        return f.read()
+
+
+def _start(key, framing, direction, stdin, stdout, work_dir):
+    if framing not in RSA_BATCH_FRAMINGS:
+        raise ValueError(f"不支持的记录格式: {framing}，支持：{list(RSA_BATCH_FRAMINGS)}")
+    exec_path = build_rsa_batch(work_dir=work_dir)
+    return subprocess.Popen(
+        [exec_path, framing, direction],
+        stdin=stdin,
+        stdout=stdout,
+        stderr=subprocess.PIPE,
+        env=dict(os.environ, RSA_KEY_PEM=_key_pem(key)),
+        preexec_fn=limit_resources(STREAM_LIMITS["cpu_seconds"], STREAM_LIMITS["memory_bytes"])
+    )
+
+
+def _finish(proc, direction):
+    stderr = proc.stderr.read()
+    proc.wait()
+    what = "加密" if direction == "encrypt" else "解密"
+    if proc.returncode != 0:
+        raise RuntimeError(f"RSA批量{what}失败（退出代码{proc.returncode}）: {stderr.decode(errors='replace').strip()}")
+
+
+def _feed(proc, records):
+    try:
+        for record in records:
+            proc.stdin.write(struct.pack(">I", len(record)) + record)
+    except BrokenPipeError:
+        pass
+    finally:
+        proc.stdin.close()
+
+
+def _run_batch(key, records, direction, work_dir):
+    start = time.perf_counter()
+    proc = _start(key, "framed", direction, subprocess.PIPE, subprocess.PIPE, work_dir)
+    feeder = threading.Thread(target=_feed, args=(proc, records), daemon=True)
+    feeder.start()
+
+    results, errors = [], []
+    while True:
+        header = proc.stdout.read(8)
+        if len(header) < 8:
+            break
+        status, length = struct.unpack(">II", header)
+        payload = proc.stdout.read(length)
+        if status != 0:
+            errors.append((len(results), payload.decode(errors="replace")))
+            results.append(None)
+        else:
+            results.append(payload)
+    feeder.join()
+    _finish(proc, direction)
+    return results, _stats(len(results), len(errors), time.perf_counter() - start, errors)
+
+
+def _run_lines(key, src, dst, direction, work_dir):
+    start = time.perf_counter()
+    src_fd = _fileno(src)
+    proc = _start(key, "lines", direction, src_fd if src_fd is not None else subprocess.PIPE,
+                  subprocess.PIPE, work_dir)
+    pump = None
+    if src_fd is None:
+        pump = threading.Thread(target=_pump, args=(src, proc.stdin, 64 * 1024), daemon=True)
+        pump.start()
+    records, errors = 0, []
+    for line in proc.stdout:
+        if line.startswith(b"error: "):
+            errors.append((records, line[7:].decode(errors="replace").strip()))
+        records += 1
+        dst.write(line)
+    if pump:
+        pump.join()
+    _finish(proc, direction)
+    return _stats(records, len(errors), time.perf_counter() - start, errors)
+
+
+def rsa_encrypt_batch(public_key, records, work_dir=None):
+    """用同一个RSA公钥（PEM字节或文件路径）以OAEP加密多条记录，只启动一个进程、只解析一次公钥
+
+    返回 (密文列表, 统计)：单条记录失败（如超过OAEP长度上限）时对应位置为None；
+    统计包含记录数、失败数、耗时与每秒记录数。
+    """
+    return _run_batch(public_key, records, "encrypt", work_dir)
+
+
+def rsa_decrypt_batch(private_key, ciphertexts, work_dir=None):
+    """用同一个RSA私钥（PEM字节或文件路径）解密多条OAEP密文，私钥只解析一次，使用CRT与盲化
+
+    返回 (明文列表, 统计)，解密失败的记录对应位置为None。
+    """
+    return _run_batch(private_key, ciphertexts, "decrypt", work_dir)
+
+
+def rsa_encrypt_lines(public_key, src, dst, work_dir=None):
+    """把src（二进制文件对象）中的每一行作为一条记录加密，向dst逐行写入十六进制密文，返回统计"""
+    return _run_lines(public_key, src, dst, "encrypt", work_dir)
+
+
+def rsa_decrypt_lines(private_key, src, dst, work_dir=None):
+    """把src中的每一行十六进制密文解密，向dst逐行写入明文（与rsa_encrypt_lines互逆），返回统计"""
+    return _run_lines(private_key, src, dst, "decrypt", work_dir)
+
+
+def _stats(records, failed, elapsed, errors):
+    return {
+        "records": records,
+        "failed": failed,
+        "elapsed": elapsed,
+        "records_per_second": records / elapsed if elapsed > 0 else 0.0,
+        "errors": errors[:10],
+    }
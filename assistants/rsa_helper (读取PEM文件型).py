@@ -3,10 +3,10 @@ import json
 import subprocess
 import os
 import re
-import sys
 from retrying import retry
+from assistants.runner import HeadlessRunMixin, TIMEOUT_FEEDBACK, build_rsa_path_stdin, is_timeout, run_interactive
 
-class RSAHelper:
+class RSAHelper(HeadlessRunMixin):
     def __init__(self, api_key):
         self.api_key = api_key
         self.algorithm = "RSA"
@@ -15,6 +15,7 @@ class RSAHelper:
         os.makedirs(self.work_dir, exist_ok=True)
         
         self.generated_code = None
+        self.exec_path = None
         self.retry_count = 0
         self.max_retry = 5
         self.last_error = ""
@@ -62,7 +63,9 @@ class RSAHelper:
 只输出C代码，无注释、无标记、无多余内容！"""
 
         error_feedback = ""
-        if self.last_error:
+        if is_timeout(self.last_error):
+            error_feedback = f"修复：\n- {TIMEOUT_FEEDBACK}"
+        elif self.last_error:
             error_feedback = "修复：\n- 必须从文件读取公钥，接收用户输入的文件路径\n- 使用fopen打开文件，PEM_read_RSA_PUBKEY读取公钥\n- 确保文件操作错误处理完整"
 
         messages = [{"role": "system", "content": system_prompt}]
@@ -83,7 +86,7 @@ class RSAHelper:
         }
 
         try:
-            response = requests.post(
+            response = (self.session or requests).post(
                 self.api_url,
                 headers=headers,
                 json=payload,
@@ -131,7 +134,8 @@ class RSAHelper:
         except Exception as e:
             return "", f"API错误: {str(e)}"
 
-    def _compile_and_run(self, code=None):
+    def _compile(self, code=None):
+        """净化并编译代码，成功时记录可执行文件路径"""
         c_code = code or self.generated_code
         if not c_code:
             return "无代码可编译"
@@ -163,13 +167,26 @@ class RSAHelper:
             return f"编译失败:\n{self.last_error}"
 
         os.chmod(exec_path, 0o755)
+        self.exec_path = exec_path
+        return "编译成功"
+
+    def _compile_and_run(self, code=None):
+        result = self._compile(code)
+        if result != "编译成功":
+            return result
+
         print("\n📌 请输入以下加密信息：")
-        try:
-            # 使用交互方式运行，确保标准输入正确传递
-            subprocess.run([exec_path], stdin=sys.stdin, stdout=sys.stdout, stderr=sys.stderr, text=True)
-            return "运行成功"
-        except Exception as e:
-            return f"运行失败: {str(e)}"
+        result = run_interactive(self.exec_path)
+        if is_timeout(result):
+            self.last_error = result
+        return result
+
+    def _headless_input(self, key, iv, plaintext):
+        """key为PEM格式公钥字节：写入工作目录后输入文件路径，再输入明文"""
+        pubkey_path = os.path.join(self.work_dir, "headless_pubkey.pem")
+        with open(pubkey_path, "wb") as f:
+            f.write(key)
+        return build_rsa_path_stdin(pubkey_path, plaintext)
 
     def process(self):
         while self.retry_count < self.max_retry:
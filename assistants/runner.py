@@ -0,0 +1,289 @@
+import os
+import re
+import resource
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+
+from assistants import profiling
+from assistants.trace import span
+
+# 生成程序输出密文的前缀（GmSSL："密文(十六进制): "，RSA："加密结果(十六进制): "；
+# AES/DES的净化会删除中文，"密文"在此之前替换为CIPHERTEXT_LABEL）
+CIPHERTEXT_LABEL = "Ciphertext"
+CIPHERTEXT_PATTERN = re.compile(
+    r'(?:密文|加密结果|' + CIPHERTEXT_LABEL + r')\s*(?:[(（]十六进制[)）])?\s*[:：]\s*([0-9a-fA-F][0-9a-fA-F ]*)'
+)
+# 没有前缀时取最后一个以十六进制串结尾的行（提示语可能与密文在同一行，取最后一个冒号之后的部分）
+HEX_LINE_PATTERN = re.compile(r'(?:^|[:：])\s*([0-9a-fA-F]{2}[0-9a-fA-F ]*)$')
+
+
+# 运行超时的错误前缀，生成阶段据此给大模型反馈
+TIMEOUT_ERROR = "运行超时"
+TIMEOUT_FEEDBACK = ("程序在输入结束(EOF)时陷入死循环：清空输入缓冲区必须写成"
+                    "int c; while ((c = getchar()) != '\\n' && c != EOF);，并检查scanf/fgets的返回值")
+
+# 默认资源限制（秒/字节）：等待用户输入不消耗CPU时间，交互式运行的墙钟超时放宽
+HEADLESS_LIMITS = {"timeout": 10, "cpu_seconds": 10, "memory_bytes": 512 * 1024 * 1024}
+INTERACTIVE_LIMITS = {"timeout": 600, "cpu_seconds": 60, "memory_bytes": 512 * 1024 * 1024}
+# 常驻工作进程：timeout为单条记录的墙钟超时，cpu_seconds为整个进程生命周期的CPU时间上限
+WORKER_LIMITS = {"timeout": 10, "cpu_seconds": 3600, "memory_bytes": 1024 * 1024 * 1024}
+# 流式加密：耗时随输入大小增长，只限制内存（分段处理，占用与输入大小无关）
+STREAM_LIMITS = {"timeout": None, "cpu_seconds": None, "memory_bytes": 256 * 1024 * 1024}
+# 判断是否因CPU时间限制被终止时，允许测得的CPU时间比限制少的误差（秒）
+CPU_LIMIT_SLACK = 0.1
+
+
+@dataclass
+class RunResult:
+    """一次非交互式运行的结果，timings中的时间单位为秒
+
+    failure为失败类型："timeout"（墙钟或CPU超时）、"crash"（被信号终止）、
+    "exit"（非零退出码）、"no_output"（未输出密文）、"error"（无法启动或输入非法）
+    """
+    ok: bool
+    ciphertext: bytes = b""
+    stdout: str = ""
+    stderr: str = ""
+    returncode: int = None
+    error: str = ""
+    failure: str = ""
+    timings: dict = field(default_factory=dict)
+
+
+def is_timeout(error):
+    return bool(error) and error.startswith(TIMEOUT_ERROR)
+
+
+def limit_resources(cpu_seconds=None, memory_bytes=None):
+    """返回在子进程exec前设置RLIMIT_CPU/RLIMIT_AS的preexec_fn"""
+    def apply():
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        if memory_bytes:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    return apply
+
+
+def _killed_by_cpu_limit(returncode, rusage, cpu_seconds):
+    # 超过RLIMIT_CPU软限制收到SIGXCPU，超过硬限制收到SIGKILL；SIGKILL也可能来自内存不足或外部终止，
+    # 只有测得的CPU时间确实达到限制时才算超时（否则给大模型的“死循环”反馈是误导）
+    if returncode not in (-signal.SIGXCPU, -signal.SIGKILL):
+        return False
+    if rusage is None:
+        return returncode == -signal.SIGXCPU
+    # 内核按实际运行时间触发限制，rusage中的CPU时间按时钟节拍统计，可能比限制略低
+    return rusage.ru_utime + rusage.ru_stime >= cpu_seconds - CPU_LIMIT_SLACK
+
+
+def _run_measured(argv, stdin_data, cwd=None, timeout=None, preexec_fn=None):
+    """运行程序并用wait4取得它的资源用量，返回subprocess.CompletedProcess（rusage属性为资源用量）"""
+    with profiling._RusagePopen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                cwd=cwd, preexec_fn=preexec_fn) as proc:
+        try:
+            stdout, stderr = proc.communicate(stdin_data, timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            proc.kill()
+            e.stdout, e.stderr = proc.communicate()
+            raise
+    result = subprocess.CompletedProcess(argv, proc.returncode, stdout, stderr)
+    result.rusage = proc.rusage
+    return result
+
+
+def build_stdin(key, iv=None, plaintext=b""):
+    """按生成程序的读取顺序（密钥、IV、明文，每项一行）拼接标准输入"""
+    if b"\n" in plaintext:
+        raise ValueError("明文不能包含换行符（生成程序使用fgets按行读取明文）")
+    lines = [key.hex().encode()]
+    if iv is not None:
+        lines.append(iv.hex().encode())
+    lines.append(plaintext)
+    return b"\n".join(lines) + b"\n"
+
+
+def build_rsa_pem_stdin(pem, plaintext):
+    """交互式RSA程序：逐行输入PEM公钥，空行结束，再输入明文"""
+    if b"\n" in plaintext:
+        raise ValueError("明文不能包含换行符（生成程序使用fgets按行读取明文）")
+    return pem.rstrip(b"\n") + b"\n\n" + plaintext + b"\n"
+
+
+def build_rsa_path_stdin(pem_path, plaintext):
+    """读取PEM文件型RSA程序：输入公钥文件路径，再输入明文"""
+    if b"\n" in plaintext:
+        raise ValueError("明文不能包含换行符（生成程序使用fgets按行读取明文）")
+    return os.fsencode(pem_path) + b"\n" + plaintext + b"\n"
+
+
+def parse_ciphertext(stdout):
+    """从程序输出中提取最后一个密文十六进制串并转换为字节
+
+    优先匹配带前缀的密文；模型没有按要求输出前缀时，取最后一个以十六进制串结尾的行。
+    """
+    matches = CIPHERTEXT_PATTERN.findall(stdout)
+    if not matches:
+        matches = [match.group(1) for match in map(HEX_LINE_PATTERN.search, stdout.splitlines()) if match]
+    if not matches:
+        return None
+    hex_text = matches[-1].replace(" ", "").strip()
+    if len(hex_text) % 2 != 0:
+        return None
+    return bytes.fromhex(hex_text)
+
+
+def run_headless(exec_path, stdin_data, cwd=None, timeout=None, cpu_seconds=None, memory_bytes=None):
+    """通过管道运行生成的程序，捕获输出并解析密文（带墙钟超时与CPU/内存限制）"""
+    timeout = timeout or HEADLESS_LIMITS["timeout"]
+    cpu_seconds = cpu_seconds or HEADLESS_LIMITS["cpu_seconds"]
+    memory_bytes = memory_bytes or HEADLESS_LIMITS["memory_bytes"]
+
+    start = time.perf_counter()
+    try:
+        with span("run", program=os.path.basename(exec_path)):
+            profiler = profiling.active()
+            if profiler:
+                # --profile：在perf下运行或记录该进程的资源用量
+                proc = profiler.run_binary(exec_path, stdin_data, cwd=cwd, timeout=timeout,
+                                           preexec_fn=limit_resources(cpu_seconds, memory_bytes))
+            else:
+                proc = _run_measured([exec_path], stdin_data, cwd=cwd, timeout=timeout,
+                                     preexec_fn=limit_resources(cpu_seconds, memory_bytes))
+    except subprocess.TimeoutExpired as e:
+        return RunResult(ok=False, error=f"{TIMEOUT_ERROR}（超过{timeout}秒）", failure="timeout",
+                         stdout=(e.stdout or b"").decode("utf-8", errors="replace"),
+                         timings={"total": time.perf_counter() - start})
+    except Exception as e:
+        return RunResult(ok=False, error=f"运行错误: {str(e)}", failure="error",
+                         timings={"total": time.perf_counter() - start})
+    run_done = time.perf_counter()
+
+    stdout = proc.stdout.decode("utf-8", errors="replace")
+    stderr = proc.stderr.decode("utf-8", errors="replace")
+    ciphertext = parse_ciphertext(stdout)
+    end = time.perf_counter()
+
+    timings = {"run": run_done - start, "parse": end - run_done, "total": end - start}
+    result = RunResult(ok=False, stdout=stdout, stderr=stderr,
+                       returncode=proc.returncode, timings=timings)
+    if _killed_by_cpu_limit(proc.returncode, getattr(proc, "rusage", None), cpu_seconds):
+        result.error = f"{TIMEOUT_ERROR}（CPU时间超过{cpu_seconds}秒）"
+        result.failure = "timeout"
+    elif proc.returncode < 0:
+        result.error = f"运行出错，被信号{-proc.returncode}终止"
+        result.failure = "crash"
+    elif proc.returncode != 0:
+        result.error = f"运行出错，退出代码: {proc.returncode}"
+        result.failure = "exit"
+    elif ciphertext is None:
+        result.error = "未在输出中找到密文"
+        result.failure = "no_output"
+    else:
+        result.ok = True
+        result.ciphertext = ciphertext
+    return result
+
+
+def run_interactive(exec_path, timeout=None, cpu_seconds=None, memory_bytes=None, check_returncode=False):
+    """在当前终端交互式运行生成的程序（带超时与资源限制），返回结果描述"""
+    timeout = timeout or INTERACTIVE_LIMITS["timeout"]
+    cpu_seconds = cpu_seconds or INTERACTIVE_LIMITS["cpu_seconds"]
+    memory_bytes = memory_bytes or INTERACTIVE_LIMITS["memory_bytes"]
+    try:
+        proc = profiling._RusagePopen(
+            [exec_path],
+            stdin=sys.stdin,
+            stdout=sys.stdout,
+            stderr=sys.stderr,
+            preexec_fn=limit_resources(cpu_seconds, memory_bytes)
+        )
+    except Exception as e:
+        return f"运行错误: {str(e)}"
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        return f"{TIMEOUT_ERROR}（超过{timeout}秒）"
+    if _killed_by_cpu_limit(proc.returncode, proc.rusage, cpu_seconds):
+        return f"{TIMEOUT_ERROR}（CPU时间超过{cpu_seconds}秒）"
+    if check_returncode and proc.returncode != 0:
+        return f"运行出错，退出代码: {proc.returncode}"
+    return "运行成功"
+
+
+class HeadlessRunMixin:
+    """为助手类提供非交互式的编译与运行接口
+
+    子类需实现 _generate_c_code() 与 _compile(code)，编译成功后设置 self.exec_path；
+    支持流水线的助手另需实现 _request_code()：返回 (代码, 消息) 但不修改助手状态（流水线在后台线程中推测生成）。
+    algorithm为算法名（如"AES"），与self.mode组成已知答案测试使用的名称。
+    session为调用大模型API使用的requests.Session（常驻服务中共用连接池），为None时每次新建连接。
+    """
+    needs_iv = True
+    algorithm = None
+    session = None
+
+    def _headless_input(self, key, iv, plaintext):
+        """构造生成程序的标准输入，子类可按自身的输入流程覆盖"""
+        return build_stdin(key, iv if self.needs_iv else None, plaintext)
+
+    def build(self):
+        """非交互式生成并编译代码（失败时自动重试），返回是否成功"""
+        while self.retry_count < self.max_retry:
+            self.retry_count += 1
+            code, msg = self._generate_c_code()
+            if not code:
+                self.last_error = msg
+                continue
+            if self._compile(code) == "编译成功":
+                return True
+        return False
+
+    def supports_pipeline(self):
+        """是否可以用流水线生成：需要已知答案向量校验候选程序（RSA与旧版GmSSLHelper没有）"""
+        from assistants.kat import KAT_VECTORS
+        mode = getattr(self, "mode", None)
+        return bool(self.algorithm and mode and hasattr(self, "_request_code")) \
+            and f"{self.algorithm}-{mode}" in KAT_VECTORS
+
+    def process_pipelined(self):
+        """以流水线方式生成、编译并用已知答案测试校验候选程序，第一个通过的程序再交互式运行
+
+        下一个候选的大模型请求与当前候选的编译、校验同时进行，失败后自动继续，不再逐次询问是否重试。
+        """
+        from assistants.pipeline import BuildPipeline
+        pipeline = BuildPipeline(self, f"{self.algorithm}-{self.mode}", max_candidates=self.max_retry)
+        winner = pipeline.run()
+        print(pipeline.format_timeline())
+        if not winner:
+            print("⚠️ 已达最大重试次数")
+            return
+
+        print("\n生成的代码：")
+        print("-" * 70)
+        print(winner.code)
+        print("-" * 70)
+        print("\n请输入加密信息：")
+        result = run_interactive(self.exec_path)
+        if result == "运行成功":
+            print("✅ 加密成功")
+        else:
+            print(f"❌ 失败: {result}")
+
+    def run_headless(self, key, iv=None, plaintext=b""):
+        """以字节形式输入密钥、IV和明文运行已编译的程序，返回RunResult"""
+        exec_path = getattr(self, "exec_path", None)
+        if not exec_path or not os.path.exists(exec_path):
+            return RunResult(ok=False, error="可执行文件不存在，请先编译", failure="error")
+        try:
+            stdin_data = self._headless_input(key, iv, plaintext)
+        except ValueError as e:
+            return RunResult(ok=False, error=str(e), failure="error")
+        result = run_headless(exec_path, stdin_data, cwd=self.work_dir)
+        if result.failure == "timeout":
+            # 记录超时，下一次生成时反馈给大模型
+            self.last_error = result.error
+        return result
@@ -0,0 +1,202 @@
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from assistants.batch import BatchRunner
+from assistants.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_RESPONSES, REGISTRY, REQUESTS_IN_FLIGHT
+from assistants.trace import span
+
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8750
+# 单个请求体的大小上限（字节）
+MAX_BODY = 64 << 20
+SERVICE_PATHS = ("/health", "/metrics", "/encrypt", "/generate")
+
+
+class CryptoService:
+    """常驻服务的状态：加密任务复用BatchRunner中的常驻工作进程池与已生成的程序，
+    大模型请求共用一个HTTP连接池，模板程序按源码哈希缓存在模板工作目录中
+    """
+
+    def __init__(self, workers=None, api_key=None, work_dir=None):
+        session = None
+        if api_key:
+            try:
+                import requests
+                session = requests.Session()
+            except ImportError:
+                pass
+        # 服务长期运行，生成失败（限流、超时等）不保留，下一个请求重新生成
+        self.runner = BatchRunner(workers, api_key=api_key, work_dir=work_dir, session=session,
+                                  cache_failures=False)
+        self.session = session
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failed = 0
+        self.busy_time = 0.0
+
+    def handle(self, method, path, body):
+        """处理一个请求，返回 (HTTP状态码, 响应JSON对象)"""
+        start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            with span("request", method=method, path=path) as args:
+                status, response = self._dispatch(method, path, body)
+                args["status"] = status
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+        elapsed = time.perf_counter() - start
+        HTTP_RESPONSES.inc(path=path if path in SERVICE_PATHS else "other", status=status)
+        with self.lock:
+            self.requests += 1
+            self.failed += status != 200 or isinstance(response, dict) and not response.get("ok", True)
+            self.busy_time += elapsed
+        return status, response
+
+    def _dispatch(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, self.stats()
+        if method == "GET" and path == "/metrics":
+            # Prometheus文本格式，响应体为字符串
+            return 200, REGISTRY.render()
+        if method == "POST" and path == "/encrypt":
+            # 请求体与batch子命令的一行任务相同
+            return 200, self.runner.run_job(body.decode("utf-8", errors="replace"))
+        if method == "POST" and path == "/generate":
+            try:
+                request = json.loads(body or b"{}")
+                if not isinstance(request, dict) or not request.get("algorithm"):
+                    raise ValueError("缺少algorithm字段")
+                return 200, self.runner.generate(str(request["algorithm"]), request.get("api") or "legacy")
+            except ValueError as e:
+                return 400, {"ok": False, "error": str(e)}
+        if path in SERVICE_PATHS:
+            return 405, {"ok": False, "error": f"{path}不支持{method}请求"}
+        return 404, {"ok": False, "error": f"未知路径: {path}，支持：GET /health、GET /metrics、POST /encrypt、POST /generate"}
+
+    def stats(self):
+        """返回运行时间、请求数、平均处理耗时，以及工作进程池与已生成程序的概况"""
+        with self.lock:
+            requests, failed, busy = self.requests, self.failed, self.busy_time
+        return dict(
+            ok=True,
+            uptime=time.perf_counter() - self.started,
+            requests=requests,
+            failed=failed,
+            avg_ms=busy / requests * 1000 if requests else None,
+            **self.runner.stats()
+        )
+
+    def close(self):
+        self.runner.close()
+        if self.session:
+            self.session.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 保持连接，客户端复用连接时每个请求不必重新握手
+    protocol_version = "HTTP/1.1"
+    server_version = "CryptoAssist"
+
+    def setup(self):
+        # 响应头与响应体分两次写出，TCP连接需关闭Nagle算法，否则遇到客户端的延迟确认每个请求要多等约40毫秒
+        self.disable_nagle_algorithm = isinstance(self.client_address, tuple)
+        super().setup()
+
+    def address_string(self):
+        # Unix套接字的客户端地址为空字符串
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, response):
+        if isinstance(response, str):
+            data, content_type = response.encode(), METRICS_CONTENT_TYPE
+        else:
+            data, content_type = json.dumps(response, ensure_ascii=False).encode(), "application/json; charset=utf-8"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reject(self, path, status, error):
+        # 请求体未读取，连接上剩余的字节无法解析为下一个请求，回复后关闭连接
+        self.close_connection = True
+        HTTP_RESPONSES.inc(path=path if path in SERVICE_PATHS else "other", status=status)
+        self._reply(status, {"ok": False, "error": error})
+
+    def _handle(self):
+        path = self.path.split("?")[0]
+        header = self.headers.get("Content-Length") or "0"
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        # 负数长度会让rfile.read(-1)一直读到连接关闭，保持连接的客户端会因此卡住
+        if length < 0:
+            self._reject(path, 400, f"Content-Length无效: {header}")
+            return
+        if length > MAX_BODY:
+            self._reject(path, 413, f"请求体超过{MAX_BODY}字节")
+            return
+        body = self.rfile.read(length) if length else b""
+        self._reply(*self.server.service.handle(self.command, path, body))
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host=SERVE_HOST, port=SERVE_PORT, unix_socket=None, verbose=False):
+    """创建监听本机端口（或Unix套接字）的多线程HTTP服务器，每个连接由一个线程处理"""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            # 只删除上次运行留下的套接字文件，路径写错时不能删掉普通文件
+            if not stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+                raise FileExistsError(f"{unix_socket}已存在且不是Unix套接字，拒绝覆盖")
+            os.remove(unix_socket)
+        server = _UnixServer(unix_socket, _Handler)
+        os.chmod(unix_socket, 0o600)
+    else:
+        server = _TCPServer((host, port), _Handler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def serve(host=SERVE_HOST, port=SERVE_PORT, unix_socket=None, workers=None, api_key=None, work_dir=None,
+          verbose=False):
+    """运行常驻服务直到被中断（Ctrl+C），退出时关闭工作进程并删除Unix套接字文件"""
+    service = CryptoService(workers, api_key=api_key, work_dir=work_dir)
+    try:
+        server = make_server(service, host, port, unix_socket, verbose)
+    except OSError:
+        service.close()
+        raise
+    address = unix_socket or f"http://{host}:{server.server_address[1]}"
+    print(f"✅ 服务已启动: {address}（GET /health，GET /metrics，POST /encrypt，POST /generate）", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️ 服务已停止", file=sys.stderr)
+    finally:
+        server.server_close()
+        service.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
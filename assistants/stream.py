@@ -0,0 +1,485 @@
+import io
+import os
+import subprocess
+import threading
+
+from assistants.runner import STREAM_LIMITS, limit_resources
+from assistants.templates import build_binary, get_spec, render, template_libs
+
+# 默认分段大小（字节），须为块大小的整数倍
+STREAM_CHUNK = 64 * 1024
+
+# 流式加密程序：stream [分段大小]，密钥与IV通过环境变量 STREAM_KEY / STREAM_IV（十六进制）传入，
+# 避免出现在命令行参数中。从标准输入按固定大小分段读取，CBC链接值、CFB/OFB的num与CTR计数器在分段间延续，
+# 只在输入结束时做PKCS#7填充（CTR不填充），因此内存占用与输入大小无关
+STREAM_BODY = r"""
+static int hex_decode(const char *hex, unsigned char *out, size_t len) {
+    if (!hex || strlen(hex) != len * 2) return 0;
+    for (size_t i = 0; i < len; i++) {
+        unsigned int b;
+        if (sscanf(hex + 2 * i, "%2x", &b) != 1) return 0;
+        out[i] = (unsigned char)b;
+    }
+    return 1;
+}
+
+int main(int argc, char **argv) {
+    size_t chunk = argc > 1 ? strtoul(argv[1], NULL, 10) : 0;
+    chunk = chunk < BLOCK_SIZE ? BLOCK_SIZE : chunk / BLOCK_SIZE * BLOCK_SIZE;
+
+    unsigned char key[KEY_LEN], ivbuf[IV_BUF_LEN] = {0};
+    if (!hex_decode(getenv("STREAM_KEY"), key, KEY_LEN)
+        || (IV_LEN > 0 && !hex_decode(getenv("STREAM_IV"), ivbuf, IV_LEN))) {
+        fprintf(stderr, "invalid STREAM_KEY/STREAM_IV length\n");
+        return 2;
+    }
+    $key_state
+    $set_key
+    int num = 0;
+
+    /* 多留一块空间用于最后的填充 */
+    unsigned char *in = malloc(chunk + BLOCK_SIZE), *out = malloc(chunk + BLOCK_SIZE);
+    if (!in || !out) return 1;
+    for (;;) {
+        /* 分段大小为块大小的整数倍，fread只在输入结束时返回不足一段 */
+        size_t len = fread(in, 1, chunk, stdin);
+        int eof = len < chunk;
+        if (eof) {
+            if (ferror(stdin)) {
+                perror("fread");
+                return 1;
+            }
+            size_t pad = PADDING ? BLOCK_SIZE - len % BLOCK_SIZE : 0;
+            memset(in + len, (int)pad, pad);
+            len += pad;
+        }
+        $crypt
+        if (fwrite(out, 1, len, stdout) != len) {
+            perror("fwrite");
+            return 1;
+        }
+        if (eof) break;
+    }
+    (void)num;
+    free(in);
+    free(out);
+    return fflush(stdout) == 0 ? 0 : 1;
+}
+"""
+
+
+# 流式解密程序：stream_decrypt [分段大小]，密钥与IV的传入方式与流式加密相同。
+# 填充模式始终保留最后一块明文，到输入结束时检查并去除PKCS#7填充；填充无效（密钥错误或密文损坏）时
+# 退出代码非零，此前已输出的明文必须丢弃
+STREAM_DECRYPT_BODY = r"""
+static int hex_decode(const char *hex, unsigned char *out, size_t len) {
+    if (!hex || strlen(hex) != len * 2) return 0;
+    for (size_t i = 0; i < len; i++) {
+        unsigned int b;
+        if (sscanf(hex + 2 * i, "%2x", &b) != 1) return 0;
+        out[i] = (unsigned char)b;
+    }
+    return 1;
+}
+
+int main(int argc, char **argv) {
+    size_t chunk = argc > 1 ? strtoul(argv[1], NULL, 10) : 0;
+    chunk = chunk < BLOCK_SIZE ? BLOCK_SIZE : chunk / BLOCK_SIZE * BLOCK_SIZE;
+
+    unsigned char key[KEY_LEN], ivbuf[IV_BUF_LEN] = {0};
+    if (!hex_decode(getenv("STREAM_KEY"), key, KEY_LEN)
+        || (IV_LEN > 0 && !hex_decode(getenv("STREAM_IV"), ivbuf, IV_LEN))) {
+        fprintf(stderr, "invalid STREAM_KEY/STREAM_IV length\n");
+        return 2;
+    }
+    $key_state
+    $set_key
+    int num = 0;
+
+    unsigned char *in = malloc(chunk), *out = malloc(chunk);
+    unsigned char held[BLOCK_SIZE];
+    size_t keep = PADDING ? BLOCK_SIZE : 0, have = 0;
+    if (!in || !out) return 1;
+    for (;;) {
+        size_t len = fread(in, 1, chunk, stdin);
+        int eof = len < chunk;
+        if (eof && ferror(stdin)) {
+            perror("fread");
+            return 1;
+        }
+        if (PADDING && len % BLOCK_SIZE) {
+            fprintf(stderr, "ciphertext length is not a multiple of the block size\n");
+            return 1;
+        }
+        if (len > 0) {
+            $crypt
+            /* 先输出上一段保留的块，再保留本段的最后一块 */
+            if (fwrite(held, 1, have, stdout) != have || fwrite(out, 1, len - keep, stdout) != len - keep) {
+                perror("fwrite");
+                return 1;
+            }
+            memcpy(held, out + len - keep, keep);
+            have = keep;
+        }
+        if (eof) break;
+    }
+    if (PADDING) {
+        size_t pad = have ? held[BLOCK_SIZE - 1] : 0;
+        int bad = pad == 0 || pad > BLOCK_SIZE;
+        for (size_t i = 1; !bad && i <= pad; i++) bad = held[BLOCK_SIZE - i] != pad;
+        if (bad) {
+            fprintf(stderr, "bad decrypt: invalid padding (wrong key or corrupted ciphertext)\n");
+            return 1;
+        }
+        if (fwrite(held, 1, BLOCK_SIZE - pad, stdout) != BLOCK_SIZE - pad) {
+            perror("fwrite");
+            return 1;
+        }
+    }
+    (void)num;
+    free(in);
+    free(out);
+    return fflush(stdout) == 0 ? 0 : 1;
+}
+"""
+
+
+# 内存映射加密程序：mmap_crypt <输入文件> <输出文件> [起始偏移 长度]，密钥与IV同样通过环境变量传入。
+# 输出文件预先扩展为填充后的大小，按窗口映射输入与输出文件，直接在映射之间加密，
+# 窗口大小固定，地址空间占用与文件大小无关。
+# 指定范围时只处理该范围内的整块（偏移须按页对齐），输出文件由调用方预先扩展，
+# 范围到达最后一个整块时再处理尾部与填充，供并行分片使用
+MMAP_BODY = r"""
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#define WINDOW_SIZE ((size_t)64 << 20)
+
+static int hex_decode(const char *hex, unsigned char *out, size_t len) {
+    if (!hex || strlen(hex) != len * 2) return 0;
+    for (size_t i = 0; i < len; i++) {
+        unsigned int b;
+        if (sscanf(hex + 2 * i, "%2x", &b) != 1) return 0;
+        out[i] = (unsigned char)b;
+    }
+    return 1;
+}
+
+int main(int argc, char **argv) {
+    if (argc != 3 && argc != 5) {
+        fprintf(stderr, "usage: %s <in> <out> [offset length]\n", argv[0]);
+        return 2;
+    }
+    unsigned char key[KEY_LEN], ivbuf[IV_BUF_LEN] = {0};
+    if (!hex_decode(getenv("STREAM_KEY"), key, KEY_LEN)
+        || (IV_LEN > 0 && !hex_decode(getenv("STREAM_IV"), ivbuf, IV_LEN))) {
+        fprintf(stderr, "invalid STREAM_KEY/STREAM_IV length\n");
+        return 2;
+    }
+    $key_state
+    $set_key
+    int num = 0;
+
+    int in_fd = open(argv[1], O_RDONLY);
+    if (in_fd < 0) { perror(argv[1]); return 1; }
+    struct stat st;
+    if (fstat(in_fd, &st) != 0) { perror("fstat"); return 1; }
+    size_t size = (size_t)st.st_size;
+    size_t full = size / BLOCK_SIZE * BLOCK_SIZE;
+    size_t pad = PADDING ? BLOCK_SIZE - size % BLOCK_SIZE : 0;
+
+    size_t start = 0, end = full;
+    int shard = argc == 5;
+    if (shard) {
+        start = strtoull(argv[3], NULL, 10);
+        end = start + strtoull(argv[4], NULL, 10);
+        if (start % BLOCK_SIZE || end % BLOCK_SIZE || end > full) {
+            fprintf(stderr, "invalid shard range\n");
+            return 2;
+        }
+    }
+
+    int out_fd = open(argv[2], shard ? O_RDWR : O_RDWR | O_CREAT | O_TRUNC, 0644);
+    if (out_fd < 0) { perror(argv[2]); return 1; }
+    if (!shard && ftruncate(out_fd, (off_t)(size + pad)) != 0) { perror("ftruncate"); return 1; }
+
+    /* 窗口大小是页大小与块大小的整数倍，窗口之间链接状态自然延续 */
+    for (size_t offset = start; offset < end; offset += WINDOW_SIZE) {
+        size_t len = end - offset < WINDOW_SIZE ? end - offset : WINDOW_SIZE;
+        unsigned char *in = mmap(NULL, len, PROT_READ, MAP_PRIVATE, in_fd, (off_t)offset);
+        unsigned char *out = mmap(NULL, len, PROT_READ | PROT_WRITE, MAP_SHARED, out_fd, (off_t)offset);
+        if (in == MAP_FAILED || out == MAP_FAILED) { perror("mmap"); return 1; }
+        madvise(in, len, MADV_SEQUENTIAL);
+        madvise(out, len, MADV_SEQUENTIAL);
+        $crypt
+        munmap(in, len);
+        munmap(out, len);
+    }
+
+    /* 不足一块的尾部与填充在栈上加密后写入（不填充的模式只写尾部） */
+    if (end == full && size - full + pad > 0) {
+        unsigned char tail[BLOCK_SIZE], out[BLOCK_SIZE];
+        unsigned char *in = tail;
+        size_t len = size - full + pad;
+        if (pread(in_fd, tail, size - full, (off_t)full) != (ssize_t)(size - full)) { perror("pread"); return 1; }
+        memset(tail + (size - full), (int)pad, pad);
+        $crypt
+        if (pwrite(out_fd, out, len, (off_t)full) != (ssize_t)len) { perror("pwrite"); return 1; }
+    }
+    (void)num;
+    close(in_fd);
+    return close(out_fd) == 0 ? 0 : 1;
+}
+"""
+
+
+# 内存映射解密程序：mmap_decrypt <输入文件> <输出文件> [起始偏移 长度]，参数与内存映射加密程序相同。
+# 输出文件预先扩展为密文大小，处理到最后一个整块的进程检查填充后把输出文件截断为明文大小；
+# 指定范围时只处理该范围内的整块，CBC/CFB各分片的起始IV为分片前的最后一个密文块，供并行分片使用
+MMAP_DECRYPT_BODY = r"""
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#define WINDOW_SIZE ((size_t)64 << 20)
+
+static int hex_decode(const char *hex, unsigned char *out, size_t len) {
+    if (!hex || strlen(hex) != len * 2) return 0;
+    for (size_t i = 0; i < len; i++) {
+        unsigned int b;
+        if (sscanf(hex + 2 * i, "%2x", &b) != 1) return 0;
+        out[i] = (unsigned char)b;
+    }
+    return 1;
+}
+
+int main(int argc, char **argv) {
+    if (argc != 3 && argc != 5) {
+        fprintf(stderr, "usage: %s <in> <out> [offset length]\n", argv[0]);
+        return 2;
+    }
+    unsigned char key[KEY_LEN], ivbuf[IV_BUF_LEN] = {0};
+    if (!hex_decode(getenv("STREAM_KEY"), key, KEY_LEN)
+        || (IV_LEN > 0 && !hex_decode(getenv("STREAM_IV"), ivbuf, IV_LEN))) {
+        fprintf(stderr, "invalid STREAM_KEY/STREAM_IV length\n");
+        return 2;
+    }
+    $key_state
+    $set_key
+    int num = 0;
+
+    int in_fd = open(argv[1], O_RDONLY);
+    if (in_fd < 0) { perror(argv[1]); return 1; }
+    struct stat st;
+    if (fstat(in_fd, &st) != 0) { perror("fstat"); return 1; }
+    size_t size = (size_t)st.st_size;
+    size_t full = size / BLOCK_SIZE * BLOCK_SIZE;
+    if (PADDING && (size == 0 || size != full)) {
+        fprintf(stderr, "ciphertext length is not a multiple of the block size\n");
+        return 1;
+    }
+
+    size_t start = 0, end = full;
+    int shard = argc == 5;
+    if (shard) {
+        start = strtoull(argv[3], NULL, 10);
+        end = start + strtoull(argv[4], NULL, 10);
+        if (start % BLOCK_SIZE || end % BLOCK_SIZE || end > full) {
+            fprintf(stderr, "invalid shard range\n");
+            return 2;
+        }
+    }
+
+    int out_fd = open(argv[2], shard ? O_RDWR : O_RDWR | O_CREAT | O_TRUNC, 0644);
+    if (out_fd < 0) { perror(argv[2]); return 1; }
+    if (!shard && ftruncate(out_fd, (off_t)size) != 0) { perror("ftruncate"); return 1; }
+
+    for (size_t offset = start; offset < end; offset += WINDOW_SIZE) {
+        size_t len = end - offset < WINDOW_SIZE ? end - offset : WINDOW_SIZE;
+        unsigned char *in = mmap(NULL, len, PROT_READ, MAP_PRIVATE, in_fd, (off_t)offset);
+        unsigned char *out = mmap(NULL, len, PROT_READ | PROT_WRITE, MAP_SHARED, out_fd, (off_t)offset);
+        if (in == MAP_FAILED || out == MAP_FAILED) { perror("mmap"); return 1; }
+        madvise(in, len, MADV_SEQUENTIAL);
+        madvise(out, len, MADV_SEQUENTIAL);
+        $crypt
+        munmap(in, len);
+        munmap(out, len);
+    }
+
+    if (end == full && size > full) {
+        /* 不填充的模式（CTR）直接解密不足一块的尾部 */
+        unsigned char tail[BLOCK_SIZE], out[BLOCK_SIZE];
+        unsigned char *in = tail;
+        size_t len = size - full;
+        if (pread(in_fd, tail, len, (off_t)full) != (ssize_t)len) { perror("pread"); return 1; }
+        $crypt
+        if (pwrite(out_fd, out, len, (off_t)full) != (ssize_t)len) { perror("pwrite"); return 1; }
+    } else if (PADDING && end == full) {
+        /* 检查最后一块的填充，把输出文件截断为明文大小 */
+        unsigned char last[BLOCK_SIZE];
+        if (pread(out_fd, last, BLOCK_SIZE, (off_t)(full - BLOCK_SIZE)) != BLOCK_SIZE) { perror("pread"); return 1; }
+        size_t pad = last[BLOCK_SIZE - 1];
+        int bad = pad == 0 || pad > BLOCK_SIZE;
+        for (size_t i = 1; !bad && i <= pad; i++) bad = last[BLOCK_SIZE - i] != pad;
+        if (bad) {
+            fprintf(stderr, "bad decrypt: invalid padding (wrong key or corrupted ciphertext)\n");
+            return 1;
+        }
+        if (ftruncate(out_fd, (off_t)(size - pad)) != 0) { perror("ftruncate"); return 1; }
+    }
+    (void)num;
+    close(in_fd);
+    return close(out_fd) == 0 ? 0 : 1;
+}
+"""
+
+
+def build_stream(name, work_dir=None, cflags=("-O2",), api="legacy", decrypt=False):
+    """编译指定算法/模式的流式加密（decrypt为True时为解密）程序（api为legacy或evp），返回可执行文件路径"""
+    if decrypt:
+        return build_binary(name, "stream_decrypt", render(name, STREAM_DECRYPT_BODY, api, decrypt=True),
+                            work_dir=work_dir, cflags=cflags, libs=template_libs(name, api))
+    return build_binary(name, "stream", render(name, STREAM_BODY, api), work_dir=work_dir, cflags=cflags,
+                        libs=template_libs(name, api))
+
+
+def build_mmap(name, work_dir=None, cflags=("-O2",), api="legacy", decrypt=False):
+    """编译指定算法/模式的内存映射加密（decrypt为True时为解密）程序（api为legacy或evp），返回可执行文件路径"""
+    if decrypt:
+        return build_binary(name, "mmap_decrypt", render(name, MMAP_DECRYPT_BODY, api, decrypt=True),
+                            work_dir=work_dir, cflags=cflags, libs=template_libs(name, api))
+    return build_binary(name, "mmap", render(name, MMAP_BODY, api), work_dir=work_dir, cflags=cflags,
+                        libs=template_libs(name, api))
+
+
+def _check_key_iv(name, key, iv):
+    spec = get_spec(name)
+    if len(key) != spec["key_length"]:
+        raise ValueError(f"{name}密钥长度应为{spec['key_length']}字节，实际为{len(key)}字节")
+    if spec["iv_length"] and (iv is None or len(iv) != spec["iv_length"]):
+        raise ValueError(f"{name}的IV长度应为{spec['iv_length']}字节")
+
+
+def _fileno(f):
+    try:
+        return f.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return None
+
+
+def _pump(src, dst, chunk_size):
+    try:
+        for chunk in iter(lambda: src.read(chunk_size), b""):
+            dst.write(chunk)
+    except BrokenPipeError:
+        pass
+    finally:
+        dst.close()
+
+
+def run_stream_process(args, env, src, dst, chunk_size=STREAM_CHUNK, what="流式加密"):
+    """运行从标准输入读、向标准输出写的模板程序，把src（二进制文件对象）的处理结果写入dst
+
+    有fileno()的文件直接交给子进程读写；BytesIO等内存对象由线程按分段转发。
+    返回写入的字节数（dst不可定位时返回None）。
+    """
+    src_fd, dst_fd = _fileno(src), _fileno(dst)
+    if dst_fd is not None:
+        dst.flush()
+        start = os.lseek(dst_fd, 0, os.SEEK_CUR) if dst.seekable() else None
+
+    proc = subprocess.Popen(
+        args,
+        stdin=src_fd if src_fd is not None else subprocess.PIPE,
+        stdout=dst_fd if dst_fd is not None else subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        preexec_fn=limit_resources(STREAM_LIMITS["cpu_seconds"], STREAM_LIMITS["memory_bytes"])
+    )
+    pump = None
+    if src_fd is None:
+        pump = threading.Thread(target=_pump, args=(src, proc.stdin, chunk_size), daemon=True)
+        pump.start()
+
+    written = 0
+    if dst_fd is None:
+        for chunk in iter(lambda: proc.stdout.read(chunk_size), b""):
+            dst.write(chunk)
+            written += len(chunk)
+    # stderr只有出错时的一行信息，读完后等待进程退出
+    stderr = proc.stderr.read()
+    proc.wait()
+    if pump:
+        pump.join()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{what}失败（退出代码{proc.returncode}）: {stderr.decode(errors='replace').strip()}")
+
+    if dst_fd is not None:
+        if start is None:
+            return None
+        written = os.lseek(dst_fd, 0, os.SEEK_END) - start
+        dst.seek(0, os.SEEK_END)
+    return written
+
+
+def encrypt_stream(name, key, iv, src, dst, chunk_size=STREAM_CHUNK, work_dir=None, api="legacy"):
+    """把src（二进制文件对象）流式加密写入dst，返回写入的密文字节数"""
+    _check_key_iv(name, key, iv)
+    exec_path = build_stream(name, work_dir=work_dir, api=api)
+    env = dict(os.environ, STREAM_KEY=key.hex(), STREAM_IV=(iv or b"").hex())
+    return run_stream_process([exec_path, str(chunk_size)], env, src, dst, chunk_size)
+
+
+def decrypt_stream(name, key, iv, src, dst, chunk_size=STREAM_CHUNK, work_dir=None, api="legacy"):
+    """把src中的密文流式解密写入dst，在输入结束时检查并去除填充，返回写入的明文字节数
+
+    填充无效（密钥错误或密文损坏）时抛出RuntimeError，此前写入dst的明文必须丢弃。
+    """
+    _check_key_iv(name, key, iv)
+    exec_path = build_stream(name, work_dir=work_dir, api=api, decrypt=True)
+    env = dict(os.environ, STREAM_KEY=key.hex(), STREAM_IV=(iv or b"").hex())
+    return run_stream_process([exec_path, str(chunk_size)], env, src, dst, chunk_size, what="流式解密")
+
+
+def _run_mmap(exec_path, key, iv, in_path, out_path, what):
+    env = dict(os.environ, STREAM_KEY=key.hex(), STREAM_IV=(iv or b"").hex())
+    proc = subprocess.run(
+        [exec_path, in_path, out_path],
+        capture_output=True,
+        env=env,
+        preexec_fn=limit_resources(STREAM_LIMITS["cpu_seconds"], STREAM_LIMITS["memory_bytes"])
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{what}失败（退出代码{proc.returncode}）: {proc.stderr.decode(errors='replace').strip()}")
+    return os.path.getsize(out_path)
+
+
+def encrypt_file(name, key, iv, in_path, out_path, use_mmap=True, work_dir=None, api="legacy"):
+    """加密文件：默认内存映射输入与输出文件，use_mmap=False时按分段流式读写；返回密文字节数"""
+    _check_key_iv(name, key, iv)
+    if os.path.abspath(in_path) == os.path.abspath(out_path):
+        raise ValueError("输入文件与输出文件不能相同")
+    if not use_mmap:
+        with open(in_path, "rb") as src, open(out_path, "wb") as dst:
+            return encrypt_stream(name, key, iv, src, dst, work_dir=work_dir, api=api)
+
+    exec_path = build_mmap(name, work_dir=work_dir, api=api)
+    return _run_mmap(exec_path, key, iv, in_path, out_path, "内存映射加密")
+
+
+def decrypt_file(name, key, iv, in_path, out_path, use_mmap=True, work_dir=None, api="legacy"):
+    """解密文件（参数同encrypt_file），填充无效时删除输出文件并抛出RuntimeError；返回明文字节数"""
+    _check_key_iv(name, key, iv)
+    if os.path.abspath(in_path) == os.path.abspath(out_path):
+        raise ValueError("输入文件与输出文件不能相同")
+    try:
+        if not use_mmap:
+            with open(in_path, "rb") as src, open(out_path, "wb") as dst:
+                return decrypt_stream(name, key, iv, src, dst, work_dir=work_dir, api=api)
+        exec_path = build_mmap(name, work_dir=work_dir, api=api, decrypt=True)
+        return _run_mmap(exec_path, key, iv, in_path, out_path, "内存映射解密")
+    except RuntimeError:
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        raise
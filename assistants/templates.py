@@ -0,0 +1,267 @@
+import hashlib
+import os
+import subprocess
+import threading
+from string import Template
+
+from assistants.metrics import cache_lookup
+
+# 固定模板程序使用的算法/模式参数（与各助手类的提示词约定一致：PKCS#7填充、CFB/OFB为128/64位反馈，
+# SM4-CTR不填充）；library为链接的密码库（见TEMPLATE_LIBS），默认openssl
+# 片段中可用变量：ks（密钥调度）、key、ivbuf（可变IV/链接状态/CTR计数器）、num（CFB/OFB偏移）、in、out、len
+TEMPLATE_SPECS = {
+    "AES-ECB": {
+        "includes": "#include <openssl/aes.h>",
+        "key_length": 32, "iv_length": 0, "block_size": 16, "padding": 1,
+        "key_state": "AES_KEY ks;",
+        "set_key": "AES_set_encrypt_key(key, KEY_LEN * 8, &ks);",
+        "crypt": "for (size_t i = 0; i < len; i += BLOCK_SIZE) AES_ecb_encrypt(in + i, out + i, &ks, AES_ENCRYPT);",
+    },
+    "AES-CBC": {
+        "includes": "#include <openssl/aes.h>",
+        "key_length": 32, "iv_length": 16, "block_size": 16, "padding": 1,
+        "key_state": "AES_KEY ks;",
+        "set_key": "AES_set_encrypt_key(key, KEY_LEN * 8, &ks);",
+        "crypt": "AES_cbc_encrypt(in, out, len, &ks, ivbuf, AES_ENCRYPT);",
+    },
+    "AES-CFB": {
+        "includes": "#include <openssl/aes.h>",
+        "key_length": 32, "iv_length": 16, "block_size": 16, "padding": 1,
+        "key_state": "AES_KEY ks;",
+        "set_key": "AES_set_encrypt_key(key, KEY_LEN * 8, &ks);",
+        "crypt": "AES_cfb128_encrypt(in, out, len, &ks, ivbuf, &num, AES_ENCRYPT);",
+    },
+    "AES-OFB": {
+        "includes": "#include <openssl/aes.h>",
+        "key_length": 32, "iv_length": 16, "block_size": 16, "padding": 1,
+        "key_state": "AES_KEY ks;",
+        "set_key": "AES_set_encrypt_key(key, KEY_LEN * 8, &ks);",
+        "crypt": "AES_ofb128_encrypt(in, out, len, &ks, ivbuf, &num);",
+    },
+    "DES-ECB": {
+        "includes": "#include <openssl/des.h>",
+        "key_length": 8, "iv_length": 0, "block_size": 8, "padding": 1,
+        "key_state": "DES_key_schedule ks;",
+        "set_key": "DES_set_key_unchecked((const_DES_cblock *)key, &ks);",
+        "crypt": ("for (size_t i = 0; i < len; i += BLOCK_SIZE) "
+                  "DES_ecb_encrypt((const_DES_cblock *)(in + i), (DES_cblock *)(out + i), &ks, DES_ENCRYPT);"),
+    },
+    "DES-CBC": {
+        "includes": "#include <openssl/des.h>",
+        "key_length": 8, "iv_length": 8, "block_size": 8, "padding": 1,
+        "key_state": "DES_key_schedule ks;",
+        "set_key": "DES_set_key_unchecked((const_DES_cblock *)key, &ks);",
+        "crypt": "DES_ncbc_encrypt(in, out, (long)len, &ks, (DES_cblock *)ivbuf, DES_ENCRYPT);",
+    },
+    "DES-CFB": {
+        "includes": "#include <openssl/des.h>",
+        "key_length": 8, "iv_length": 8, "block_size": 8, "padding": 1,
+        "key_state": "DES_key_schedule ks;",
+        "set_key": "DES_set_key_unchecked((const_DES_cblock *)key, &ks);",
+        "crypt": "DES_cfb64_encrypt(in, out, (long)len, &ks, (DES_cblock *)ivbuf, &num, DES_ENCRYPT);",
+    },
+    "DES-OFB": {
+        "includes": "#include <openssl/des.h>",
+        "key_length": 8, "iv_length": 8, "block_size": 8, "padding": 1,
+        "key_state": "DES_key_schedule ks;",
+        "set_key": "DES_set_key_unchecked((const_DES_cblock *)key, &ks);",
+        "crypt": "DES_ofb64_encrypt(in, out, (long)len, &ks, (DES_cblock *)ivbuf, &num);",
+    },
+    # GmSSL 3.2.1 的多块批量接口；CBC/CTR会更新ivbuf，分段之间链接状态延续
+    "SM4-ECB": {
+        "includes": "#include <gmssl/sm4.h>", "library": "gmssl",
+        "key_length": 16, "iv_length": 0, "block_size": 16, "padding": 1,
+        "key_state": "SM4_KEY ks;",
+        "set_key": "sm4_set_encrypt_key(&ks, key);",
+        "crypt": "sm4_encrypt_blocks(&ks, in, len / BLOCK_SIZE, out);",
+    },
+    "SM4-CBC": {
+        "includes": "#include <gmssl/sm4.h>", "library": "gmssl",
+        "key_length": 16, "iv_length": 16, "block_size": 16, "padding": 1,
+        "key_state": "SM4_KEY ks;",
+        "set_key": "sm4_set_encrypt_key(&ks, key);",
+        "crypt": "sm4_cbc_encrypt_blocks(&ks, ivbuf, in, len / BLOCK_SIZE, out);",
+    },
+    "SM4-CTR": {
+        "includes": "#include <gmssl/sm4.h>", "library": "gmssl",
+        "key_length": 16, "iv_length": 16, "block_size": 16, "padding": 0,
+        "key_state": "SM4_KEY ks;",
+        "set_key": "sm4_set_encrypt_key(&ks, key);",
+        "crypt": "sm4_ctr_encrypt(&ks, ivbuf, in, len, out);",
+    },
+}
+
+# 解密时替换的片段（OFB与CTR的解密与加密相同，未列出）；AES与SM4的ECB/CBC解密需要解密密钥调度
+DECRYPT_OVERRIDES = {
+    "AES-ECB": {
+        "set_key": "AES_set_decrypt_key(key, KEY_LEN * 8, &ks);",
+        "crypt": "for (size_t i = 0; i < len; i += BLOCK_SIZE) AES_ecb_encrypt(in + i, out + i, &ks, AES_DECRYPT);",
+    },
+    "AES-CBC": {
+        "set_key": "AES_set_decrypt_key(key, KEY_LEN * 8, &ks);",
+        "crypt": "AES_cbc_encrypt(in, out, len, &ks, ivbuf, AES_DECRYPT);",
+    },
+    "AES-CFB": {
+        "crypt": "AES_cfb128_encrypt(in, out, len, &ks, ivbuf, &num, AES_DECRYPT);",
+    },
+    "DES-ECB": {
+        "crypt": ("for (size_t i = 0; i < len; i += BLOCK_SIZE) "
+                  "DES_ecb_encrypt((const_DES_cblock *)(in + i), (DES_cblock *)(out + i), &ks, DES_DECRYPT);"),
+    },
+    "DES-CBC": {
+        "crypt": "DES_ncbc_encrypt(in, out, (long)len, &ks, (DES_cblock *)ivbuf, DES_DECRYPT);",
+    },
+    "DES-CFB": {
+        "crypt": "DES_cfb64_encrypt(in, out, (long)len, &ks, (DES_cblock *)ivbuf, &num, DES_DECRYPT);",
+    },
+    # GmSSL的ECB解密用解密密钥调度调用同一个批量接口
+    "SM4-ECB": {
+        "set_key": "sm4_set_decrypt_key(&ks, key);",
+    },
+    "SM4-CBC": {
+        "set_key": "sm4_set_decrypt_key(&ks, key);",
+        "crypt": "sm4_cbc_decrypt_blocks(&ks, ivbuf, in, len / BLOCK_SIZE, out);",
+    },
+}
+
+TEMPLATE_DECRYPT_SPECS = {name: dict(spec, decrypt=1, **DECRYPT_OVERRIDES.get(name, {}))
+                          for name, spec in TEMPLATE_SPECS.items()}
+
+# EVP接口使用的密码（与旧版接口的约定一致：AES-256，CFB/OFB为128/64位反馈）
+# OpenSSL 3中旧版AES_*接口不一定走AES-NI/VAES等最快路径，EVP接口会按CPU选择实现
+EVP_CIPHERS = {
+    "AES-ECB": "EVP_aes_256_ecb",
+    "AES-CBC": "EVP_aes_256_cbc",
+    "AES-CFB": "EVP_aes_256_cfb128",
+    "AES-OFB": "EVP_aes_256_ofb",
+    "DES-ECB": "EVP_des_ecb",
+    "DES-CBC": "EVP_des_cbc",
+    "DES-CFB": "EVP_des_cfb64",
+    "DES-OFB": "EVP_des_ofb",
+    "SM4-ECB": "EVP_sm4_ecb",
+    "SM4-CBC": "EVP_sm4_cbc",
+    "SM4-CTR": "EVP_sm4_ctr",
+}
+
+# OpenSSL 3把DES移到了legacy提供者中，需要在使用前加载
+EVP_LEGACY_PROVIDER = """#include <openssl/opensslv.h>
+#if OPENSSL_VERSION_NUMBER >= 0x30000000L
+#include <openssl/provider.h>
+__attribute__((constructor)) static void load_legacy_provider(void) {
+    OSSL_PROVIDER_load(NULL, "legacy");
+    OSSL_PROVIDER_load(NULL, "default");
+}
+#endif"""
+
+TEMPLATE_APIS = ("legacy", "evp")
+
+
+def _evp_spec(name, cipher, decrypt=False):
+    includes = "#include <openssl/evp.h>"
+    if name.startswith("DES"):
+        includes += "\n" + EVP_LEGACY_PROVIDER
+    iv = "IV_LEN > 0 ? ivbuf : NULL"
+    # 关闭EVP的填充：加密时由模板程序自己填充，解密时由模板程序检查并去除填充
+    op = "Decrypt" if decrypt else "Encrypt"
+    return dict(
+        TEMPLATE_SPECS[name],
+        includes=includes,
+        library="openssl",
+        decrypt=int(decrypt),
+        key_state="EVP_CIPHER_CTX *ctx = EVP_CIPHER_CTX_new();\n    int outl = 0;",
+        set_key=f"EVP_{op}Init_ex(ctx, {cipher}(), NULL, key, {iv}); EVP_CIPHER_CTX_set_padding(ctx, 0);",
+        set_iv=f"EVP_{op}Init_ex(ctx, NULL, NULL, NULL, {iv});",
+        # EVP_EncryptUpdate的长度是int，超长输入按1GiB分段（块大小的整数倍，链接状态保存在ctx中）
+        crypt=("for (size_t off = 0; off < len; off += (size_t)1 << 30) "
+               f"EVP_{op}Update(ctx, out + off, &outl, in + off, "
+               "(int)(len - off < ((size_t)1 << 30) ? len - off : ((size_t)1 << 30)));"),
+    )
+
+
+EVP_TEMPLATE_SPECS = {name: _evp_spec(name, cipher) for name, cipher in EVP_CIPHERS.items()}
+EVP_TEMPLATE_DECRYPT_SPECS = {name: _evp_spec(name, cipher, decrypt=True) for name, cipher in EVP_CIPHERS.items()}
+
+TEMPLATE_LIBS = {
+    "openssl": ["-lcrypto"],
+    "gmssl": ["-I/usr/local/include", "-L/usr/local/lib", "-lgmssl", "-Wl,-rpath=/usr/local/lib"],
+}
+
+# 模板程序公共头部
+COMMON_HEADER = Template("""#include <stddef.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+$includes
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+#define KEY_LEN $key_length
+#define IV_LEN $iv_length
+#define BLOCK_SIZE $block_size
+#define IV_BUF_LEN (IV_LEN > 0 ? IV_LEN : 1)
+#define PADDING $padding
+#define DECRYPT $decrypt
+""")
+
+
+def get_spec(name, api="legacy", decrypt=False):
+    """按名称（如"AES-CBC"）与接口（legacy/evp）获取模板参数，decrypt为True时返回解密片段"""
+    if api not in TEMPLATE_APIS:
+        raise ValueError(f"不支持的接口: {api}，支持：{list(TEMPLATE_APIS)}")
+    if decrypt:
+        specs = EVP_TEMPLATE_DECRYPT_SPECS if api == "evp" else TEMPLATE_DECRYPT_SPECS
+    else:
+        specs = EVP_TEMPLATE_SPECS if api == "evp" else TEMPLATE_SPECS
+    spec = specs.get(name.upper())
+    if spec is None:
+        raise ValueError(f"不支持的模板算法: {name}（{api}），支持：{list(specs.keys())}")
+    return spec
+
+
+def template_libs(name, api="legacy"):
+    """模板程序需要链接的库参数"""
+    return TEMPLATE_LIBS[get_spec(name, api).get("library", "openssl")]
+
+
+def render(name, body, api="legacy", decrypt=False):
+    """用算法参数渲染模板：公共头部 + 程序主体（主体中可使用 $key_state 等占位符）"""
+    spec = get_spec(name, api, decrypt)
+    # 旧版接口直接使用ivbuf，重新设置IV时不需要额外操作
+    values = {"set_iv": "", "decrypt": 0}
+    values.update((k, v) for k, v in spec.items() if isinstance(v, (str, int)))
+    return COMMON_HEADER.substitute(values) + "\n" + Template(body).substitute(values)
+
+
+def build_binary(name, kind, source, work_dir=None, cflags=("-O2",), libs=None):
+    """编译模板程序，按源码与编译参数的哈希缓存可执行文件，返回可执行文件路径"""
+    work_dir = work_dir or os.path.join(os.getcwd(), "template_workdir")
+    os.makedirs(work_dir, exist_ok=True)
+    libs = list(libs) if libs is not None else TEMPLATE_LIBS["openssl"]
+
+    digest = hashlib.sha256((source + " ".join(cflags) + " ".join(libs)).encode()).hexdigest()[:12]
+    base = f"{name.lower().replace('-', '_')}_{kind}_{digest}"
+    exec_path = os.path.join(work_dir, base)
+    hit = os.path.exists(exec_path)
+    cache_lookup("template", hit)
+    if hit:
+        return exec_path
+
+    # 源码与可执行文件先写到本线程独有的临时文件再改名：同一进程的多个线程或多个进程同时编译同一模板时
+    # 互不覆盖，也不会运行到未写完的文件
+    code_path = exec_path + ".c"
+    tmp_path = f"{exec_path}.tmp{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path + ".c", "w") as f:
+        f.write(source)
+
+    compile_result = subprocess.run(
+        ["gcc", tmp_path + ".c", "-o", tmp_path, "-Wall", *cflags, *libs],
+        capture_output=True,
+        text=True
+    )
+    if compile_result.returncode != 0:
+        os.remove(tmp_path + ".c")
+        raise RuntimeError(f"编译失败: {compile_result.stderr.replace(tmp_path + '.c', code_path)}")
+    os.replace(tmp_path + ".c", code_path)
+    os.chmod(tmp_path, 0o755)
+    os.replace(tmp_path, exec_path)
+    return exec_path
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 记录的时间段按线程显示；未开启记录时span()不做任何事，热路径上只多一次全局变量检查
+_tracer = None
+
+
+class Tracer:
+    """按Chrome trace-event格式记录各阶段的时间段（可在 https://ui.perfetto.dev 或 chrome://tracing 中打开）
+
+    同一线程内的时间段按起止时间嵌套显示（如 生成 → HTTP请求、净化）；跨线程的一次尝试
+    （流水线中生成、编译、校验分属不同线程）记为异步时间段。时间戳取自time.perf_counter()（单调时钟）。
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.events = []
+        self.threads = {}
+
+    def _us(self, t):
+        return round((t - self.origin) * 1e6, 3)
+
+    def _thread(self):
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        return tid
+
+    def complete(self, name, start, end, cat="crypto", args=None):
+        """记录当前线程上的一个完整时间段（start/end为perf_counter秒数）"""
+        event = {"name": name, "cat": cat, "ph": "X", "ts": self._us(start), "dur": self._us(end) - self._us(start),
+                 "pid": self.pid, "tid": self._thread()}
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.events.append(event)
+
+    def complete_async(self, name, span_id, start, end, cat="crypto", args=None):
+        """记录一个不属于某个线程的时间段（如跨线程的一次尝试），相同cat与span_id的时间段显示在同一轨道上"""
+        begin = {"name": name, "cat": cat, "ph": "b", "id": span_id, "ts": self._us(start), "pid": self.pid,
+                 "tid": self._thread()}
+        if args:
+            begin["args"] = args
+        end_event = dict(begin, ph="e", ts=self._us(end))
+        end_event.pop("args", None)
+        with self.lock:
+            self.events += [begin, end_event]
+
+    def to_json(self):
+        """返回trace-event格式的JSON对象（含进程与线程名称）"""
+        with self.lock:
+            events = list(self.events)
+            threads = dict(self.threads)
+        meta = [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "CryptoAssist"}}]
+        meta += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in threads.items()]
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, ensure_ascii=False)
+
+
+def active():
+    """当前正在记录的Tracer（未开启时为None）"""
+    return _tracer
+
+
+@contextmanager
+def span(name, cat="crypto", /, **args):
+    """记录with块的耗时；块内可向返回的字典添加结果（如是否成功），一并写入时间段的args"""
+    tracer = _tracer
+    if tracer is None:
+        yield args
+        return
+    start = time.perf_counter()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        tracer.complete(name, start, time.perf_counter(), cat, args)
+
+
+@contextmanager
+def tracing(path):
+    """path不为空时在with块内记录时间段，结束时（包括出错或被中断）写入path；path为空时不记录"""
+    global _tracer
+    if not path:
+        yield None
+        return
+    tracer = _tracer = Tracer()
+    try:
+        yield tracer
+    finally:
+        _tracer = None
+        tracer.write(path)
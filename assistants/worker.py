@@ -0,0 +1,269 @@
+import queue
+import select
+import struct
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from assistants.runner import TIMEOUT_ERROR, WORKER_LIMITS, limit_resources
+from assistants.templates import build_binary, get_spec, render, template_libs
+
+# 常驻工作进程协议（所有整数为4字节大端）：
+#   请求：key_len key | iv_len iv | data_len data
+#   响应：status | len | payload    （status为0时payload是密文，否则是错误信息）
+# 密钥与上一条记录相同时跳过密钥调度。解密工作进程只做块运算、不去除填充（由调用方在最后一个分片上检查），
+# 填充模式的密文须为整块
+WORKER_BODY = r"""
+static int read_exact(void *buf, size_t len) {
+    return len == 0 || fread(buf, 1, len, stdin) == len;
+}
+
+static int read_u32(uint32_t *value) {
+    unsigned char b[4];
+    if (!read_exact(b, 4)) return 0;
+    *value = ((uint32_t)b[0] << 24) | ((uint32_t)b[1] << 16) | ((uint32_t)b[2] << 8) | b[3];
+    return 1;
+}
+
+static void write_u32(uint32_t value) {
+    unsigned char b[4] = {value >> 24, value >> 16, value >> 8, value};
+    fwrite(b, 1, 4, stdout);
+}
+
+static void reply(uint32_t status, const unsigned char *data, uint32_t len) {
+    write_u32(status);
+    write_u32(len);
+    if (len) fwrite(data, 1, len, stdout);
+    fflush(stdout);
+}
+
+static int read_field(unsigned char **buf, size_t *cap, uint32_t *len, size_t extra) {
+    if (!read_u32(len)) return 0;
+    if (*len + extra > *cap) {
+        unsigned char *p = realloc(*buf, *len + extra);
+        if (!p) return 0;
+        *buf = p;
+        *cap = *len + extra;
+    }
+    return read_exact(*buf, *len);
+}
+
+int main(void) {
+    $key_state
+    unsigned char cur_key[KEY_LEN];
+    unsigned char ivbuf[IV_BUF_LEN];
+    unsigned char *key = NULL, *iv = NULL, *in = NULL, *out = NULL;
+    size_t key_cap = 0, iv_cap = 0, in_cap = 0, out_cap = 0;
+    uint32_t key_len, iv_len, data_len;
+    int have_key = 0, num = 0;
+    static const char bad_len[] = "invalid key/iv length";
+    static const char bad_data[] = "ciphertext length is not a multiple of the block size";
+
+    while (read_field(&key, &key_cap, &key_len, 0)
+           && read_field(&iv, &iv_cap, &iv_len, 0)
+           && read_field(&in, &in_cap, &data_len, BLOCK_SIZE)) {
+        if (key_len != KEY_LEN || iv_len != IV_LEN) {
+            reply(1, (const unsigned char *)bad_len, sizeof(bad_len) - 1);
+            continue;
+        }
+        if (DECRYPT && PADDING && data_len % BLOCK_SIZE) {
+            reply(1, (const unsigned char *)bad_data, sizeof(bad_data) - 1);
+            continue;
+        }
+        if (!have_key || memcmp(cur_key, key, KEY_LEN) != 0) {
+            $set_key
+            memcpy(cur_key, key, KEY_LEN);
+            have_key = 1;
+        }
+
+        size_t pad = PADDING && !DECRYPT ? BLOCK_SIZE - data_len % BLOCK_SIZE : 0;
+        size_t len = data_len + pad;
+        memset(in + data_len, (int)pad, pad);
+        if (len > out_cap) {
+            unsigned char *p = realloc(out, len);
+            if (!p) return 1;
+            out = p;
+            out_cap = len;
+        }
+
+        memcpy(ivbuf, iv, IV_LEN);
+        num = 0;
+        $set_iv
+        $crypt
+        (void)num;
+        reply(0, out, (uint32_t)len);
+    }
+
+    free(key);
+    free(iv);
+    free(in);
+    free(out);
+    return 0;
+}
+"""
+
+
+def build_worker(name, work_dir=None, cflags=("-O2",), api="legacy", decrypt=False):
+    """编译指定算法/模式的常驻工作进程程序（api为legacy或evp，decrypt为True时做解密），返回可执行文件路径"""
+    return build_binary(name, "decrypt_worker" if decrypt else "worker", render(name, WORKER_BODY, api, decrypt),
+                        work_dir=work_dir, cflags=cflags, libs=template_libs(name, api))
+
+
+def encode_record(key, iv, data):
+    """按工作进程协议编码一条记录"""
+    iv = iv or b""
+    return b"".join(struct.pack(">I", len(field)) + field for field in (key, iv, data))
+
+
+class WorkerError(RuntimeError):
+    """工作进程返回错误或意外退出"""
+
+
+class WorkerReplyError(WorkerError):
+    """工作进程拒绝了这条记录（如密钥/IV长度错误），进程本身仍可继续使用"""
+
+
+class WorkerTimeout(WorkerError):
+    """工作进程处理单条记录超时（进程已被终止）"""
+
+
+class WorkerProcess:
+    """单个常驻工作进程，一次处理一条记录（带单条记录超时与CPU/内存限制）"""
+
+    def __init__(self, exec_path, timeout=None, cpu_seconds=None, memory_bytes=None):
+        self.exec_path = exec_path
+        self.timeout = timeout or WORKER_LIMITS["timeout"]
+        self.proc = subprocess.Popen(
+            [exec_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+            preexec_fn=limit_resources(cpu_seconds or WORKER_LIMITS["cpu_seconds"],
+                                       memory_bytes or WORKER_LIMITS["memory_bytes"])
+        )
+        self.lock = threading.Lock()
+
+    def _read_exact(self, size, deadline):
+        chunks = []
+        while size > 0:
+            remaining = deadline - time.monotonic()
+            ready, _, _ = select.select([self.proc.stdout], [], [], max(remaining, 0))
+            if not ready:
+                self.proc.kill()
+                self.proc.wait()
+                raise WorkerTimeout(f"{TIMEOUT_ERROR}（单条记录超过{self.timeout}秒）")
+            chunk = self.proc.stdout.read(size)
+            if not chunk:
+                raise WorkerError(f"工作进程意外退出，退出代码: {self.proc.poll()}")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def encrypt(self, key, iv, data):
+        """发送一条记录并返回密文"""
+        with self.lock:
+            try:
+                self.proc.stdin.write(encode_record(key, iv, data))
+            except BrokenPipeError:
+                raise WorkerError(f"工作进程意外退出，退出代码: {self.proc.poll()}")
+            deadline = time.monotonic() + self.timeout
+            status, length = struct.unpack(">II", self._read_exact(8, deadline))
+            payload = self._read_exact(length, deadline)
+        if status != 0:
+            raise WorkerReplyError(f"工作进程返回错误: {payload.decode(errors='replace')}")
+        return payload
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+
+class WorkerPool:
+    """按算法/模式管理一组常驻工作进程，并统计吞吐量（decrypt为True时工作进程做解密）"""
+
+    def __init__(self, name, size=4, work_dir=None, api="legacy", decrypt=False):
+        self.name = name.upper()
+        self.direction = "decrypt" if decrypt else "encrypt"
+        self.spec = get_spec(self.name, api, decrypt)
+        self.exec_path = build_worker(self.name, work_dir=work_dir, api=api, decrypt=decrypt)
+        self.size = size
+        self.idle = queue.Queue()
+        self.workers = [WorkerProcess(self.exec_path) for _ in range(size)]
+        for worker in self.workers:
+            self.idle.put(worker)
+
+        self.stats_lock = threading.Lock()
+        self.messages = 0
+        self.bytes_in = 0
+        self.busy_time = 0.0
+        self.started = time.perf_counter()
+
+    def encrypt(self, key, iv, data):
+        """从池中取一个空闲工作进程加密一条记录"""
+        worker = healthy = self.idle.get()
+        start = time.perf_counter()
+        try:
+            ciphertext = worker.encrypt(key, iv, data)
+        except WorkerReplyError:
+            # 记录本身非法，工作进程正常，直接放回池中
+            raise
+        except WorkerError:
+            # 超时或意外退出：替换为新进程后再抛出；新进程启动失败时旧进程也不再放回池中
+            healthy = None
+            healthy = self._replace(worker)
+            raise
+        finally:
+            if healthy is not None:
+                self.idle.put(healthy)
+        with self.stats_lock:
+            self.messages += 1
+            self.bytes_in += len(data)
+            self.busy_time += time.perf_counter() - start
+        return ciphertext
+
+    def decrypt(self, key, iv, data):
+        """解密一条整块记录（池须以decrypt=True创建），返回未去除填充的明文"""
+        if self.direction != "decrypt":
+            raise ValueError("该工作进程池用于加密，请以decrypt=True创建")
+        return self.encrypt(key, iv, data)
+
+    def _replace(self, worker):
+        worker.close()
+        new_worker = WorkerProcess(self.exec_path)
+        self.workers[self.workers.index(worker)] = new_worker
+        return new_worker
+
+    def encrypt_many(self, records):
+        """并发加密多条 (key, iv, data) 记录，按输入顺序返回密文列表"""
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(lambda r: self.encrypt(*r), records))
+
+    def stats(self):
+        """返回累计的消息数与吞吐量"""
+        elapsed = time.perf_counter() - self.started
+        with self.stats_lock:
+            return {
+                "name": self.name,
+                "direction": self.direction,
+                "workers": self.size,
+                "messages": self.messages,
+                "bytes": self.bytes_in,
+                "elapsed": elapsed,
+                "messages_per_second": self.messages / elapsed if elapsed > 0 else 0.0,
+            }
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,65 +1,460 @@
 import argparse
-import getpass
+import os
 import sys
-import re
-
-# 支持的算法与后端映射关系（包含是否需要mode参数的标记）
-SUPPORTED_ALGORITHMS = {
-    "openssl": {
-        "RSA": {"internal_name": "rsa", "needs_mode": False},
-        "AES-ECB": {"internal_name": "aes_ecb", "needs_mode": True},
-        "AES-CBC": {"internal_name": "aes_cbc", "needs_mode": True},
-        "DES-ECB": {"internal_name": "des_ecb", "needs_mode": True},
-        "DES-CBC": {"internal_name": "des_cbc", "needs_mode": True}
-    },
-    "gmssl": {
-        "SM4-ECB": {"internal_name": "sm4_ecb", "needs_mode": False},
-        "SM4-CBC": {"internal_name": "sm4_cbc", "needs_mode": False}
-    }
-}
+
+from assistants.registry import BACKENDS, create_helper, get_entry, load_helper_class, supported
+
+# 子命令与帮助信息只用到标准库中很轻的部分；json、subprocess、getpass以及依赖requests的助手模块都在用到时才导入
 
 def import_helper(backend: str, algorithm: str):
-    """动态导入对应的加密助手类"""
+    """按登记表导入对应的加密助手类（如 "AES-CBC"），模块在第一次调用时才导入"""
     try:
-        if backend == "openssl":
-            if algorithm == "rsa":
-                from assistants.rsa_helper import RSAHelper
-                return RSAHelper
-            elif algorithm.startswith("aes"):
-                from assistants.aes_helper import AESHelper
-                return AESHelper
-            elif algorithm.startswith("des"):
-                from assistants.des_helper import DESHelper
-                return DESHelper
-        elif backend == "gmssl":
-            if algorithm.startswith("sm4"):
-                from assistants.gmssl_helper import SM4Helper
-                return SM4Helper
-        raise ImportError(f"不支持的{backend}后端算法: {algorithm}")
+        return load_helper_class(algorithm, backend)
     except ImportError as e:
         print(f"❌ 导入助手类失败: {str(e)}")
         sys.exit(1)
 
+def _write_json(path, data):
+    import json
+    with open(path, "w") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
 def validate_api_key(api_key: str) -> bool:
     """验证API Key有效性（智谱API Key通常为32位以上）"""
     return bool(api_key and len(api_key) >= 32)
 
+def run_kat_command(argv):
+    """kat子命令：用已知答案向量并发检查所有已编译的候选程序"""
+    parser = argparse.ArgumentParser(prog='cli.py kat', description='已知答案测试（KAT）')
+    parser.add_argument('--workers', type=int, default=None, help='并发进程数（默认CPU核数）')
+    parser.add_argument('--templates', action='store_true', help='同时检查内置模板工作进程')
+    parser.add_argument('--no-cache', action='store_true', help='忽略按程序哈希缓存的判定结果')
+    parser.add_argument('--json', type=str, default=None, help='将判定结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    from assistants.kat import collect_candidates, run_kat
+    candidates = collect_candidates(include_templates=args.templates)
+    if not candidates:
+        print("⚠️ 未找到已编译的候选程序")
+        return 1
+
+    verdicts = run_kat(candidates, workers=args.workers, use_cache=not args.no_cache)
+    for verdict in verdicts:
+        passed = sum(c["passed"] for c in verdict["cases"])
+        mark = "✅" if verdict["passed"] else "❌"
+        cached = "（缓存）" if verdict["cached"] else ""
+        print(f"{mark} {verdict['name']:<8} {passed}/{len(verdict['cases'])} {verdict['exec_path']}{cached}")
+        for case in verdict["cases"]:
+            if not case["passed"]:
+                print(f"    - {case['vector']}: {case['error']}")
+
+    if args.json:
+        _write_json(args.json, verdicts)
+    return 0 if all(v["passed"] for v in verdicts) else 1
+
+def run_fuzz_command(argv):
+    """fuzz子命令：以本机openssl enc/gmssl为参考实现，对已编译程序做差分测试"""
+    parser = argparse.ArgumentParser(prog='cli.py fuzz', description='差分模糊测试')
+    parser.add_argument('--cases', type=int, default=200, help='每个候选程序的用例数')
+    parser.add_argument('--workers', type=int, default=None, help='并发进程数（默认CPU核数）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--templates', action='store_true', help='同时测试内置模板工作进程')
+    parser.add_argument('--json', type=str, default=None, help='将测试报告写入JSON文件')
+    args = parser.parse_args(argv)
+
+    from assistants.fuzz import run_fuzz
+    from assistants.kat import collect_candidates
+    candidates = collect_candidates(include_templates=args.templates)
+    result = run_fuzz(candidates, cases_per_candidate=args.cases, workers=args.workers, seed=args.seed)
+    if not result["reports"]:
+        print("⚠️ 未找到可测试的候选程序")
+        return 1
+
+    for report in result["reports"]:
+        if report["oracle_error"]:
+            print(f"⚠️ {report['name']:<8} 没有可用的参考实现，跳过（{report['oracle_error']}）{report['exec_path']}")
+            continue
+        mark = "✅" if report["failed"] == 0 else "❌"
+        print(f"{mark} {report['name']:<8} {report['cases'] - report['failed']}/{report['cases']} "
+              f"{report['cases_per_second']:.1f} 例/秒 {report['exec_path']}")
+        for failure in report["failures"][:3]:
+            print(f"    - key={failure['key']} iv={failure['iv']} plaintext={failure['plaintext'] or '(空)'}")
+            print(f"      期望 {failure['expected']}，实际 {failure['actual']} {failure['error']}")
+    print(f"📊 共 {result['cases']} 例，耗时 {result['elapsed']:.2f} 秒，{result['cases_per_second']:.1f} 例/秒")
+
+    if args.json:
+        _write_json(args.json, result)
+    return 0 if all(r["failed"] == 0 for r in result["reports"]) else 1
+
+def run_bench_command(argv):
+    """bench子命令：测试各算法/模式的加密吞吐量，并与openssl speed、gmssl对比"""
+    parser = argparse.ArgumentParser(prog='cli.py bench', description='加密吞吐量基准测试')
+    parser.add_argument('--modes', nargs='+', default=None, help='算法/模式，如 AES-CBC SM4-CTR（默认全部）')
+    parser.add_argument('--sizes', nargs='+', default=None, help='负载大小，支持K/M/G后缀（默认16B～1GiB）')
+    parser.add_argument('--seconds', type=float, default=1.0, help='每项测试的最短耗时（秒）')
+    parser.add_argument('--no-generated', action='store_true', help='不测试各工作目录中的生成程序')
+    parser.add_argument('--file-io', action='store_true', help='同时比较文件加密的内存映射与分段读写')
+    parser.add_argument('--jobs', type=int, default=None, help='文件加密测试中并行分片的进程数（默认CPU核数）')
+    parser.add_argument('--api', choices=['legacy', 'evp'], default='legacy', help='文件加密测试使用的OpenSSL接口')
+    parser.add_argument('--hybrid', action='store_true', help='同时测试RSA-OAEP + AES-GCM混合加密/解密')
+    parser.add_argument('--roundtrip', action='store_true',
+                        help='同时测试文件解密（CBC/CFB等可并行模式含并行分片）与加密+解密往返，并校验结果')
+    parser.add_argument('--rsa', nargs='*', type=int, default=None,
+                        help='测试RSA批量解密/加密的每秒次数，可指定密钥长度（默认2048 3072 4096）')
+    parser.add_argument('--json', type=str, default=None, help='将测试结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    from assistants.bench import RSA_BENCH_BITS, format_table, parse_size, run_bench
+    # 只指定--rsa时不测试对称算法
+    modes = args.modes if args.modes or args.rsa is None else []
+    try:
+        sizes = [parse_size(s) for s in args.sizes] if args.sizes else None
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    report = run_bench(names=modes, sizes=sizes, min_seconds=args.seconds,
+                       include_generated=not args.no_generated, file_io=args.file_io, jobs=args.jobs,
+                       api=args.api, hybrid=args.hybrid, roundtrip=args.roundtrip,
+                       rsa_bits=(args.rsa or RSA_BENCH_BITS) if args.rsa is not None else None)
+    print(format_table(report))
+    mhz = f"{report['cpu_mhz']:.0f} MHz" if report["cpu_mhz"] else "未知（不计算cycles/byte）"
+    print(f"📊 CPU主频: {mhz}")
+    for message in report["skipped"]:
+        print(f"⚠️ 已跳过 {message}")
+
+    if args.json:
+        _write_json(args.json, report)
+    return 0
+
+def run_encrypt_command(argv):
+    """encrypt子命令：用内置模板程序加密（或解密）文件（内存映射）或标准输入（流式，结果写到标准输出）"""
+    parser = argparse.ArgumentParser(prog='cli.py encrypt', description='文件/流式加密与解密（内存占用与输入大小无关）')
+    parser.add_argument('mode', type=str, help='算法/模式，如 AES-CBC')
+    parser.add_argument('--key', type=str, required=True, help='十六进制密钥')
+    parser.add_argument('--iv', type=str, default=None, help='十六进制IV（ECB模式不需要）')
+    parser.add_argument('-d', '--decrypt', action='store_true', help='解密（检查并去除PKCS#7填充）')
+    parser.add_argument('--in', dest='in_path', type=str, default=None, help='输入文件（默认标准输入）')
+    parser.add_argument('--out', dest='out_path', type=str, default=None, help='输出文件（与--in同时使用）')
+    parser.add_argument('--no-mmap', action='store_true', help='文件模式下不使用内存映射，按分段读写')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='并行进程/线程数（0表示CPU核数，加密支持ECB、CTR，解密另外支持CBC、CFB）')
+    parser.add_argument('--chunk-size', type=int, default=None, help='流式模式的分段大小（字节）')
+    parser.add_argument('--api', choices=['legacy', 'evp'], default='legacy',
+                        help='OpenSSL接口：legacy为AES_*/DES_*旧版接口，evp可使用AES-NI等硬件加速')
+    args = parser.parse_args(argv)
+    if bool(args.in_path) != bool(args.out_path):
+        parser.error('--in 与 --out 需要同时指定')
+
+    from assistants import parallel, stream
+    if args.decrypt:
+        crypt_file, crypt_stream = stream.decrypt_file, stream.decrypt_stream
+        parallel_file, parallel_stream = parallel.parallel_decrypt_file, parallel.parallel_decrypt_stream
+    else:
+        crypt_file, crypt_stream = stream.encrypt_file, stream.encrypt_stream
+        parallel_file, parallel_stream = parallel.parallel_encrypt_file, parallel.parallel_encrypt_stream
+    what = "解密" if args.decrypt else "加密"
+    try:
+        key = bytes.fromhex(args.key)
+        iv = bytes.fromhex(args.iv) if args.iv else None
+        use_parallel = args.jobs != 1 and parallel.is_parallel(args.mode, args.decrypt)
+        # 提示信息写到标准错误，避免混入输出数据
+        if args.jobs != 1 and not use_parallel:
+            print(f"⚠️ {args.mode}的{what}不能分片并行，改为单进程处理", file=sys.stderr)
+        if args.in_path and use_parallel:
+            written = parallel_file(args.mode, key, iv, args.in_path, args.out_path,
+                                    jobs=args.jobs or None, api=args.api)
+            print(f"✅ 已写入 {args.out_path}（{written} 字节）", file=sys.stderr)
+        elif args.in_path:
+            written = crypt_file(args.mode, key, iv, args.in_path, args.out_path,
+                                 use_mmap=not args.no_mmap, api=args.api)
+            print(f"✅ 已写入 {args.out_path}（{written} 字节）", file=sys.stderr)
+        elif use_parallel:
+            parallel_stream(args.mode, key, iv, sys.stdin.buffer, sys.stdout.buffer,
+                            jobs=args.jobs or None, api=args.api)
+        else:
+            crypt_stream(args.mode, key, iv, sys.stdin.buffer, sys.stdout.buffer,
+                         chunk_size=args.chunk_size or stream.STREAM_CHUNK, api=args.api)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def run_hybrid_command(argv):
+    """hybrid子命令：RSA-OAEP封装随机AES密钥 + AES-256-GCM加密，明文大小不受OAEP长度限制"""
+    parser = argparse.ArgumentParser(prog='cli.py hybrid', description='RSA + AES-GCM混合加密（信封）')
+    parser.add_argument('action', choices=['seal', 'open'], help='seal用公钥加密，open用私钥解密')
+    parser.add_argument('--key', type=str, required=True, help='PEM格式的RSA公钥（seal）或私钥（open）文件')
+    parser.add_argument('--in', dest='in_path', type=str, default=None, help='输入文件（默认标准输入）')
+    parser.add_argument('--out', dest='out_path', type=str, default=None, help='输出文件（与--in同时使用）')
+    args = parser.parse_args(argv)
+    if bool(args.in_path) != bool(args.out_path):
+        parser.error('--in 与 --out 需要同时指定')
+
+    from assistants import hybrid
+    try:
+        if args.in_path:
+            run = hybrid.hybrid_encrypt_file if args.action == 'seal' else hybrid.hybrid_decrypt_file
+            written = run(args.key, args.in_path, args.out_path)
+            print(f"✅ 已写入 {args.out_path}（{written} 字节）", file=sys.stderr)
+        else:
+            run = hybrid.hybrid_encrypt_stream if args.action == 'seal' else hybrid.hybrid_decrypt_stream
+            run(args.key, sys.stdin.buffer, sys.stdout.buffer)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def _read_frames(f):
+    # 长度前缀记录：长度(4字节大端) | 数据
+    while True:
+        header = f.read(4)
+        if len(header) < 4:
+            return
+        yield f.read(int.from_bytes(header, "big"))
+
+def run_rsa_batch_command(argv):
+    """rsa-batch子命令：只解析一次密钥，在一个进程中用RSA-OAEP加密（或用私钥解密）大量记录"""
+    parser = argparse.ArgumentParser(prog='cli.py rsa-batch', description='RSA批量加密/解密（每条记录一个结果）')
+    parser.add_argument('--key', type=str, required=True, help='PEM格式的RSA公钥文件（--decrypt时为私钥）')
+    parser.add_argument('--decrypt', action='store_true', help='用私钥解密（CRT私钥运算，开启盲化）')
+    parser.add_argument('--format', choices=['lines', 'framed'], default='lines',
+                        help='lines：每行一条记录（解密时为十六进制密文），加密输出十六进制密文行、解密输出明文行；'
+                             'framed：长度前缀记录，输出status|len|结果')
+    parser.add_argument('--in', dest='in_path', type=str, default=None, help='输入文件（默认标准输入）')
+    parser.add_argument('--out', dest='out_path', type=str, default=None, help='输出文件（默认标准输出）')
+    args = parser.parse_args(argv)
+
+    from assistants import rsa_batch
+    try:
+        src = open(args.in_path, "rb") if args.in_path else sys.stdin.buffer
+        try:
+            dst = open(args.out_path, "wb") if args.out_path else sys.stdout.buffer
+        except OSError:
+            if args.in_path:
+                src.close()
+            raise
+    except OSError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.format == 'lines':
+            run = rsa_batch.rsa_decrypt_lines if args.decrypt else rsa_batch.rsa_encrypt_lines
+            stats = run(args.key, src, dst)
+        else:
+            run = rsa_batch.rsa_decrypt_batch if args.decrypt else rsa_batch.rsa_encrypt_batch
+            results, stats = run(args.key, _read_frames(src))
+            for result in results:
+                status, payload = (0, result) if result is not None else (1, b"record failed")
+                dst.write(status.to_bytes(4, "big") + len(payload).to_bytes(4, "big") + payload)
+        dst.flush()
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.in_path:
+            src.close()
+        if args.out_path:
+            dst.close()
+
+    # 统计信息写到标准错误，避免混入密文
+    print(f"✅ {stats['records']} 条记录，失败 {stats['failed']} 条，"
+          f"{stats['records_per_second']:.0f} 条/秒（{stats['elapsed']:.2f} 秒）", file=sys.stderr)
+    for index, error in stats["errors"]:
+        print(f"    - 第{index + 1}条: {error}", file=sys.stderr)
+    return 0 if stats["failed"] == 0 else 1
+
+def run_keypool_command(argv):
+    """keypool子命令：把RSA密钥池补充到目标数量，并输出可用数量与生成速度"""
+    parser = argparse.ArgumentParser(prog='cli.py keypool', description='预先生成RSA密钥对')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[2048], help='密钥长度（位），如 2048 3072')
+    parser.add_argument('--target', type=int, default=None, help='每种长度保留的密钥对数量')
+    parser.add_argument('--dir', type=str, default=None, help='密钥池目录（默认 ./keypool_workdir）')
+    parser.add_argument('--json', type=str, default=None, help='将统计结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    import subprocess
+    from assistants.keypool import KEYPOOL_TARGET, RSAKeyPool
+    try:
+        pool = RSAKeyPool(work_dir=args.dir, sizes=args.sizes, target=args.target or KEYPOOL_TARGET)
+        generated = pool.fill()
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    stats = pool.stats()
+    print(f"✅ 新生成 {generated} 个密钥对，目录：{pool.work_dir}")
+    for bits, info in stats["sizes"].items():
+        speed = f"{info['avg_generate_ms']:.0f} ms/个" if info["avg_generate_ms"] else "-"
+        print(f"🔑 RSA-{bits}: 可用 {info['available']}/{info['target']}，生成耗时 {speed}")
+    if args.json:
+        _write_json(args.json, stats)
+    return 0
+
+def run_batch_command(argv):
+    """batch子命令：从JSONL文件读取加密任务并发执行，结果逐行写入JSONL，全程不做交互式输入"""
+    parser = argparse.ArgumentParser(prog='cli.py batch', description='批量加密任务（JSONL输入/输出）')
+    parser.add_argument('jobs_file', type=str,
+                        help='任务文件，每行一个JSON：algorithm、backend、mode、key、iv、plaintext/plaintext_hex/input、output'
+                             '（"-"表示标准输入）')
+    parser.add_argument('--out', dest='out_path', type=str, default=None, help='结果JSONL文件（默认标准输出）')
+    parser.add_argument('--jobs', type=int, default=None, help='同时执行的任务数（默认CPU核数）')
+    parser.add_argument('--engine', choices=['template', 'generated'], default='template',
+                        help='template使用内置模板程序；generated由AI生成并经已知答案测试校验（任务中的engine字段优先）')
+    parser.add_argument('--api-key-env', type=str, default=None,
+                        help='generated方式读取智谱API Key的环境变量名（默认ZHIPU_API_KEY）')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='将各任务与生成、编译、运行阶段的耗时写入Chrome trace JSON文件（可在Perfetto中查看）')
+    parser.add_argument('--metrics', type=str, default=None,
+                        help='结束时将耗时直方图、缓存命中与重试次数等指标写入文件（Prometheus文本格式）')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='剖析Python代码与生成程序的运行，结果写入该目录（pstats、火焰图折叠栈、perf或资源用量）')
+    parser.add_argument('--profile-perf', choices=['stat', 'record'], default='stat',
+                        help='有perf时生成程序在perf stat还是perf record下运行')
+    args = parser.parse_args(argv)
+
+    import contextlib
+    from assistants.batch import API_KEY_ENV, run_batch
+    from assistants.profiling import profiling
+    from assistants.trace import tracing
+    api_key = os.environ.get(args.api_key_env or API_KEY_ENV, "").strip() or None
+    if api_key and not validate_api_key(api_key):
+        print(f"❌ 环境变量{args.api_key_env or API_KEY_ENV}中的API Key无效（至少32个字符）", file=sys.stderr)
+        return 1
+
+    try:
+        src = open(args.jobs_file, encoding="utf-8") if args.jobs_file != '-' else sys.stdin
+        dst = open(args.out_path, "w", encoding="utf-8") if args.out_path else sys.stdout
+    except OSError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    try:
+        # 生成与编译过程的提示信息写到标准错误，避免混入结果
+        with contextlib.redirect_stdout(sys.stderr), tracing(args.trace), \
+                profiling(args.profile, args.profile_perf) as profiler:
+            stats = run_batch(src, dst, jobs=args.jobs, engine=args.engine, api_key=api_key)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    print(f"✅ {stats['jobs']} 个任务，失败 {stats['failed']} 个，"
+          f"{stats['jobs_per_second']:.1f} 个/秒（{stats['elapsed']:.2f} 秒）", file=sys.stderr)
+    if args.trace:
+        print(f"📈 时间线已写入: {args.trace}", file=sys.stderr)
+    if args.metrics:
+        from assistants.metrics import REGISTRY
+        REGISTRY.write(args.metrics)
+        print(f"📈 指标已写入: {args.metrics}", file=sys.stderr)
+    if profiler:
+        print(profiler.format_summary(), file=sys.stderr)
+        print(f"📈 剖析结果已写入: {args.profile}", file=sys.stderr)
+    return 0 if stats["failed"] == 0 else 1
+
+def run_serve_command(argv):
+    """serve子命令：常驻服务，保持工作进程、已生成程序与HTTP连接池，通过本机HTTP或Unix套接字提供加密/生成接口"""
+    parser = argparse.ArgumentParser(prog='cli.py serve', description='常驻加密服务（本机HTTP或Unix套接字）')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址（默认只监听本机）')
+    parser.add_argument('--port', type=int, default=8750, help='监听端口')
+    parser.add_argument('--unix-socket', type=str, default=None, help='改为监听Unix套接字文件')
+    parser.add_argument('--workers', type=int, default=None, help='每种算法/模式的常驻工作进程数（默认CPU核数）')
+    parser.add_argument('--api-key-env', type=str, default=None,
+                        help='/generate与generated方式读取智谱API Key的环境变量名（默认ZHIPU_API_KEY）')
+    parser.add_argument('--verbose', action='store_true', help='输出每个请求的访问日志')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='记录每个请求各阶段的耗时，服务停止时写入Chrome trace JSON文件（可在Perfetto中查看）')
+    args = parser.parse_args(argv)
+
+    import contextlib
+    from assistants.batch import API_KEY_ENV
+    from assistants.server import serve
+    from assistants.trace import tracing
+    api_key = os.environ.get(args.api_key_env or API_KEY_ENV, "").strip() or None
+    if api_key and not validate_api_key(api_key):
+        print(f"❌ 环境变量{args.api_key_env or API_KEY_ENV}中的API Key无效（至少32个字符）", file=sys.stderr)
+        return 1
+    try:
+        # 生成与编译过程的提示信息写到标准错误
+        with contextlib.redirect_stdout(sys.stderr), tracing(args.trace):
+            serve(args.host, args.port, args.unix_socket, workers=args.workers, api_key=api_key,
+                  verbose=args.verbose)
+    except OSError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if args.trace:
+        print(f"📈 时间线已写入: {args.trace}", file=sys.stderr)
+    return 0
+
+# 子命令（除batch的generated方式与serve的生成接口外不经过AI生成流程）
+COMMANDS = {
+    "kat": run_kat_command,
+    "fuzz": run_fuzz_command,
+    "bench": run_bench_command,
+    "encrypt": run_encrypt_command,
+    "hybrid": run_hybrid_command,
+    "rsa-batch": run_rsa_batch_command,
+    "keypool": run_keypool_command,
+    "batch": run_batch_command,
+    "serve": run_serve_command,
+}
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
+
     parser = argparse.ArgumentParser(description='国密/通用加密工具（支持指定算法）')
     parser.add_argument(
         'algorithm', 
         type=str, 
         help=f'指定加密算法（支持列表）：\n'
-             f'OpenSSL后端：{list(SUPPORTED_ALGORITHMS["openssl"].keys())}\n'
-             f'GMSSL后端：{list(SUPPORTED_ALGORITHMS["gmssl"].keys())}'
+             f'OpenSSL后端：{supported("openssl")}\n'
+             f'GMSSL后端：{supported("gmssl")}'
     )
     parser.add_argument(
         '--backend', 
         type=str, 
         required=True, 
-        choices=['openssl', 'gmssl'],
+        choices=list(BACKENDS),
         help='加密后端（openssl/gmssl）'
     )
+    parser.add_argument(
+        '--api',
+        type=str,
+        default='legacy',
+        choices=['legacy', 'evp'],
+        help='AES/DES生成代码使用的OpenSSL接口（legacy旧版接口/evp接口）'
+    )
+    parser.add_argument(
+        '--no-pipeline',
+        action='store_true',
+        help='不使用流水线：每次尝试依次生成、编译、运行，失败后询问是否重试'
+    )
+    parser.add_argument(
+        '--trace',
+        type=str,
+        default=None,
+        help='将生成、HTTP请求、净化、编译、运行各阶段的耗时写入Chrome trace JSON文件（可在Perfetto中查看）'
+    )
+    parser.add_argument(
+        '--metrics',
+        type=str,
+        default=None,
+        help='结束时将生成/编译耗时直方图、首次通过率、缓存命中等指标写入文件（Prometheus文本格式）'
+    )
+    parser.add_argument(
+        '--profile',
+        type=str,
+        default=None,
+        help='剖析生成流程（cProfile与调用栈采样）与生成程序的运行（perf，没有时记录资源用量），结果写入该目录'
+    )
+    parser.add_argument(
+        '--profile-perf',
+        type=str,
+        default='stat',
+        choices=['stat', 'record'],
+        help='有perf时生成程序在perf stat还是perf record下运行'
+    )
     parser.add_argument(
         '--debug', 
         action='store_true', 
@@ -72,25 +467,27 @@ def main():
         algorithm_upper = args.algorithm.upper()
         
         # 验证算法是否在后端支持列表中
-        if algorithm_upper not in SUPPORTED_ALGORITHMS[args.backend]:
-            supported = list(SUPPORTED_ALGORITHMS[args.backend].keys())
-            print(f"❌ 不支持的算法！{args.backend}后端支持：{supported}")
+        try:
+            entry = get_entry(algorithm_upper, args.backend)
+        except ValueError:
+            print(f"❌ 不支持的算法！{args.backend}后端支持：{supported(args.backend)}")
             sys.exit(1)
-        
-        # 获取算法配置（内部名称和是否需要mode）
-        algo_config = SUPPORTED_ALGORITHMS[args.backend][algorithm_upper]
-        internal_algo = algo_config["internal_name"]
-        needs_mode = algo_config["needs_mode"]
-        mode = algorithm_upper.split("-")[-1] if needs_mode else None
+        mode = algorithm_upper.split("-")[-1] if "-" in algorithm_upper else None
+        if args.api != 'legacy' and not entry.get("api"):
+            print("❌ --api 仅适用于AES/DES算法")
+            sys.exit(1)
+        # 先导入助手类（依赖requests等库），缺少依赖时不必再输入API Key
+        import_helper(args.backend, algorithm_upper)
         
         # 显示当前选择
         print(f"🔍 已选择算法：{algorithm_upper}，后端：{args.backend}")
-        if needs_mode and mode:
+        if mode:
             print(f"🔑 加密模式：{mode}")
         print("💡 流程：AI生成代码 → 展示代码 → 执行加密")
 
         # 获取并验证智谱API Key
         print("\n⚠ 需要智谱API Key生成加密代码")
+        import getpass
         api_key = None
         for attempt in range(3):
             api_key = getpass.getpass("请输入智谱API Key（输入时不显示）: ").strip()
@@ -106,15 +503,26 @@ def main():
             print("❌ 多次输入错误，程序退出")
             sys.exit(1)
 
-        # 导入助手类并初始化（根据需要传递mode参数）
-        HelperClass = import_helper(args.backend, internal_algo)
-        if needs_mode:
-            helper = HelperClass(api_key, mode=mode)
-        else:
-            helper = HelperClass(api_key)  # SM4/RSA等不传递mode
+        # 初始化助手（SM4传递mode参数，AES/DES传递api参数，RSA只需要API Key）
+        helper = create_helper(algorithm_upper, api_key, api=args.api, backend=args.backend)
 
-        # 执行加密流程
-        helper.process()
+        # 执行加密流程：有已知答案向量的算法默认使用流水线（下一次生成与当前的编译、校验重叠），其余逐次生成
+        from assistants.profiling import profiling
+        from assistants.trace import tracing
+        with tracing(args.trace), profiling(args.profile, args.profile_perf) as profiler:
+            if not args.no_pipeline and helper.supports_pipeline():
+                helper.process_pipelined()
+            else:
+                helper.process()
+        if args.trace:
+            print(f"📈 时间线已写入: {args.trace}")
+        if args.metrics:
+            from assistants.metrics import REGISTRY
+            REGISTRY.write(args.metrics)
+            print(f"📈 指标已写入: {args.metrics}")
+        if profiler:
+            print(profiler.format_summary())
+            print(f"📈 剖析结果已写入: {args.profile}")
 
     except KeyboardInterrupt:
         print("\n⚠️ 用户中断操作")
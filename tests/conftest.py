@@ -0,0 +1,14 @@
+import os
+import sys
+
+# assistants没有打包安装，测试从仓库根目录导入（与 python cli.py 相同）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def rsa_key_pair():
+    """(私钥PEM, 公钥PEM)；1024位即可覆盖OAEP封装与长度上限，生成更快"""
+    from assistants.keypool import generate_key_pair
+    return generate_key_pair(1024)
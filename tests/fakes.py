@@ -0,0 +1,182 @@
+"""测试共用的大模型替身与按提示词要求写出的大模型输出"""
+import threading
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+class FakeSession:
+    """代替requests.Session：按顺序返回预设的大模型输出（用完后重复最后一个），记录每次请求的消息"""
+
+    def __init__(self, *contents):
+        self.contents = list(contents)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        with self.lock:
+            self.requests.append(json["messages"])
+            content = self.contents.pop(0) if len(self.contents) > 1 else self.contents[0]
+        return FakeResponse(content)
+
+
+# 按提示词要求写出的大模型输出（含代码标记、注释与中文提示）
+AES_ECB_OUTPUT = r'''```c
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/aes.h>
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+void hex_to_bytes(const char *hex, unsigned char *bytes, size_t len) {
+    for (size_t i = 0; i < len; i++) sscanf(hex + 2 * i, "%2hhx", &bytes[i]);
+}
+
+void pkcs7_pad(const unsigned char *data, size_t data_len, unsigned char *padded, size_t *padded_len) {
+    size_t pad = 16 - data_len % 16;
+    memcpy(padded, data, data_len);
+    for (size_t i = 0; i < pad; i++) padded[data_len + i] = (unsigned char)pad;
+    *padded_len = data_len + pad;
+}
+
+int main() {
+    unsigned char key[32];
+    char hex_key[65];
+    char plaintext[1024];
+    unsigned char padded[1040];
+    unsigned char ciphertext[1040];
+    size_t padded_len;
+    AES_KEY aes_key;
+
+    printf("请输入32字节十六进制密钥（64字符）: ");
+    if (scanf("%64s", hex_key) != 1) return 1;
+    int c; while ((c = getchar()) != '\n' && c != EOF);
+    hex_to_bytes(hex_key, key, 32);
+
+    printf("请输入要加密的明文: ");
+    if (!fgets(plaintext, sizeof(plaintext), stdin)) return 1;
+    plaintext[strcspn(plaintext, "\n")] = '\0';
+
+    // 填充并逐块加密
+    pkcs7_pad((unsigned char *)plaintext, strlen(plaintext), padded, &padded_len);
+    AES_set_encrypt_key(key, 256, &aes_key);
+    for (size_t i = 0; i < padded_len; i += 16)
+        AES_ecb_encrypt(padded + i, ciphertext + i, &aes_key, AES_ENCRYPT);
+
+    printf("密文: ");
+    for (size_t i = 0; i < padded_len; i++) printf("%02x", ciphertext[i]);
+    printf("\n");
+    return 0;
+}
+```'''
+
+AES_CBC_OUTPUT = r'''#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/aes.h>
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+void hex_to_bytes(const char *hex, unsigned char *bytes, size_t len) {
+    for (size_t i = 0; i < len; i++) sscanf(hex + 2 * i, "%2hhx", &bytes[i]);
+}
+
+void pkcs7_pad(const unsigned char *data, size_t data_len, unsigned char *padded, size_t *padded_len) {
+    size_t pad = 16 - data_len % 16;
+    memcpy(padded, data, data_len);
+    for (size_t i = 0; i < pad; i++) padded[data_len + i] = (unsigned char)pad;
+    *padded_len = data_len + pad;
+}
+
+int main() {
+    unsigned char key[32], iv[16];
+    char hex_key[65], hex_iv[33], plaintext[1024];
+    unsigned char padded[1040], ciphertext[1040];
+    size_t padded_len;
+    AES_KEY aes_key;
+
+    printf("请输入32字节十六进制密钥（64字符）: ");
+    scanf("%64s", hex_key);
+    int c; while ((c = getchar()) != '\n' && c != EOF);
+    printf("请输入16字节十六进制IV（32字符）: ");
+    scanf("%32s", hex_iv);
+    while ((c = getchar()) != '\n' && c != EOF);
+    printf("请输入要加密的明文: ");
+    fgets(plaintext, sizeof(plaintext), stdin);
+    plaintext[strcspn(plaintext, "\n")] = '\0';
+
+    hex_to_bytes(hex_key, key, 32);
+    hex_to_bytes(hex_iv, iv, 16);
+    pkcs7_pad((unsigned char *)plaintext, strlen(plaintext), padded, &padded_len);
+    AES_set_encrypt_key(key, 256, &aes_key);
+    AES_cbc_encrypt(padded, ciphertext, padded_len, &aes_key, iv, AES_ENCRYPT);
+
+    printf("密文: ");
+    for (size_t i = 0; i < padded_len; i++) printf("%02x", ciphertext[i]);
+    printf("\n");
+    return 0;
+}
+'''
+# 没有清理输入缓冲区的版本，由净化规则补上清理循环
+AES_CBC_OUTPUT_NO_CLEANUP = (AES_CBC_OUTPUT.replace("    int c; while ((c = getchar()) != '\\n' && c != EOF);\n", "")
+                             .replace("    while ((c = getchar()) != '\\n' && c != EOF);\n", ""))
+
+DES_CBC_OUTPUT = r'''#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/des.h>
+#pragma GCC diagnostic ignored "-Wdeprecated-declarations"
+
+void hex_to_bytes(const char *hex, unsigned char *bytes, size_t len) {
+    for (size_t i = 0; i < len; i++) sscanf(hex + 2 * i, "%2hhx", &bytes[i]);
+}
+
+void pkcs5_pad(const unsigned char *data, size_t data_len, unsigned char *padded, size_t *padded_len) {
+    size_t pad = 8 - data_len % 8;
+    memcpy(padded, data, data_len);
+    for (size_t i = 0; i < pad; i++) padded[data_len + i] = (unsigned char)pad;
+    *padded_len = data_len + pad;
+}
+
+int main() {
+    unsigned char key[8];
+    DES_cblock iv;
+    char hex_key[64], hex_iv[64], plaintext[1024];
+    unsigned char padded[1040], ciphertext[1040];
+    size_t padded_len;
+    DES_key_schedule schedule;
+
+    printf("请输入密钥（16个十六进制字符）: ");
+    if (!fgets(hex_key, sizeof(hex_key), stdin)) return 1;
+    hex_key[strcspn(hex_key, "\n")] = '\0';
+    printf("请输入IV（16个十六进制字符）: ");
+    if (!fgets(hex_iv, sizeof(hex_iv), stdin)) return 1;
+    hex_iv[strcspn(hex_iv, "\n")] = '\0';
+    printf("请输入明文: ");
+    if (!fgets(plaintext, sizeof(plaintext), stdin)) return 1;
+    plaintext[strcspn(plaintext, "\n")] = '\0';
+
+    hex_to_bytes(hex_key, key, 8);
+    hex_to_bytes(hex_iv, iv, 8);
+    DES_set_key_unchecked((const_DES_cblock *)key, &schedule);
+    pkcs5_pad((unsigned char *)plaintext, strlen(plaintext), padded, &padded_len);
+    DES_cbc_encrypt(padded, ciphertext, padded_len, &schedule, &iv, DES_ENCRYPT);
+
+    printf("密文: ");
+    for (size_t i = 0; i < padded_len; i++) printf("%02x", ciphertext[i]);
+    printf("\n");
+    return 0;
+}
+'''
@@ -0,0 +1,115 @@
+import io
+import json
+import shutil
+
+import pytest
+
+from assistants.batch import API_KEY_ENV, BatchRunner, parse_job, run_batch
+from assistants.kat import KAT_VECTORS
+from fakes import AES_ECB_OUTPUT, FakeSession
+
+needs_gcc = pytest.mark.skipif(shutil.which("gcc") is None, reason="需要gcc与OpenSSL开发库")
+
+CBC = KAT_VECTORS["AES-CBC"][0]
+ECB = KAT_VECTORS["AES-ECB"][0]
+
+
+def _line(**job):
+    return json.dumps(job)
+
+
+def test_parse_job_normalizes_fields():
+    job = parse_job(_line(id=7, algorithm="aes-cbc", key="00" * 32, iv="01" * 16, plaintext="hi"))
+    assert job == {"id": 7, "name": "AES-CBC", "backend": "openssl", "api": "legacy", "engine": None,
+                   "key": bytes(32), "iv": b"\x01" * 16, "plaintext": b"hi", "input": None, "output": None}
+
+
+def test_parse_job_combines_algorithm_and_mode():
+    job = parse_job(_line(algorithm="SM4", mode="ecb", key="00" * 16, plaintext_hex="0011"))
+    assert (job["name"], job["backend"], job["iv"], job["plaintext"]) == ("SM4-ECB", "gmssl", None, b"\x00\x11")
+
+
+def test_parse_job_file_input():
+    job = parse_job(_line(algorithm="AES-ECB", key="00" * 32, input="in.bin", output="out.bin"))
+    assert (job["plaintext"], job["input"], job["output"]) == (None, "in.bin", "out.bin")
+
+
+@pytest.mark.parametrize("line, message", [
+    ("{not json", "不是合法的JSON"),
+    ("[1, 2]", "JSON对象"),
+    (_line(key="00"), "缺少algorithm"),
+    (_line(algorithm="AES-CBC", mode="ECB", plaintext="x"), "不一致"),
+    (_line(algorithm="RSA", plaintext="x"), "rsa-batch"),
+    (_line(algorithm="SM4-ECB", backend="openssl", plaintext="x"), "应使用gmssl后端"),
+    (_line(algorithm="AES-ECB", key="00"), "必须且只能指定一个"),
+    (_line(algorithm="AES-ECB", key="00", plaintext="x", plaintext_hex="00"), "必须且只能指定一个"),
+    (_line(algorithm="AES-ECB", key="00", plaintext="x", output="out.bin"), "output只能与input同时使用"),
+    (_line(algorithm="AES-ECB", key="zz", plaintext="x"), "十六进制"),
+    (_line(algorithm="AES-ECB", key=123, plaintext="x"), "十六进制"),
+])
+def test_parse_job_rejects(line, message):
+    with pytest.raises(ValueError, match=message):
+        parse_job(line)
+
+
+@needs_gcc
+def test_run_batch_template_engine(tmp_path):
+    lines = [
+        _line(id="ok", algorithm="AES-CBC", key=CBC["key"], iv=CBC["iv"], plaintext_hex=CBC["plaintext"]),
+        "",
+        _line(id="short-key", algorithm="AES-CBC", key="00", iv=CBC["iv"], plaintext="x"),
+        "{broken",
+    ]
+    out = io.StringIO()
+    stats = run_batch(io.StringIO("\n".join(lines) + "\n"), out, jobs=2, work_dir=str(tmp_path))
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert (stats["jobs"], stats["failed"]) == (3, 2)
+    assert [r["line"] for r in results] == [1, 3, 4]
+    assert results[0]["ok"] and results[0]["ciphertext"].startswith(CBC["ciphertext"])
+    assert not results[1]["ok"] and "密钥长度" in results[1]["error"]
+    assert not results[2]["ok"] and "不是合法的JSON" in results[2]["error"]
+
+
+@needs_gcc
+def test_generated_engine_builds_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    session = FakeSession(AES_ECB_OUTPUT)
+    with BatchRunner(jobs=2, engine="generated", api_key="test-key", work_dir=str(tmp_path),
+                     session=session) as runner:
+        line = _line(algorithm="AES-ECB", key=ECB["key"], plaintext_hex=ECB["plaintext"][:64])
+        first, second = runner.run_job(line), runner.run_job(line)
+
+    assert first["ok"], first["error"]
+    assert first["ciphertext"].startswith(ECB["ciphertext"][:64])
+    assert second["ciphertext"] == first["ciphertext"]
+    assert (first["build_reused"], second["build_reused"]) == (False, True)
+    assert first["attempts"] >= 1
+
+
+def test_generated_engine_requires_api_key(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(API_KEY_ENV, raising=False)
+    with BatchRunner(engine="generated") as runner:
+        result = runner.run_job(_line(algorithm="AES-ECB", key="00" * 32, plaintext="x"))
+    assert not result["ok"] and "API Key" in result["error"]
+
+
+def test_failed_builds_are_cached_per_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(API_KEY_ENV, raising=False)
+    with BatchRunner(engine="generated") as runner:
+        first, second = runner.generate("AES-ECB"), runner.generate("AES-ECB")
+    assert not first["ok"] and (first["build_reused"], second["build_reused"]) == (False, True)
+
+
+@needs_gcc
+def test_service_retries_failed_builds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with BatchRunner(engine="generated", cache_failures=False) as runner:
+        first = runner.generate("AES-ECB")
+        # 失败不保留：设置API Key后下一次请求重新生成
+        runner.api_key, runner.session = "test-key", FakeSession(AES_ECB_OUTPUT)
+        second = runner.generate("AES-ECB")
+    assert not first["ok"] and "API Key" in first["error"]
+    assert second["ok"] and not second["build_reused"]
@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import pytest
+
+from assistants.engine import ModeHelper, MODE_SPECS
+
+needs_gcc = pytest.mark.skipif(shutil.which("gcc") is None, reason="需要gcc")
+
+
+class AesCbcHelper(ModeHelper):
+    spec = MODE_SPECS["AES-CBC"]
+
+
+def _program(exit_code):
+    return f"int main(void) {{ return {exit_code}; }}\n"
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+@needs_gcc
+def test_recompile_does_not_overwrite_running_program():
+    helper = AesCbcHelper("test-key")
+    assert helper._compile(_program(1)) == "编译成功"
+    first = os.stat(helper.exec_path).st_ino
+    assert helper._compile(_program(2)) == "编译成功"
+    # 新程序重命名到位，正在运行旧程序的进程仍持有原来的文件
+    assert os.stat(helper.exec_path).st_ino != first
+    with open(os.path.join(helper.work_dir, "aes_cbc_encrypt.c")) as f:
+        assert f.read() == _program(2)
+    assert not [name for name in os.listdir(helper.work_dir) if ".tmp" in name]
+
+
+@needs_gcc
+def test_apis_use_separate_programs():
+    legacy, evp = AesCbcHelper("test-key"), AesCbcHelper("test-key", api="evp")
+    assert legacy.work_dir == evp.work_dir
+    assert legacy._compile(_program(0)) == evp._compile(_program(0)) == "编译成功"
+    assert legacy.exec_path != evp.exec_path
+    assert os.path.basename(evp.exec_path) == "aes_cbc_evp_encrypt"
+
+
+@needs_gcc
+def test_compile_error_names_the_source_file():
+    helper = AesCbcHelper("test-key")
+    result = helper._compile("int main(void) { return }\n")
+    assert result.startswith("编译失败") and "aes_cbc_encrypt.c" in result and ".tmp" not in result
+    assert helper.exec_path is None
+    assert os.listdir(helper.work_dir) == []
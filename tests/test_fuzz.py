@@ -0,0 +1,23 @@
+import shutil
+
+import pytest
+
+from assistants import fuzz
+from assistants.worker import build_worker
+
+pytestmark = pytest.mark.skipif(shutil.which("gcc") is None or shutil.which("openssl") is None,
+                                reason="需要gcc、openssl命令与OpenSSL开发库")
+
+
+def test_candidate_without_oracle_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(fuzz, "oracle_unavailable", lambda name: "没有SM4" if name.startswith("SM4") else None)
+    candidates = [
+        {"name": "SM4-CBC", "exec_path": str(tmp_path / "missing"), "interface": "worker"},
+        {"name": "AES-CBC", "exec_path": build_worker("AES-CBC", work_dir=str(tmp_path)), "interface": "worker"},
+    ]
+    result = fuzz.run_fuzz(candidates, cases_per_candidate=12, workers=2, batch_size=6)
+
+    skipped, tested = result["reports"]
+    assert (skipped["oracle_error"], skipped["cases"], skipped["failed"]) == ("没有SM4", 0, 0)
+    assert (tested["oracle_error"], tested["cases"], tested["failed"]) == ("", 12, 0)
+    assert result["cases"] == 12
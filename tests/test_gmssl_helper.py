@@ -0,0 +1,50 @@
+import shutil
+
+import pytest
+
+from assistants.gmssl_helper import SM4Helper, sm4_code_template
+from assistants.metrics import LLM_REQUESTS
+from assistants.trace import tracing
+from fakes import FakeSession
+
+
+@pytest.fixture
+def helper(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return SM4Helper("test-key", mode="CBC")
+
+
+def test_nonconforming_output_is_a_generation_failure(helper):
+    # 逐块调用sm4_encrypt且硬编码密钥，不能被模板代码顶替
+    helper.session = FakeSession('```c\nint main() { sm4_encrypt(&k, in, out); return 0; }\n```')
+    code, msg = helper._generate_c_code()
+    assert code == ""
+    assert "sm4_cbc_encrypt_blocks" in msg and "scanf" in msg
+    assert helper.last_error == msg
+    assert helper.generated_code is None
+
+
+def test_failure_reason_is_fed_back(helper):
+    template = sm4_code_template("CBC")
+    helper.session = FakeSession("int main() { return 0; }", template)
+    assert helper._generate_c_code()[0] == ""
+    code, _ = helper._generate_c_code()
+    assert code == template.strip()
+    assert "上次失败原因：生成的代码不符合要求" in helper.session.requests[1][1]["content"]
+
+
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="需要gcc")
+def test_generation_uses_shared_hot_path(helper):
+    helper.session = FakeSession(sm4_code_template("CBC"))
+    before = LLM_REQUESTS.values.get(("SM4-CBC", "200"), 0)
+    with tracing("trace.json") as tracer:
+        code, _ = helper._generate_c_code()
+        # 未安装GmSSL时编译失败，同样经过编译缓存查找与gcc时间段
+        helper._compile(code)
+        helper._compile(code)
+
+    names = [event["name"] for event in tracer.events]
+    assert {"http", "sanitize"} <= set(names) and names.count("gcc") == 2
+    assert LLM_REQUESTS.values[("SM4-CBC", "200")] == before + 1
+    assert (helper.metrics["generate"], helper.metrics["compile"]) == (1, 2)
+    assert helper.metrics["compile_cache_hits"] == (1 if helper.exec_path else 0)
@@ -0,0 +1,56 @@
+import io
+import random
+import shutil
+
+import pytest
+
+from assistants.hybrid import (HYBRID_MAGIC, hybrid_decrypt_file, hybrid_decrypt_stream, hybrid_encrypt_file,
+                               hybrid_encrypt_stream)
+
+pytestmark = pytest.mark.skipif(shutil.which("gcc") is None or shutil.which("openssl") is None,
+                                reason="需要gcc、openssl命令与OpenSSL开发库")
+
+# 超过OAEP上限、跨越多个分段且不是分段大小的整数倍
+PLAINTEXT = random.Random(0).randbytes(10_000)
+
+
+def test_file_round_trip(rsa_key_pair, tmp_path):
+    private_pem, public_pem = rsa_key_pair
+    (tmp_path / "plain.bin").write_bytes(PLAINTEXT)
+    work_dir = str(tmp_path / "build")
+
+    sealed = hybrid_encrypt_file(public_pem, str(tmp_path / "plain.bin"), str(tmp_path / "sealed.bin"),
+                                 chunk_size=1000, work_dir=work_dir)
+    envelope = (tmp_path / "sealed.bin").read_bytes()
+    assert sealed == len(envelope) and envelope.startswith(HYBRID_MAGIC)
+    assert PLAINTEXT[:64] not in envelope
+
+    opened = hybrid_decrypt_file(private_pem, str(tmp_path / "sealed.bin"), str(tmp_path / "opened.bin"),
+                                 chunk_size=1000, work_dir=work_dir)
+    assert opened == len(PLAINTEXT)
+    assert (tmp_path / "opened.bin").read_bytes() == PLAINTEXT
+
+
+def test_stream_round_trip(rsa_key_pair, tmp_path):
+    private_pem, public_pem = rsa_key_pair
+    sealed, opened = io.BytesIO(), io.BytesIO()
+    hybrid_encrypt_stream(public_pem, io.BytesIO(PLAINTEXT), sealed, work_dir=str(tmp_path))
+    hybrid_decrypt_stream(private_pem, io.BytesIO(sealed.getvalue()), opened, work_dir=str(tmp_path))
+    assert opened.getvalue() == PLAINTEXT
+
+
+@pytest.mark.parametrize("offset", [10, -20, -1])
+def test_tampered_envelope_is_rejected(rsa_key_pair, tmp_path, offset):
+    private_pem, public_pem = rsa_key_pair
+    (tmp_path / "plain.bin").write_bytes(PLAINTEXT)
+    work_dir = str(tmp_path / "build")
+    hybrid_encrypt_file(public_pem, str(tmp_path / "plain.bin"), str(tmp_path / "sealed.bin"), work_dir=work_dir)
+
+    # 分别篡改封装密钥、密文与认证标签
+    envelope = bytearray((tmp_path / "sealed.bin").read_bytes())
+    envelope[offset] ^= 1
+    (tmp_path / "sealed.bin").write_bytes(bytes(envelope))
+    with pytest.raises(RuntimeError):
+        hybrid_decrypt_file(private_pem, str(tmp_path / "sealed.bin"), str(tmp_path / "opened.bin"),
+                            work_dir=work_dir)
+    assert not (tmp_path / "opened.bin").exists()
@@ -0,0 +1,62 @@
+import pytest
+
+from assistants.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_histogram_text(registry):
+    seconds = registry.histogram("t_seconds", "耗时", ["algorithm"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        seconds.observe(value, algorithm="AES-CBC")
+    assert registry.render() == "\n".join([
+        "# HELP t_seconds 耗时",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{algorithm="AES-CBC",le="0.1"} 1',
+        't_seconds_bucket{algorithm="AES-CBC",le="1"} 3',
+        't_seconds_bucket{algorithm="AES-CBC",le="+Inf"} 4',
+        't_seconds_sum{algorithm="AES-CBC"} 4.05',
+        't_seconds_count{algorithm="AES-CBC"} 4',
+    ]) + "\n"
+
+
+def test_labelled_counter_text(registry):
+    requests = registry.counter("t_requests_total", "请求数", ["path", "status"])
+    requests.inc(path="/encrypt", status=200)
+    requests.inc(2, path="/encrypt", status=200)
+    requests.inc(path='say "hi"\\n', status=404)
+    assert requests.get(path="/encrypt", status=200) == 3
+    assert registry.render().splitlines() == [
+        "# HELP t_requests_total 请求数",
+        "# TYPE t_requests_total counter",
+        't_requests_total{path="/encrypt",status="200"} 3',
+        't_requests_total{path="say \\"hi\\"\\\\n",status="404"} 1',
+    ]
+
+
+def test_unlabelled_metrics_start_at_zero(registry):
+    registry.counter("t_total", "次数")
+    in_flight = registry.gauge("t_in_flight", "在途")
+    in_flight.inc()
+    in_flight.dec()
+    assert registry.render().splitlines()[2::3] == ["t_total 0", "t_in_flight 0"]
+
+
+def test_label_names_are_checked(registry):
+    counter = registry.counter("t_total", "次数", ["cache"])
+    with pytest.raises(ValueError):
+        counter.inc(result="hit")
+    with pytest.raises(ValueError):
+        registry.counter("t_total", "重复")
+
+
+def test_write_replaces_file(registry, tmp_path):
+    registry.counter("t_total", "次数").inc()
+    path = tmp_path / "metrics.prom"
+    path.write_text("old")
+    registry.write(str(path))
+    assert path.read_text(encoding="utf-8") == registry.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["metrics.prom"]
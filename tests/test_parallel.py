@@ -0,0 +1,127 @@
+import io
+import os
+import random
+import shutil
+
+import pytest
+
+from assistants import parallel
+from assistants.parallel import (SHARD_ALIGN, _chained_shard_iv, _ctr_shard_iv, parallel_decrypt_file,
+                                 parallel_decrypt_stream, parallel_encrypt_file, parallel_encrypt_stream,
+                                 shard_ranges)
+from assistants.stream import decrypt_file, encrypt_file, encrypt_stream
+
+pytestmark = pytest.mark.skipif(shutil.which("gcc") is None, reason="需要gcc与OpenSSL开发库")
+
+KEYS = {"AES": bytes(range(32)), "SM4": bytes(range(16)), "DES": bytes(range(8))}
+# 计数器在第一个分片内就向高位进位，检查分片起始计数器按整个IV做大端加法
+CTR_IV = bytes.fromhex("00000000000000fffffffffffffffff0")
+# 3个对齐分片加上不足一块的尾部
+SIZE = 3 * SHARD_ALIGN + 7
+
+
+@pytest.fixture(scope="module")
+def work_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("template_workdir"))
+
+
+@pytest.fixture(autouse=True)
+def small_inputs(monkeypatch):
+    # 测试输入远小于MIN_PARALLEL_SIZE，强制分片
+    monkeypatch.setattr(parallel, "MIN_PARALLEL_SIZE", 0)
+
+
+@pytest.fixture(scope="module")
+def plaintext_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data") / "plain.bin"
+    # 固定种子：错误密钥解出的填充是否无效取决于数据，随机数据有1/256的概率恰好有效
+    path.write_bytes(random.Random(0).randbytes(SIZE))
+    return str(path)
+
+
+def test_ctr_shard_iv_carries_and_wraps():
+    iv = bytes.fromhex("000000000000000000000000000000ff")
+    assert _ctr_shard_iv(iv, 16, 16) == bytes.fromhex("00000000000000000000000000000100")
+    assert _ctr_shard_iv(iv, 16 * 0x101, 16) == bytes.fromhex("00000000000000000000000000000200")
+    assert _ctr_shard_iv(b"\xff" * 16, 32, 16) == bytes.fromhex("00000000000000000000000000000001")
+
+
+def test_chained_shard_iv():
+    assert _chained_shard_iv(b"iv", 0, 16, None) == b"iv"
+    assert _chained_shard_iv(b"iv", 64, 16, b"previous block") == b"previous block"
+
+
+@pytest.mark.parametrize("full, shards", [(0, 4), (16, 4), (SIZE - 7, 1), (SIZE - 7, 3), (SIZE - 7, 8)])
+def test_shard_ranges_cover_input(full, shards):
+    ranges = shard_ranges(full, shards)
+    assert len(ranges) <= max(shards, 1)
+    offset = 0
+    for start, length in ranges:
+        assert start == offset and start % SHARD_ALIGN == 0
+        offset += length
+    assert offset == full
+
+
+@pytest.mark.parametrize("name, api, iv", [
+    ("AES-ECB", "legacy", None),
+    ("DES-ECB", "legacy", None),
+    ("SM4-CTR", "evp", CTR_IV),
+])
+def test_parallel_encrypt_file_matches_single_process(name, api, iv, work_dir, plaintext_path, tmp_path):
+    key = KEYS[name.split("-")[0]]
+    single, sharded = str(tmp_path / "single.bin"), str(tmp_path / "sharded.bin")
+    encrypt_file(name, key, iv, plaintext_path, single, work_dir=work_dir, api=api)
+    size = parallel_encrypt_file(name, key, iv, plaintext_path, sharded, jobs=3, work_dir=work_dir, api=api)
+    assert size == os.path.getsize(single)
+    with open(single, "rb") as a, open(sharded, "rb") as b:
+        assert a.read() == b.read()
+
+
+@pytest.mark.parametrize("name, api, iv", [
+    ("AES-CBC", "legacy", bytes(range(16))),
+    ("AES-CFB", "legacy", bytes(range(16))),
+    ("SM4-CTR", "evp", CTR_IV),
+])
+def test_parallel_decrypt_file_round_trip(name, api, iv, work_dir, plaintext_path, tmp_path):
+    key = KEYS[name.split("-")[0]]
+    ciphertext, single, sharded = (str(tmp_path / f) for f in ("cipher.bin", "single.bin", "sharded.bin"))
+    encrypt_file(name, key, iv, plaintext_path, ciphertext, work_dir=work_dir, api=api)
+    decrypt_file(name, key, iv, ciphertext, single, work_dir=work_dir, api=api)
+    parallel_decrypt_file(name, key, iv, ciphertext, sharded, jobs=3, work_dir=work_dir, api=api)
+    with open(plaintext_path, "rb") as p, open(single, "rb") as a, open(sharded, "rb") as b:
+        plaintext = p.read()
+        assert a.read() == plaintext
+        assert b.read() == plaintext
+
+
+def test_parallel_decrypt_file_rejects_bad_padding(work_dir, plaintext_path, tmp_path):
+    key, iv = KEYS["AES"], bytes(range(16))
+    ciphertext, out = str(tmp_path / "cipher.bin"), str(tmp_path / "out.bin")
+    encrypt_file("AES-CBC", key, iv, plaintext_path, ciphertext, work_dir=work_dir)
+    with pytest.raises(RuntimeError, match="invalid padding"):
+        parallel_decrypt_file("AES-CBC", bytes(32), iv, ciphertext, out, jobs=3, work_dir=work_dir)
+    assert not os.path.exists(out)
+
+
+@pytest.mark.parametrize("name, api, iv", [
+    ("AES-ECB", "legacy", None),
+    ("SM4-CTR", "evp", CTR_IV),
+])
+def test_parallel_stream_matches_single_stream(name, api, iv, work_dir, plaintext_path):
+    key = KEYS[name.split("-")[0]]
+    with open(plaintext_path, "rb") as f:
+        plaintext = f.read()
+    expected = io.BytesIO()
+    encrypt_stream(name, key, iv, io.BytesIO(plaintext), expected, work_dir=work_dir, api=api)
+
+    # 分片大小不是SHARD_ALIGN的整数倍，检查按流中偏移计算起始计数器
+    sharded = io.BytesIO()
+    written = parallel_encrypt_stream(name, key, iv, io.BytesIO(plaintext), sharded, jobs=2,
+                                      shard_size=48 * 1024, work_dir=work_dir, api=api)
+    assert written == len(expected.getvalue())
+    assert sharded.getvalue() == expected.getvalue()
+
+    decrypted = io.BytesIO()
+    parallel_decrypt_stream(name, key, iv, io.BytesIO(sharded.getvalue()), decrypted, jobs=2,
+                            shard_size=48 * 1024, work_dir=work_dir, api=api)
+    assert decrypted.getvalue() == plaintext
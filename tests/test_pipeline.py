@@ -0,0 +1,111 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from assistants.aes_ecb_helper import AESECBHelper
+from assistants.gmssl_helper import GmSSLHelper
+from assistants.pipeline import BuildPipeline
+from assistants.registry import create_helper
+from fakes import AES_ECB_OUTPUT, FakeResponse, FakeSession
+
+needs_gcc = pytest.mark.skipif(shutil.which("gcc") is None, reason="需要gcc与OpenSSL开发库")
+
+# 编译不通过的大模型输出
+BROKEN_OUTPUT = "int main() { return undefined_function(; }"
+
+
+class BlockingSession(FakeSession):
+    """第block次请求等到release被设置后才返回，模拟有候选通过时仍在等待响应的推测生成"""
+
+    def __init__(self, *contents, block=2):
+        super().__init__(*contents)
+        self.block = block
+        self.release = threading.Event()
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        response = super().post(url, headers, json, timeout)
+        if len(self.requests) == self.block:
+            self.release.wait(10)
+            return FakeResponse(BROKEN_OUTPUT)
+        return response
+
+
+@pytest.fixture
+def helper(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return AESECBHelper("test-key")
+
+
+def _leftover_candidates(helper):
+    return [name for name in os.listdir(helper.work_dir) if ".candidate" in name]
+
+
+@needs_gcc
+def test_pipeline_retries_until_kat_passes(helper):
+    helper.session = FakeSession(BROKEN_OUTPUT, BROKEN_OUTPUT, AES_ECB_OUTPUT)
+    pipeline = BuildPipeline(helper, "AES-ECB")
+    winner = pipeline.run()
+
+    assert winner is not None and winner.index == 3
+    assert helper.exec_path == os.path.join(helper.work_dir, "aes_ecb_encrypt")
+    assert os.path.exists(helper.exec_path)
+    assert helper.generated_code == winner.code
+    assert helper.retry_count == len(pipeline.candidates)
+    assert _leftover_candidates(helper) == []
+
+    first, second = pipeline.candidates[:2]
+    assert "编译失败" in first.error
+    assert second.error == "与第1个候选的代码相同"
+    # 第二个候选在第一个编译之前就开始生成；第三个候选等到前面的候选失败后才开始，带上了错误反馈
+    assert winner.feedback and winner.feedback in (first.error, second.error)
+    assert helper.run_headless(bytes(32), plaintext=b"abc").ok
+
+
+@needs_gcc
+def test_pipeline_fails_after_max_candidates(helper):
+    helper.session = FakeSession(BROKEN_OUTPUT)
+    pipeline = BuildPipeline(helper, "AES-ECB", max_candidates=3)
+    assert pipeline.run() is None
+    assert len(pipeline.candidates) == 3
+    assert all(c.error for c in pipeline.candidates)
+    assert helper.retry_count == 3
+    assert _leftover_candidates(helper) == []
+
+
+@needs_gcc
+def test_speculative_generation_does_not_touch_helper(helper):
+    helper.session = session = BlockingSession(AES_ECB_OUTPUT)
+
+    def generate_c_code():
+        raise AssertionError("流水线应调用不修改助手状态的_request_code")
+
+    helper._generate_c_code = generate_c_code
+    pipeline = BuildPipeline(helper, "AES-ECB")
+    winner = pipeline.run()
+    assert winner is not None and winner.index == 1
+    retry_count, stats = helper.retry_count, pipeline.stats()
+
+    # 第二个候选的请求在流水线返回后才完成
+    generator = next(t for t in threading.enumerate() if t.name == "pipeline-generate")
+    session.release.set()
+    generator.join(10)
+    assert not generator.is_alive()
+
+    assert helper.generated_code == winner.code
+    assert helper.retry_count == retry_count
+    assert pipeline.stats()["candidates"] == stats["candidates"]
+    assert "已取消" in pipeline.format_timeline()
+
+
+def test_pipeline_requires_kat_vectors(helper):
+    with pytest.raises(ValueError, match="没有已知答案向量"):
+        BuildPipeline(helper, "RSA")
+
+
+def test_supports_pipeline(helper):
+    assert helper.supports_pipeline()
+    # RSA没有mode与对称算法的已知答案向量，旧版GmSSLHelper没有mode，都走逐次生成
+    assert not create_helper("RSA", "test-key").supports_pipeline()
+    assert not GmSSLHelper("test-key", "sm4").supports_pipeline()
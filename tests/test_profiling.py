@@ -0,0 +1,31 @@
+import json
+import os
+import threading
+
+from assistants.profiling import profiling
+
+
+def _busy(results):
+    results.append(sum(i * i for i in range(20000)))
+
+
+def test_thread_runs_and_is_profiled(tmp_path):
+    results = []
+    with profiling(str(tmp_path)) as profiler:
+        thread = threading.Thread(target=_busy, args=(results,))
+        thread.start()
+        thread.join(timeout=10)
+
+    assert results, "剖析期间启动的线程没有执行目标函数"
+    functions = {name for _, _, name in profiler.python_stats().stats}
+    assert "_busy" in functions
+    assert sorted(os.listdir(tmp_path)) == ["binaries.json", "python.folded", "python.pstats"]
+    with open(tmp_path / "binaries.json", encoding="utf-8") as f:
+        assert json.load(f)["runs"] == []
+
+
+def test_thread_run_restored(tmp_path):
+    original = threading.Thread.run
+    with profiling(str(tmp_path)):
+        pass
+    assert threading.Thread.run is original
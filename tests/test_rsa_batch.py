@@ -0,0 +1,74 @@
+import io
+import shutil
+
+import pytest
+
+import cli
+from assistants.rsa_batch import rsa_decrypt_batch, rsa_decrypt_lines, rsa_encrypt_batch, rsa_encrypt_lines
+
+pytestmark = pytest.mark.skipif(shutil.which("gcc") is None or shutil.which("openssl") is None,
+                                reason="需要gcc、openssl命令与OpenSSL开发库")
+
+# 1024位密钥的OAEP（SHA-1）明文上限
+OAEP_LIMIT = 128 - 42
+
+
+def test_crlf_lines_round_trip(rsa_key_pair, tmp_path):
+    private_pem, public_pem = rsa_key_pair
+    encrypted = io.BytesIO()
+    stats = rsa_encrypt_lines(public_pem, io.BytesIO(b"first\r\nsecond\r\n"), encrypted, work_dir=str(tmp_path))
+    assert (stats["records"], stats["failed"]) == (2, 0)
+
+    # 按本仓库的换行约定把密文文件改为CRLF，解密时同样去掉行尾的\r
+    crlf = encrypted.getvalue().replace(b"\n", b"\r\n")
+    decrypted = io.BytesIO()
+    stats = rsa_decrypt_lines(private_pem, io.BytesIO(crlf), decrypted, work_dir=str(tmp_path))
+    assert (stats["records"], stats["failed"]) == (2, 0)
+    assert decrypted.getvalue() == b"first\nsecond\n"
+
+
+@pytest.mark.parametrize("option", ["--in", "--out"])
+def test_cli_reports_unopenable_paths(rsa_key_pair, tmp_path, capsys, option):
+    key = tmp_path / "public.pem"
+    key.write_bytes(rsa_key_pair[1])
+    args = ["--key", str(key), "--in", str(key), "--out", str(tmp_path / "out.txt")]
+    args[args.index(option) + 1] = str(tmp_path / "missing" / "file")
+    assert cli.run_rsa_batch_command(args) == 1
+    assert "❌" in capsys.readouterr().err
+
+
+def test_oversized_record_fails_alone(rsa_key_pair, tmp_path):
+    records = [b"a", b"x" * (OAEP_LIMIT + 1), b"x" * OAEP_LIMIT]
+    results, stats = rsa_encrypt_batch(rsa_key_pair[1], records, work_dir=str(tmp_path))
+    assert [len(r) if r else None for r in results] == [128, None, 128]
+    assert (stats["records"], stats["failed"]) == (3, 1)
+    assert stats["errors"] == [(1, "record longer than the OAEP limit")]
+
+
+def test_oversized_line_fails_alone(rsa_key_pair, tmp_path):
+    out = io.BytesIO()
+    stats = rsa_encrypt_lines(rsa_key_pair[1], io.BytesIO(b"a\n" + b"x" * (OAEP_LIMIT + 1) + b"\nb\n"), out,
+                              work_dir=str(tmp_path))
+    lines = out.getvalue().splitlines()
+    assert lines[1] == b"error: record longer than the OAEP limit"
+    assert len(lines[0]) == len(lines[2]) == 256
+    assert (stats["records"], stats["failed"]) == (3, 1)
+
+
+def test_batch_decrypt_round_trip(rsa_key_pair, tmp_path):
+    private_pem, public_pem = rsa_key_pair
+    records = [b"", b"\x00\n\r", b"z" * OAEP_LIMIT]
+    ciphertexts, _ = rsa_encrypt_batch(public_pem, records, work_dir=str(tmp_path))
+    # 篡改一条密文、截短一条：只有这两条失败
+    tampered = bytearray(ciphertexts[0])
+    tampered[-1] ^= 1
+    plaintexts, stats = rsa_decrypt_batch(private_pem, ciphertexts + [bytes(tampered), ciphertexts[1][:-1]],
+                                          work_dir=str(tmp_path))
+    assert plaintexts == records + [None, None]
+    assert (stats["records"], stats["failed"]) == (5, 2)
+    assert stats["errors"] == [(3, "RSA decrypt failed"), (4, "ciphertext length does not match the key size")]
+
+
+def test_decrypt_needs_private_key(rsa_key_pair, tmp_path):
+    with pytest.raises(RuntimeError, match="invalid RSA private key PEM"):
+        rsa_decrypt_batch(rsa_key_pair[1], [b"x" * 128], work_dir=str(tmp_path))
@@ -0,0 +1,73 @@
+import shutil
+import subprocess
+
+import pytest
+
+from assistants.aes_cbc_helper import AESCBCHelper
+from assistants.aes_ecb_helper import AESECBHelper
+from assistants.des_cbc_helper import DESCBCHelper
+from assistants.kat import KAT_VECTORS
+from assistants.runner import is_timeout, parse_ciphertext, run_headless
+from fakes import AES_CBC_OUTPUT, AES_CBC_OUTPUT_NO_CLEANUP, AES_ECB_OUTPUT, DES_CBC_OUTPUT
+
+needs_gcc = pytest.mark.skipif(shutil.which("gcc") is None, reason="需要gcc与OpenSSL开发库")
+
+
+@pytest.mark.parametrize("stdout, expected", [
+    ("密文: 1f78 8fe6\n", "1f788fe6"),
+    ("密文(十六进制): 0a0b\n", "0a0b"),
+    ("加密结果(十六进制)：00ff\n", "00ff"),
+    ("Ciphertext: abcd\n", "abcd"),
+    # AES/DES旧版净化删除中文后剩下的前缀
+    ("文: 1f788fe6\n", "1f788fe6"),
+    (": : : 1f788fe6\n", "1f788fe6"),
+    ("1f788fe6\n", "1f788fe6"),
+])
+def test_parse_ciphertext(stdout, expected):
+    assert parse_ciphertext(stdout) == bytes.fromhex(expected)
+
+
+@pytest.mark.parametrize("stdout", ["", "加密失败\n", "密文: abc\n"])
+def test_parse_ciphertext_missing(stdout):
+    assert parse_ciphertext(stdout) is None
+
+
+@needs_gcc
+@pytest.mark.parametrize("helper_class, raw_code", [
+    (AESECBHelper, AES_ECB_OUTPUT),
+    (AESCBCHelper, AES_CBC_OUTPUT),
+    (AESCBCHelper, AES_CBC_OUTPUT_NO_CLEANUP),
+    (DESCBCHelper, DES_CBC_OUTPUT),
+], ids=["AES-ECB", "AES-CBC", "AES-CBC-no-cleanup", "DES-CBC"])
+def test_sanitized_code_runs_headless(helper_class, raw_code, tmp_path, monkeypatch):
+    """大模型输出经净化、修复、编译后，非交互式运行能提取出正确的密文"""
+    monkeypatch.chdir(tmp_path)
+    helper = helper_class("test-key")
+    code = helper._fix_code(raw_code)
+    assert "密文" not in code
+    assert helper._compile(code) == "编译成功", helper.last_error
+
+    vector = KAT_VECTORS[helper.spec.name][0]
+    block_size = helper.spec.block_size
+    plaintext = bytes.fromhex(vector["plaintext"])[:2 * block_size]
+    iv = bytes.fromhex(vector["iv"]) if vector["iv"] else None
+    result = run_headless(helper.exec_path, helper._headless_input(bytes.fromhex(vector["key"]), iv, plaintext))
+
+    assert result.ok, result.error
+    assert result.ciphertext[:len(plaintext)] == bytes.fromhex(vector["ciphertext"])[:len(plaintext)]
+    # 明文为整块时PKCS#7/PKCS#5再填充一个整块
+    assert len(result.ciphertext) == len(plaintext) + block_size
+
+
+@needs_gcc
+@pytest.mark.parametrize("body, failure", [
+    ("for (;;) x++;", "timeout"),
+    ("raise(SIGKILL);", "crash"),
+])
+def test_sigkill_counts_as_timeout_only_at_the_cpu_limit(body, failure, tmp_path):
+    source = tmp_path / "prog.c"
+    source.write_text(f"#include <signal.h>\nvolatile long x;\nint main(void) {{ {body} return 0; }}\n")
+    subprocess.run(["gcc", str(source), "-o", str(tmp_path / "prog")], check=True)
+    result = run_headless(str(tmp_path / "prog"), b"", timeout=30, cpu_seconds=1)
+    assert result.failure == failure
+    assert is_timeout(result.error) == (failure == "timeout")
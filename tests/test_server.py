@@ -0,0 +1,77 @@
+import http.client
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+from assistants.server import MAX_BODY, make_server
+
+
+class EchoService:
+    """只回显请求体长度的服务，用于测试HTTP层"""
+
+    def handle(self, method, path, body):
+        return 200, {"ok": True, "length": len(body)}
+
+
+@pytest.fixture
+def server():
+    server = make_server(EchoService(), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _raw(server, content_length, body=b""):
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall(b"POST /encrypt HTTP/1.1\r\nHost: test\r\nContent-Length: "
+                     + content_length.encode() + b"\r\n\r\n" + body)
+        reply = b""
+        while chunk := sock.recv(65536):
+            reply += chunk
+    head, _, data = reply.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+def test_valid_body_keeps_connection(server):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+    for body in (b"abc", b""):
+        conn.request("POST", "/encrypt", body)
+        response = conn.getresponse()
+        assert (response.status, json.loads(response.read())) == (200, {"ok": True, "length": len(body)})
+    conn.close()
+
+
+@pytest.mark.parametrize("content_length", ["-1", "abc", "1.5"])
+def test_invalid_content_length(server, content_length):
+    status, response = _raw(server, content_length, b"abc")
+    assert status == 400 and not response["ok"] and "Content-Length" in response["error"]
+
+
+def test_oversized_body(server):
+    status, response = _raw(server, str(MAX_BODY + 1))
+    assert status == 413 and not response["ok"]
+
+
+def test_unix_socket_path_must_not_be_a_regular_file(tmp_path):
+    path = tmp_path / "service.sock"
+    path.write_text("不是套接字")
+    with pytest.raises(FileExistsError):
+        make_server(EchoService(), unix_socket=str(path))
+    assert path.read_text() == "不是套接字"
+
+
+def test_stale_unix_socket_is_replaced(tmp_path):
+    path = str(tmp_path / "service.sock")
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    server = make_server(EchoService(), unix_socket=path)
+    try:
+        assert os.stat(path).st_mode & 0o777 == 0o600
+    finally:
+        server.server_close()
@@ -0,0 +1,29 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from assistants.templates import build_binary
+
+pytestmark = pytest.mark.skipif(shutil.which("gcc") is None, reason="需要gcc")
+
+SOURCE = '#include <stdio.h>\nint main(void) { puts("ok"); return 0; }\n'
+
+
+def test_threads_building_the_same_template(tmp_path):
+    with ThreadPoolExecutor(8) as pool:
+        paths = set(pool.map(lambda _: build_binary("X", "test", SOURCE, work_dir=str(tmp_path), libs=()),
+                             range(8)))
+    assert len(paths) == 1
+    exec_path = paths.pop()
+    assert subprocess.run([exec_path], capture_output=True).stdout == b"ok\n"
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(exec_path), os.path.basename(exec_path) + ".c"]
+
+
+def test_compile_error_names_the_source_file(tmp_path):
+    with pytest.raises(RuntimeError, match="x_test_[0-9a-f]+\\.c:") as info:
+        build_binary("X", "test", "int main(void) { return }\n", work_dir=str(tmp_path), libs=())
+    assert ".tmp" not in str(info.value)
+    assert os.listdir(tmp_path) == []
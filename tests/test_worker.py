@@ -0,0 +1,105 @@
+import shutil
+import struct
+
+import pytest
+
+from assistants import worker as worker_module
+from assistants.kat import KAT_VECTORS
+from assistants.worker import (WorkerError, WorkerPool, WorkerProcess, WorkerReplyError, build_worker,
+                               encode_record)
+
+pytestmark = pytest.mark.skipif(shutil.which("gcc") is None, reason="需要gcc与OpenSSL开发库")
+
+VECTOR = KAT_VECTORS["AES-CBC"][0]
+KEY = bytes.fromhex(VECTOR["key"])
+IV = bytes.fromhex(VECTOR["iv"])
+PLAINTEXT = bytes.fromhex(VECTOR["plaintext"])
+CIPHERTEXT = bytes.fromhex(VECTOR["ciphertext"])
+
+
+@pytest.fixture(scope="module")
+def work_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("template_workdir"))
+
+
+@pytest.fixture
+def pool(work_dir):
+    with WorkerPool("AES-CBC", size=2, work_dir=work_dir) as pool:
+        yield pool
+
+
+def test_encode_record():
+    record = encode_record(b"k" * 2, None, b"abc")
+    assert record == struct.pack(">I", 2) + b"kk" + struct.pack(">I", 0) + struct.pack(">I", 3) + b"abc"
+
+
+def test_worker_matches_kat(work_dir):
+    worker = WorkerProcess(build_worker("AES-CBC", work_dir=work_dir))
+    try:
+        output = worker.encrypt(KEY, IV, PLAINTEXT)
+        # 同一密钥的第二条记录跳过密钥调度，结果不变
+        assert worker.encrypt(KEY, IV, PLAINTEXT) == output
+    finally:
+        worker.close()
+    assert output[:len(CIPHERTEXT)] == CIPHERTEXT
+    assert len(output) == len(CIPHERTEXT) + 16
+
+
+def test_worker_error_reply_keeps_process(work_dir):
+    worker = WorkerProcess(build_worker("AES-CBC", work_dir=work_dir))
+    try:
+        with pytest.raises(WorkerReplyError, match="invalid key/iv length"):
+            worker.encrypt(KEY[:16], IV, PLAINTEXT)
+        with pytest.raises(WorkerReplyError, match="invalid key/iv length"):
+            worker.encrypt(KEY, IV[:8], PLAINTEXT)
+        assert worker.proc.poll() is None
+        assert worker.encrypt(KEY, IV, PLAINTEXT)[:len(CIPHERTEXT)] == CIPHERTEXT
+    finally:
+        worker.close()
+
+
+def test_decrypt_worker_rejects_partial_block(work_dir):
+    worker = WorkerProcess(build_worker("AES-CBC", work_dir=work_dir, decrypt=True))
+    try:
+        with pytest.raises(WorkerReplyError, match="multiple of the block size"):
+            worker.encrypt(KEY, IV, CIPHERTEXT[:15])
+        assert worker.encrypt(KEY, IV, CIPHERTEXT) == PLAINTEXT
+    finally:
+        worker.close()
+
+
+def test_pool_keeps_worker_on_error_reply(pool):
+    workers = list(pool.workers)
+    with pytest.raises(WorkerReplyError):
+        pool.encrypt(b"short", IV, PLAINTEXT)
+    assert pool.workers == workers
+    assert all(worker.proc.poll() is None for worker in workers)
+    assert pool.idle.qsize() == pool.size
+
+
+def test_pool_replaces_dead_worker(pool):
+    for worker in pool.workers:
+        worker.proc.kill()
+        worker.proc.wait()
+    old = list(pool.workers)
+    with pytest.raises(WorkerError):
+        pool.encrypt(KEY, IV, PLAINTEXT)
+    assert pool.idle.qsize() == pool.size
+    replaced = [worker for worker in pool.workers if worker not in old]
+    assert len(replaced) == 1
+    assert replaced[0].encrypt(KEY, IV, PLAINTEXT)[:len(CIPHERTEXT)] == CIPHERTEXT
+
+
+def test_pool_drops_worker_when_replacement_fails(pool, monkeypatch):
+    dead = pool.idle.queue[0]
+    dead.proc.kill()
+    dead.proc.wait()
+
+    def fail(*args, **kwargs):
+        raise OSError("cannot start worker")
+
+    monkeypatch.setattr(worker_module, "WorkerProcess", fail)
+    with pytest.raises(OSError):
+        pool.encrypt(KEY, IV, PLAINTEXT)
+    assert dead not in pool.idle.queue
+    assert pool.idle.qsize() == pool.size - 1